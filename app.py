@@ -1,28 +1,79 @@
 from flask import (
     Flask, render_template, request, jsonify, abort,
-    session, redirect
+    session, redirect, g, has_app_context, has_request_context, make_response,
+    Response, stream_with_context, send_from_directory, send_file, url_for
 )
 from google.oauth2 import service_account
+from google.auth.credentials import AnonymousCredentials
 from googleapiclient.discovery import build
-from google_auth_httplib2 import AuthorizedHttp
-from datetime import datetime, UTC
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp, Request as GoogleAuthRequest
+from datetime import date, datetime, timedelta, UTC
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import safe_join, secure_filename
+from markupsafe import Markup, escape
+from xml.sax.saxutils import escape as xml_escape
+import click
+import contextvars
+import copy
 import json
+import csv
+import io
+import zipfile
+import gzip
+import fcntl
+import tempfile
+import mimetypes
 import uuid
+import hmac
+import hashlib
 import unicodedata
 import re
+import urllib.parse
 import os
+import time
+import bisect
+import heapq
+import random
+import sqlite3
+import queue
 import httplib2
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import wraps
-from typing import Any, Dict, List, Tuple, Optional
-
-app = Flask(__name__)
+from typing import Any, Dict, Iterator, List, Tuple, Optional
+from zoneinfo import ZoneInfo
+
+# Opcionales: sin Pillow no se generan variantes de imagen y sin brotli
+# solo se precomprime en gzip.
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+# Opcional: solo hace falta para el modo asíncrono (gunicorn -k gevent).
+try:
+    import gevent
+    from gevent import monkey as gevent_monkey
+except ImportError:
+    gevent = None
+
+app = Flask(__name__, instance_path=os.getenv("FLASK_INSTANCE_PATH") or None)
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
 # =========================================================
 # CONFIG GENERAL
 # =========================================================
-SPREADSHEET_ID = "158KfNlSI4K_Fse5Zm4KpD1WvW_-ZcDsBgsnFGQqT34U"
+SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "158KfNlSI4K_Fse5Zm4KpD1WvW_-ZcDsBgsnFGQqT34U")
+# Para pruebas de carga: apunta el cliente a un Sheets falso (bench/fake_sheets.py)
+# en lugar de Google, sin credenciales.
+SHEETS_API_ENDPOINT = os.getenv("SHEETS_API_ENDPOINT", "").rstrip("/")
+SHEETS_API_HOST = urllib.parse.urlsplit(SHEETS_API_ENDPOINT).netloc if SHEETS_API_ENDPOINT else "sheets.googleapis.com"
 
 SHEET_EXAMS = "Exams!A:N"
 SHEET_RESPONSES = "Responses!A:S"
@@ -59,20 +110,998 @@ def admin_required(fn):
 
 
 # =========================================================
-# GOOGLE SERVICE
+# MODO ASÍNCRONO (gunicorn -k gevent)
+# =========================================================
+# Con el worker gevent cada petición es un greenlet y las esperas de red
+# (Sheets) ceden el control, así que un proceso sostiene cientos de envíos
+# en vuelo sin un hilo por petición:
+#
+#     gunicorn -k gevent --worker-connections 500 app:app
+#
+# Lo que bloquea sin pasar por sockets (SQLite, Pillow) va al pool de hilos
+# nativos del hub, acotado por ASYNC_BLOCKING_THREADS. Con el worker sync
+# nada cambia: run_concurrently ejecuta en orden y offload llama directo.
+# Cada llamada a Sheets toma un cliente del pool y lo devuelve al terminar,
+# así que SHEETS_POOL_SIZE acota las llamadas en vuelo y no las peticiones
+# abiertas.
+ASYNC_BLOCKING_THREADS = int(os.getenv("ASYNC_BLOCKING_THREADS", "8"))
+
+
+def async_worker() -> bool:
+    # Se comprueba en cada llamada y no al importar: con gunicorn --preload
+    # el módulo se carga en el maestro y el worker gevent parchea después.
+    return gevent is not None and gevent_monkey.is_module_patched("socket")
+
+
+def _blocking_threads():
+    threadpool = gevent.get_hub().threadpool
+    if threadpool.maxsize != ASYNC_BLOCKING_THREADS:
+        threadpool.maxsize = ASYNC_BLOCKING_THREADS
+    return threadpool
+
+
+def offload(fn, *args, **kwargs):
+    if async_worker():
+        return _blocking_threads().apply(fn, args, kwargs)
+    return fn(*args, **kwargs)
+
+
+def start_background(fn) -> None:
+    # Para trabajo largo de CPU: en gevent un greenlet bloquearía el hub.
+    if async_worker():
+        _blocking_threads().spawn(fn)
+    else:
+        threading.Thread(target=fn, daemon=True).start()
+
+
+def run_concurrently(*calls) -> List[Any]:
+    # Tareas independientes de una petición. En gevent cada una corre en su
+    # greenlet con su propio contexto de app, compartiendo la memoria de
+    # lecturas y el carril del planificador.
+    if not async_worker() or len(calls) < 2:
+        return [call() for call in calls]
+
+    reads = _request_reads()
+    lane = current_sheets_lane()
+
+    def task(call):
+        with app.app_context():
+            if reads is not None:
+                g._sheets_reads = reads
+            with sheets_lane(lane):
+                return call()
+
+    jobs = [gevent.spawn(task, call) for call in calls]
+    gevent.joinall(jobs, raise_error=True)
+    return [job.value for job in jobs]
+
+
+# =========================================================
+# MÉTRICAS (formato Prometheus)
 # =========================================================
-def get_sheets_service():
-    creds = service_account.Credentials.from_service_account_file(
-        "credentials.json",
-        scopes=SCOPES
+# Cada proceso acumula sus histogramas en memoria y los vuelca a un JSON
+# propio dentro de METRICS_DIR; /metrics suma los archivos de todos los
+# workers. Los de procesos ya terminados se suman a dead.json y se borran,
+# para que los contadores no retrocedan cuando gunicorn recicla un worker sin
+# acumular un archivo por cada uno. El directorio es de cada host: la vida de
+# un proceso se comprueba por su pid. Sin METRICS_TOKEN, /metrics solo
+# responde a la sesión de administrador o a peticiones desde localhost.
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(app.instance_path, "metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PREFIX = "webeval"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRIC_HISTOGRAMS = {
+    "http_request_duration_seconds": ("Duración de las peticiones HTTP por ruta", LATENCY_BUCKETS),
+    "sheets_call_duration_seconds": ("Duración de las llamadas a la API de Google Sheets", LATENCY_BUCKETS),
+    "sheets_call_payload_bytes": ("Bytes enviados y recibidos por llamada a Google Sheets", BYTES_BUCKETS),
+    "sheets_admission_wait_seconds": ("Espera en el planificador antes de cada llamada a Google Sheets", LATENCY_BUCKETS),
+}
+
+
+def _prom_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _prom_labels(labels: Tuple[Tuple[str, str], ...], **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        for _, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    # Por serie se guardan los conteos de cada bucket (no acumulados), la
+    # suma y el total; el +Inf es el total.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        # El pid puede reutilizarse: el archivo lleva también el arranque.
+        self._path = os.path.join(self.directory, f"{self._pid}-{int(time.time() * 1000)}.json")
+        self._series: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        self._dirty = False
+        self._flusher = False
+        self.stats = {"flushes": 0, "flush_errors": 0}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        bounds = METRIC_HISTOGRAMS[name][1]
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            # Tras un fork cada worker empieza de cero con su propio archivo.
+            if self._pid != os.getpid():
+                self._reset()
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(bounds) + 2)
+            i = bisect.bisect_left(bounds, value)
+            if i < len(bounds):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+            self._dirty = True
+            start = not self._flusher
+            self._flusher = True
+        if start:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid() or not self._dirty:
+                return
+            entries = [[name, list(labels), list(series)] for (name, labels), series in self._series.items()]
+            path = self._path
+            self._dirty = False
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f, separators=(",", ":"))
+            os.replace(tmp, path)
+            self.stats["flushes"] += 1
+        except OSError as e:
+            with self._lock:
+                self._dirty = True
+                self.stats["flush_errors"] += 1
+            app.logger.warning("No se pudieron guardar las métricas en %s: %s", path, e)
+
+    @staticmethod
+    def _dead_file(fname: str) -> bool:
+        # "<pid>-<arranque>.json" de un proceso que ya no existe.
+        pid = fname.split("-", 1)[0]
+        if not fname.endswith(".json") or not pid.isdigit() or int(pid) == os.getpid():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def _merge_into(self, merged: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]], path: str) -> bool:
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return False
+        for name, labels, series in entries:
+            spec = METRIC_HISTOGRAMS.get(name)
+            # Si cambian los buckets, los archivos viejos ya no encajan.
+            if spec is None or len(series) != len(spec[1]) + 2:
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            acc = merged.get(key)
+            if acc is None:
+                merged[key] = list(series)
+            else:
+                for i, v in enumerate(series):
+                    acc[i] += v
+        return True
+
+    def _compact_dead(self, names: List[str]) -> None:
+        dead = [fname for fname in names if self._dead_file(fname)]
+        if not dead:
+            return
+        with open(os.path.join(self.directory, ".compact.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead_path = os.path.join(self.directory, "dead.json")
+            merged: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+            self._merge_into(merged, dead_path)
+            # Otro proceso pudo compactarlos mientras se esperaba el candado.
+            dead = [fname for fname in dead if self._merge_into(merged, os.path.join(self.directory, fname))]
+            if not dead:
+                return
+            tmp = f"{dead_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump([[name, list(labels), series] for (name, labels), series in merged.items()],
+                          f, separators=(",", ":"))
+            os.replace(tmp, dead_path)
+            for fname in dead:
+                try:
+                    os.remove(os.path.join(self.directory, fname))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]]:
+        self.flush()
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            names = []
+        try:
+            self._compact_dead(names)
+            names = sorted(os.listdir(self.directory))
+        except OSError as e:
+            app.logger.warning("No se pudieron compactar las métricas de procesos terminados: %s", e)
+
+        merged: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        for fname in names:
+            if fname.endswith(".json"):
+                self._merge_into(merged, os.path.join(self.directory, fname))
+        return merged
+
+    def render(self) -> str:
+        merged = self.collect()
+        lines = []
+        for name, (help_text, bounds) in METRIC_HISTOGRAMS.items():
+            full = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} histogram")
+            for (metric, labels), series in sorted(merged.items()):
+                if metric != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(bounds, series):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_prom_labels(labels, le=_prom_number(bound))} {_prom_number(cumulative)}")
+                lines.append(f"{full}_bucket{_prom_labels(labels, le='+Inf')} {_prom_number(series[-1])}")
+                lines.append(f"{full}_sum{_prom_labels(labels)} {_prom_number(series[-2])}")
+                lines.append(f"{full}_count{_prom_labels(labels)} {_prom_number(series[-1])}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "series": len(self._series),
+                "path": self._path,
+                "pid": self._pid,
+            }
+
+
+METRICS = MetricsRegistry(METRICS_DIR)
+
+
+@app.before_request
+def _start_request_timer():
+    g._request_started = time.perf_counter()
+
+
+@app.after_request
+def _remember_response_status(response):
+    g._response_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _observe_request(exc):
+    started = g.pop("_request_started", None)
+    if started is None:
+        return
+    # Sin after_request (excepción no controlada) la respuesta fue un 500.
+    status = g.pop("_response_status", 500)
+    rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    METRICS.observe(
+        "http_request_duration_seconds",
+        time.perf_counter() - started,
+        route=rule, method=request.method, status=str(status)
     )
 
-    if DISABLE_SSL_VERIFY:
-        http = httplib2.Http(timeout=60, disable_ssl_certificate_validation=True)
-        authed_http = AuthorizedHttp(creds, http=http)
-        return build("sheets", "v4", http=authed_http, cache_discovery=False)
 
-    return build("sheets", "v4", credentials=creds, cache_discovery=False)
+def _sheets_range_label(a1: str) -> str:
+    # Sin números de fila, para que cada fila no cree una serie nueva.
+    sheet, sep, cells = a1.partition("!")
+    return f"{sheet}{sep}{re.sub(r'[0-9]+', '', cells)}" if sep else sheet
+
+
+def _sheets_call_labels(uri: str, method: str) -> Tuple[str, str]:
+    parts = urllib.parse.urlsplit(uri)
+    if parts.netloc != SHEETS_API_HOST:
+        return "token", ""
+    path = urllib.parse.unquote(parts.path)
+    if path.endswith("/values:batchGet"):
+        ranges = urllib.parse.parse_qs(parts.query).get("ranges", [])
+        return "batchGet", ",".join(dict.fromkeys(_sheets_range_label(r) for r in ranges))
+    if path.endswith(":batchUpdate"):
+        return "batchUpdate", ""
+    if "/values/" in path:
+        a1 = path.split("/values/", 1)[1]
+        for suffix in (":append", ":clear"):
+            if a1.endswith(suffix):
+                return suffix[1:], _sheets_range_label(a1[:-len(suffix)])
+        return ("get" if method == "GET" else "update"), _sheets_range_label(a1)
+    return method.lower(), ""
+
+
+# =========================================================
+# PLANIFICADOR DE LLAMADAS A SHEETS (cuota, prioridades y reintentos)
+# =========================================================
+# Toda llamada HTTP a Sheets pide turno aquí. La cuota por minuto del
+# proyecto se reparte entre los procesos y cada uno la administra con un
+# token bucket para lecturas y otro para escrituras. Quien espera sale por
+# carril: primero los envíos, luego las páginas de examen, después el panel
+# de administración y al final los hilos de fondo. Si la espera prevista
+# supera el plazo del carril la llamada se rechaza enseguida y la ruta
+# responde 503 con Retry-After, en lugar de acumular peticiones colgadas.
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "300"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "300"))
+SHEETS_QUOTA_PROCESSES = max(1, int(os.getenv("SHEETS_QUOTA_PROCESSES", os.getenv("WEB_CONCURRENCY", "1"))))
+SHEETS_BURST_SECONDS = float(os.getenv("SHEETS_BURST_SECONDS", "10"))
+SHEETS_MAX_IN_FLIGHT = int(os.getenv("SHEETS_MAX_IN_FLIGHT", "8"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "4"))
+SHEETS_BACKOFF_BASE = float(os.getenv("SHEETS_BACKOFF_BASE", "0.5"))
+SHEETS_BACKOFF_MAX = float(os.getenv("SHEETS_BACKOFF_MAX", "20"))
+
+SHEETS_LANES = {"submit": 0, "exam": 1, "admin": 2, "background": 3}
+SHEETS_LANE_DEADLINES = {
+    "submit": float(os.getenv("SHEETS_DEADLINE_SUBMIT", "15")),
+    "exam": float(os.getenv("SHEETS_DEADLINE_EXAM", "8")),
+    "admin": float(os.getenv("SHEETS_DEADLINE_ADMIN", "8")),
+    "background": float(os.getenv("SHEETS_DEADLINE_BACKGROUND", "120")),
+}
+# El resto de rutas con Sheets son del panel y van por "admin".
+SHEETS_LANE_BY_ENDPOINT = {
+    "submit_exam": "submit",
+    "show_exam": "exam",
+    "api_get_exam": "exam",
+    "api_public_config": "exam",
+    "index": "exam",
+}
+
+# En un ContextVar y no en threading.local: con gevent el carril no se
+# cuela entre greenlets que comparten hilo.
+_sheets_lane: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("sheets_lane", default=None)
+
+
+@contextmanager
+def sheets_lane(lane: str):
+    token = _sheets_lane.set(lane)
+    try:
+        yield
+    finally:
+        _sheets_lane.reset(token)
+
+
+def current_sheets_lane() -> str:
+    lane = _sheets_lane.get()
+    if lane:
+        return lane
+    if has_request_context():
+        return SHEETS_LANE_BY_ENDPOINT.get(request.endpoint, "admin")
+    return "background"
+
+
+class SheetsOverloaded(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f"Cuota de Google Sheets agotada; reintentar en {self.retry_after}s")
+
+
+class SheetsScheduler:
+    def __init__(self, per_minute: Dict[str, int], max_in_flight: int):
+        self.per_minute = per_minute
+        self.max_in_flight = max(1, max_in_flight)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        now = time.monotonic()
+        self._buckets: Dict[str, Dict[str, float]] = {}
+        for kind, limit in self.per_minute.items():
+            rate = max(1, limit) / SHEETS_QUOTA_PROCESSES / 60.0
+            capacity = max(1.0, rate * SHEETS_BURST_SECONDS)
+            self._buckets[kind] = {"rate": rate, "capacity": capacity, "tokens": capacity, "at": now, "paused_until": 0.0}
+        # Por tipo, un heap de turnos (prioridad del carril, orden de llegada).
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {kind: [] for kind in self.per_minute}
+        self._seq = 0
+        self._in_flight = 0
+        self.stats = {"admitted": 0, "waited": 0, "shed": 0, "throttled": 0, "retries": 0}
+
+    def _refill(self, bucket: Dict[str, float], now: float) -> None:
+        bucket["tokens"] = min(bucket["capacity"], bucket["tokens"] + (now - bucket["at"]) * bucket["rate"])
+        bucket["at"] = now
+
+    def _eta(self, bucket: Dict[str, float], ahead: int, now: float) -> float:
+        # Lo que tardarían en llegar los tokens de los que van delante y el propio.
+        return max((ahead + 1 - bucket["tokens"]) / bucket["rate"], bucket["paused_until"] - now, 0.0)
+
+    def _shed(self, kind: str, lane: str, eta: float, waited: float) -> SheetsOverloaded:
+        self.stats["shed"] += 1
+        METRICS.observe("sheets_admission_wait_seconds", waited, lane=lane, kind=kind, outcome="shed")
+        return SheetsOverloaded(eta)
+
+    def admit(self, kind: str, lane: str) -> None:
+        # Tras un fork cada worker arranca con su parte de la cuota.
+        if self._pid != os.getpid():
+            self._reset()
+        deadline = SHEETS_LANE_DEADLINES[lane]
+        started = time.monotonic()
+        with self._cond:
+            bucket = self._buckets[kind]
+            waiting = self._waiting[kind]
+            self._seq += 1
+            ticket = (SHEETS_LANES[lane], self._seq)
+            self._refill(bucket, started)
+            eta = self._eta(bucket, sum(1 for t in waiting if t < ticket), started)
+            if eta > deadline:
+                raise self._shed(kind, lane, eta, 0.0)
+
+            heapq.heappush(waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(bucket, now)
+                    first = waiting[0] == ticket
+                    if (first and bucket["tokens"] >= 1 and now >= bucket["paused_until"]
+                            and self._in_flight < self.max_in_flight):
+                        break
+                    remaining = started + deadline - now
+                    if remaining <= 0:
+                        ahead = sum(1 for t in waiting if t < ticket)
+                        raise self._shed(kind, lane, self._eta(bucket, ahead, now), now - started)
+                    if first:
+                        refill_in = (1 - bucket["tokens"]) / bucket["rate"]
+                        remaining = min(remaining, max(refill_in, bucket["paused_until"] - now, 0.005))
+                    self._cond.wait(remaining)
+            finally:
+                waiting.remove(ticket)
+                heapq.heapify(waiting)
+                self._cond.notify_all()
+
+            bucket["tokens"] -= 1
+            self._in_flight += 1
+            self.stats["admitted"] += 1
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.stats["waited"] += 1
+        METRICS.observe("sheets_admission_wait_seconds", waited, lane=lane, kind=kind, outcome="admitted")
+
+    def release(self) -> None:
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def throttle(self, kind: str, seconds: float) -> None:
+        # Un 429 significa que la cuota real ya se agotó (otros procesos u
+        # otras apps): nadie de este proceso vuelve a llamar hasta el backoff.
+        with self._cond:
+            bucket = self._buckets[kind]
+            bucket["tokens"] = min(bucket["tokens"], 0.0)
+            bucket["paused_until"] = max(bucket["paused_until"], time.monotonic() + seconds)
+            self.stats["throttled"] += 1
+
+    def count_retry(self) -> None:
+        with self._cond:
+            self.stats["retries"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            buckets = {}
+            for kind, bucket in self._buckets.items():
+                self._refill(bucket, now)
+                buckets[kind] = {
+                    "per_minute": round(bucket["rate"] * 60, 2),
+                    "tokens": round(bucket["tokens"], 2),
+                    "waiting": len(self._waiting[kind]),
+                    "paused_for": round(max(0.0, bucket["paused_until"] - now), 2),
+                }
+            return {
+                **self.stats,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "buckets": buckets,
+                "pid": self._pid,
+            }
+
+
+SHEETS_SCHEDULER = SheetsScheduler(
+    {"read": SHEETS_READS_PER_MINUTE, "write": SHEETS_WRITES_PER_MINUTE},
+    SHEETS_MAX_IN_FLIGHT
+)
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str]) -> float:
+    # Full jitter; si Google manda Retry-After, nunca menos que eso.
+    delay = random.uniform(0, min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * (2 ** attempt)))
+    try:
+        return max(delay, float(retry_after or 0))
+    except ValueError:
+        return delay
+
+
+# Una escritura que devolvió 5xx pudo haberse aplicado: solo se repiten las
+# que dejan la hoja igual al hacerse dos veces (values.update escribe las
+# mismas celdas). append y batchUpdate solo se reintentan con 429.
+SHEETS_IDEMPOTENT_WRITES = {"update"}
+
+
+class InstrumentedHttp(httplib2.Http):
+    # Cada llamada real a Google pasa por aquí: pide turno al planificador,
+    # se mide y, ante 429/5xx, se reintenta con backoff (5xx solo lecturas y
+    # SHEETS_IDEMPOTENT_WRITES).
+    # pool: el SheetsClientPool dueño del cliente, si lo hay.
+    pool: Optional["SheetsClientPool"] = None
+
+    def _timed_request(self, op, range_label, uri, method, body, headers, **kwargs):
+        started = time.perf_counter()
+        status = "error"
+        received = 0
+        try:
+            resp, content = super().request(uri, method, body=body, headers=headers, **kwargs)
+            status = str(resp.status)
+            received = len(content or b"")
+            return resp, content
+        finally:
+            sent = len(body) if isinstance(body, (bytes, str)) else 0
+            labels = {"op": op, "range": range_label, "status": status}
+            METRICS.observe("sheets_call_duration_seconds", time.perf_counter() - started, **labels)
+            METRICS.observe("sheets_call_payload_bytes", sent + received, **labels)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        op, range_label = _sheets_call_labels(uri, method)
+        if op == "token":
+            return self._timed_request(op, range_label, uri, method, body, headers, **kwargs)
+
+        kind = "read" if method == "GET" else "write"
+        lane = current_sheets_lane()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            SHEETS_SCHEDULER.admit(kind, lane)
+            try:
+                resp, content = self._timed_request(op, range_label, uri, method, body, headers, **kwargs)
+            finally:
+                SHEETS_SCHEDULER.release()
+
+            idempotent = method == "GET" or op in SHEETS_IDEMPOTENT_WRITES
+            retryable = resp.status == 429 or (resp.status >= 500 and idempotent)
+            if not retryable or attempt >= SHEETS_MAX_RETRIES:
+                return resp, content
+            delay = _backoff_delay(attempt, resp.get("retry-after"))
+            if resp.status == 429:
+                SHEETS_SCHEDULER.throttle(kind, delay)
+            # Sin tiempo para otro intento: el error sube y la ruta da 503.
+            if time.monotonic() - started + delay > SHEETS_LANE_DEADLINES[lane]:
+                return resp, content
+            SHEETS_SCHEDULER.count_retry()
+            attempt += 1
+            # La plaza del pool queda libre mientras se espera.
+            if self.pool is not None:
+                self.pool.sleep(delay, lane)
+            else:
+                time.sleep(delay)
+
+
+def _service_unavailable(retry_after: int):
+    resp = jsonify({"error": "Google Sheets está saturado, intenta de nuevo en unos segundos"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+
+@app.errorhandler(SheetsOverloaded)
+def _sheets_overloaded(e):
+    return _service_unavailable(e.retry_after)
+
+
+@app.errorhandler(HttpError)
+def _sheets_http_error(e):
+    status = e.resp.status
+    if status == 429 or status >= 500:
+        try:
+            retry_after = int(float(e.resp.get("retry-after") or 0))
+        except ValueError:
+            retry_after = 0
+        return _service_unavailable(max(retry_after, int(min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** SHEETS_MAX_RETRIES)), 1))
+    app.logger.error("Error de Google Sheets: %s", e)
+    return jsonify({"error": "Error al acceder a Google Sheets"}), 502
+
+
+# =========================================================
+# GOOGLE SERVICE (pool de clientes por proceso)
+# =========================================================
+SHEETS_POOL_SIZE = int(os.getenv("SHEETS_POOL_SIZE", "8"))
+SHEETS_POOL_TIMEOUT = float(os.getenv("SHEETS_POOL_TIMEOUT", "30"))
+SHEETS_POOL_RETRY_AFTER = float(os.getenv("SHEETS_POOL_RETRY_AFTER", "5"))
+SHEETS_HTTP_TIMEOUT = int(os.getenv("SHEETS_HTTP_TIMEOUT", "60"))
+CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "credentials.json")
+
+
+class SheetsClientPool:
+    # httplib2.Http no es thread-safe: cada cliente del pool tiene su propio
+    # Http (con keep-alive) y solo lo usa un hilo a la vez.
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._creds_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._creds = None
+        self._idle: List[Any] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.stats = {
+            "created": 0,
+            "reused": 0,
+            "acquired": 0,
+            "released": 0,
+            "in_use": 0,
+            "waits": 0,
+            "exhausted": 0,
+            "lent": 0,
+            "token_refreshes": 0,
+        }
+        # Plazas que no se pudieron recuperar tras un backoff (ver sleep).
+        self._owed = 0
+
+    def _new_http(self) -> httplib2.Http:
+        return InstrumentedHttp(
+            timeout=SHEETS_HTTP_TIMEOUT,
+            disable_ssl_certificate_validation=DISABLE_SSL_VERIFY
+        )
+
+    def _credentials(self):
+        # Renueva el token una sola vez para todo el proceso. La renovación
+        # es una llamada de red: tiene su propio candado para que acquire y
+        # release no la esperen.
+        creds = self._creds
+        if creds is not None and creds.valid:
+            return creds
+        with self._creds_lock:
+            if self._creds is None and SHEETS_API_ENDPOINT:
+                self._creds = AnonymousCredentials()
+            if self._creds is None:
+                self._creds = service_account.Credentials.from_service_account_file(
+                    CREDENTIALS_FILE,
+                    scopes=SCOPES
+                )
+            if not self._creds.valid:
+                self._creds.refresh(GoogleAuthRequest(self._new_http()))
+                with self._lock:
+                    self.stats["token_refreshes"] += 1
+            return self._creds
+
+    def _build(self):
+        http = self._new_http()
+        http.pool = self
+        authed_http = AuthorizedHttp(self._credentials(), http=http)
+        if SHEETS_API_ENDPOINT:
+            service = build(
+                "sheets", "v4", http=authed_http, cache_discovery=False,
+                client_options={"api_endpoint": SHEETS_API_ENDPOINT}
+            )
+        else:
+            service = build("sheets", "v4", http=authed_http, cache_discovery=False)
+        # googleapiclient arma de nuevo cada recurso (con la documentación de
+        # todos sus métodos) en cada spreadsheets() y values(): es casi todo
+        # el CPU de una llamada. Se arman una vez por cliente.
+        spreadsheets = service.spreadsheets()
+        values = spreadsheets.values()
+        spreadsheets.values = lambda: values
+        service.spreadsheets = lambda: spreadsheets
+        return service
+
+    def acquire(self):
+        with self._lock:
+            # Tras un fork (gunicorn --preload) no se heredan conexiones.
+            if self._pid != os.getpid():
+                self._reset()
+            slots = self._slots
+
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["waits"] += 1
+            # Sin cliente libre dentro del plazo del carril, la ruta responde
+            # 503 con Retry-After como cuando se agota la cuota.
+            timeout = min(SHEETS_POOL_TIMEOUT, SHEETS_LANE_DEADLINES[current_sheets_lane()])
+            if not slots.acquire(timeout=timeout):
+                with self._lock:
+                    self.stats["exhausted"] += 1
+                raise SheetsOverloaded(SHEETS_POOL_RETRY_AFTER)
+
+        try:
+            self._credentials()
+            with self._lock:
+                service = self._idle.pop() if self._idle else None
+            reused = service is not None
+            if not reused:
+                service = self._build()
+        except Exception:
+            slots.release()
+            raise
+        with self._lock:
+            self.stats["reused" if reused else "created"] += 1
+            self.stats["acquired"] += 1
+            self.stats["in_use"] += 1
+        return service
+
+    def release(self, service) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._idle.append(service)
+            self.stats["released"] += 1
+            self.stats["in_use"] -= 1
+            slots = self._slots
+            if self._owed:
+                self._owed -= 1
+                return
+        slots.release()
+
+    def sleep(self, delay: float, lane: str) -> None:
+        # Backoff de un reintento: quien tiene un cliente presta su plaza
+        # mientras duerme y la recupera dentro del plazo del carril. Si no
+        # vuelve a tiempo, el cliente se queda sin plaza (_owed, que release
+        # descuenta) y la ruta responde 503.
+        with self._lock:
+            slots = self._slots if self._pid == os.getpid() else None
+            if slots is not None:
+                self.stats["lent"] += 1
+        if slots is None:
+            time.sleep(delay)
+            return
+        slots.release()
+        time.sleep(delay)
+        if not slots.acquire(timeout=min(SHEETS_POOL_TIMEOUT, SHEETS_LANE_DEADLINES[lane])):
+            with self._lock:
+                self._owed += 1
+                self.stats["exhausted"] += 1
+            raise SheetsOverloaded(SHEETS_POOL_RETRY_AFTER)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "size": self.size,
+                "idle": len(self._idle),
+                "owed": self._owed,
+                "pid": self._pid,
+            }
+
+
+SHEETS_POOL = SheetsClientPool(SHEETS_POOL_SIZE)
+
+
+@contextmanager
+def sheets_service():
+    # El cliente se toma del pool solo mientras dura la llamada, también
+    # dentro de una petición: quien tiene una plaza nunca espera un candado
+    # (los _sync_lock de las cachés) que otro hilo tiene mientras espera plaza.
+    service = SHEETS_POOL.acquire()
+    try:
+        yield service
+    finally:
+        SHEETS_POOL.release(service)
+
+
+# =========================================================
+# LECTURAS COMPARTIDAS (single-flight)
+# =========================================================
+SHEETS_FLIGHT_TIMEOUTS = {
+    "Config": float(os.getenv("SHEETS_FLIGHT_TIMEOUT_CONFIG", "15")),
+    "Exams": float(os.getenv("SHEETS_FLIGHT_TIMEOUT_EXAMS", "60")),
+    "Responses": float(os.getenv("SHEETS_FLIGHT_TIMEOUT_RESPONSES", "120")),
+}
+SHEETS_FLIGHT_DEFAULT_TIMEOUT = 60.0
+
+
+class SingleFlight:
+    # Las llamadas concurrentes con la misma clave comparten una sola
+    # ejecución: la primera la hace y las demás esperan su resultado (o su
+    # excepción). Usa primitivas de threading, que gevent parchea. Con
+    # not_before solo se comparte una ejecución que empezó después de ese
+    # instante (time.monotonic()); si la que está en curso es anterior, se
+    # espera a la siguiente, que arranca cuando termine la actual y sirve a
+    # todos los que llegaron mientras tanto.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, List[Any]] = {}
+        self._next: Dict[Any, List[Any]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, group: str, name: str) -> None:
+        group_stats = self.stats.setdefault(group, {"executed": 0, "deduplicated": 0, "timeouts": 0})
+        group_stats[name] += 1
+
+    def do(self, key: Any, fn, group: str = "", timeout: float = SHEETS_FLIGHT_DEFAULT_TIMEOUT,
+           not_before: Optional[float] = None) -> Any:
+        with self._lock:
+            running = self._calls.get(key)
+            if running is not None and (not_before is None or running[3] >= not_before):
+                call, running = running, None
+            else:
+                # La siguiente ejecución aún no empezó: empezará después de
+                # not_before.
+                call = self._next.get(key)
+            leader = call is None
+            if leader:
+                # [evento, resultado, excepción, inicio]
+                call = [threading.Event(), None, None, time.monotonic()]
+                if running is None:
+                    self._calls[key] = call
+                else:
+                    self._next[key] = call
+                self._count(group, "executed")
+            else:
+                self._count(group, "deduplicated")
+
+        if leader:
+            if running is not None:
+                running[0].wait(timeout)
+                with self._lock:
+                    if self._next.get(key) is call:
+                        del self._next[key]
+                    call[3] = time.monotonic()
+                    self._calls[key] = call
+            try:
+                call[1] = fn()
+            except BaseException as e:
+                call[2] = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call[0].set()
+            return call[1]
+
+        if not call[0].wait(timeout):
+            with self._lock:
+                self._count(group, "timeouts")
+            raise TimeoutError(f"La lectura compartida de {group or key} superó {timeout}s")
+        if call[2] is not None:
+            raise call[2]
+        return call[1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "by_sheet": {k: dict(v) for k, v in self.stats.items()},
+            }
+
+
+SHEETS_FLIGHTS = SingleFlight()
+
+
+def _sheet_name(a1_range: str) -> str:
+    return a1_range.split("!", 1)[0]
+
+
+def _request_reads() -> Optional[Dict[str, List[List[Any]]]]:
+    # Rangos ya leídos en esta petición (solo valores en filas, sin
+    # opciones): ninguna lectura repite el mismo rango dos veces.
+    if not has_app_context():
+        return None
+    if "_sheets_reads" not in g:
+        g._sheets_reads = {}
+    return g._sheets_reads
+
+
+def _reads_not_before() -> Optional[float]:
+    # Las peticiones que marcan g._sheets_not_before no aprovechan lecturas
+    # que ya estaban en curso cuando llegaron.
+    if not has_app_context():
+        return None
+    return g.get("_sheets_not_before")
+
+
+def _forget_reads(sheet: str) -> None:
+    # Tras escribir en una hoja, lo memorizado de ella ya no vale.
+    reads = _request_reads()
+    if reads:
+        for a1_range in [r for r in reads if _sheet_name(r) == sheet]:
+            del reads[a1_range]
+
+
+def _get_values(a1_range: str, **kwargs) -> List[List[Any]]:
+    reads = None if kwargs else _request_reads()
+    if reads is not None and a1_range in reads:
+        return reads[a1_range]
+
+    sheet = _sheet_name(a1_range)
+
+    # El cliente se pide dentro: quien espera la lectura de otro no ocupa plaza.
+    def fetch():
+        with sheets_service() as service:
+            return service.spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=a1_range,
+                **kwargs
+            ).execute().get("values", [])
+
+    values = SHEETS_FLIGHTS.do(
+        ("get", a1_range, tuple(sorted(kwargs.items()))),
+        fetch,
+        group=sheet,
+        timeout=SHEETS_FLIGHT_TIMEOUTS.get(sheet, SHEETS_FLIGHT_DEFAULT_TIMEOUT),
+        not_before=_reads_not_before()
+    )
+    if reads is not None:
+        reads[a1_range] = values
+    return values
+
+
+def _batch_get_values(ranges: List[str]) -> List[List[List[Any]]]:
+    # Varios rangos en un solo values.batchGet; los que ya se leyeron en la
+    # petición no se vuelven a pedir.
+    reads = _request_reads()
+    memo = reads if reads is not None else {}
+    missing = list(dict.fromkeys(r for r in ranges if r not in memo))
+
+    if len(missing) == 1:
+        memo[missing[0]] = _get_values(missing[0])
+    elif missing:
+        sheets = sorted({_sheet_name(r) for r in missing})
+
+        def fetch():
+            with sheets_service() as service:
+                res = service.spreadsheets().values().batchGet(
+                    spreadsheetId=SPREADSHEET_ID,
+                    ranges=missing
+                ).execute()
+            value_ranges = res.get("valueRanges", [])
+            return [
+                value_ranges[i].get("values", []) if i < len(value_ranges) else []
+                for i in range(len(missing))
+            ]
+
+        fetched = SHEETS_FLIGHTS.do(
+            ("batchGet", tuple(missing)),
+            fetch,
+            group="+".join(sheets),
+            timeout=max(SHEETS_FLIGHT_TIMEOUTS.get(s, SHEETS_FLIGHT_DEFAULT_TIMEOUT) for s in sheets),
+            not_before=_reads_not_before()
+        )
+        memo.update(zip(missing, fetched))
+
+    return [memo[r] for r in ranges]
+
+
+def prefetch_reads(ranges: List[str]) -> None:
+    # Un handler declara de entrada los rangos que va a necesitar y se
+    # piden todos juntos; las lecturas posteriores salen de la memoria de
+    # la petición. Si falla, cada lectura se hará por su cuenta.
+    if not ranges or not has_app_context():
+        return
+    try:
+        _batch_get_values(ranges)
+    except Exception:
+        app.logger.exception("No se pudieron leer por adelantado: %s", ", ".join(ranges))
 
 
 # =========================================================
@@ -106,6 +1135,19 @@ def safe_list_of_str(x: Any, item_max_len: int = 120, max_items: int = 50) -> Li
     return out
 
 
+def _json_list(raw: Any) -> List[Any]:
+    try:
+        value = json.loads(raw) if raw else []
+    except Exception:
+        return []
+    return value if isinstance(value, list) else []
+
+
+def content_hash(value: Any) -> str:
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
 def safe_get(row: List[Any], idx: int, default: str = "") -> str:
     if not isinstance(row, list):
         return default
@@ -114,6 +1156,526 @@ def safe_get(row: List[Any], idx: int, default: str = "") -> str:
     return safe_str(row[idx], 500)
 
 
+# =========================================================
+# ALMACENAMIENTO (Google Sheets o SQLite local)
+# =========================================================
+# Todas las lecturas y escrituras pasan por un Storage con tres partes
+# (exams, responses, config). Las filas conservan la forma de la hoja
+# (listas de strings en el orden de EXAM_COLUMNS / RESPONSE_COLUMNS) y cada
+# una va acompañada de su número de fila: en Sheets es la fila real y en
+# SQLite el id autoincremental.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets")
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(app.instance_path, "webevaluaciones.sqlite3"))
+STORAGE_MIRROR_SHEETS = os.getenv("STORAGE_MIRROR_SHEETS", "0") == "1"
+
+EXAM_COLUMNS = [
+    "exam_id", "facilitator", "facilitator_cedula", "course", "created_at",
+    "questions_json", "course_date", "course_duration", "num_invites",
+    "facilitator_email", "system_area", "system_title", "course_description",
+    "exam_url",
+]
+RESPONSE_COLUMNS = [
+    "exam_id", "nombre", "registro", "cedula", "turno", "gerencia", "area",
+    "area_otro", "nivel_antes", "nivel", "calif", "comentarios", "answers_json",
+    "submitted_at", "score", "total", "percent", "failed_json", "correc_json",
+]
+
+
+def _row_from_range(a1_range: str) -> Optional[int]:
+    m = re.search(r"![A-Z]+(\d+)", a1_range or "")
+    return int(m.group(1)) if m else None
+
+
+def _padded(values: List[Any], width: int) -> List[Any]:
+    values = list(values[:width])
+    return values + [""] * (width - len(values))
+
+
+def _summary_rows(head: List[List[Any]], tail: List[List[Any]]) -> List[List[Any]]:
+    # Junta A:E y G:N en la forma de la fila completa; la celda F (preguntas)
+    # queda en None para marcar que no se leyó.
+    return [
+        _padded(head[i] if i < len(head) else [], 5) + [None] + list(tail[i] if i < len(tail) else [])
+        for i in range(max(len(head), len(tail)))
+    ]
+
+
+class SheetsExamsRepository:
+    # summary=True omite la columna F, que guarda el JSON de preguntas y es
+    # con diferencia la celda más grande de cada fila.
+    def rows_ranges(self, first_row: int = 1, summary: bool = False) -> List[str]:
+        if summary:
+            return [f"Exams!A{first_row}:E", f"Exams!G{first_row}:N"]
+        return [SHEET_EXAMS if first_row <= 1 else f"Exams!A{first_row}:N"]
+
+    def rows(self, first_row: int = 1, summary: bool = False) -> List[Tuple[int, List[Any]]]:
+        values = _batch_get_values(self.rows_ranges(first_row, summary))
+        rows = _summary_rows(*values) if summary else values[0]
+        return list(enumerate(rows, start=max(first_row, 1)))
+
+    def head_ranges(self, row: int) -> List[str]:
+        return [f"Exams!A{row}:F{row}"]
+
+    def head_at(self, row: int) -> List[Any]:
+        values = _get_values(self.head_ranges(row)[0])
+        return values[0] if values else []
+
+    def exam_id_ranges(self, row: int) -> List[str]:
+        return [f"Exams!A{row}"]
+
+    def row_ranges(self, row: int) -> List[str]:
+        return [f"Exams!A{row}:N{row}"]
+
+    def row_at(self, row: int) -> List[Any]:
+        values = _get_values(self.row_ranges(row)[0])
+        return values[0] if values else []
+
+    def exam_id_at(self, row: int) -> str:
+        cell = _get_values(self.exam_id_ranges(row)[0])
+        return safe_get(cell[0], 0, "") if cell else ""
+
+    def find_row(self, exam_id: str) -> Optional[int]:
+        column = _get_values("Exams!A:A")
+        for i, r in enumerate(column, start=1):
+            if safe_get(r, 0, "") == exam_id:
+                return i
+        return None
+
+    def append(self, values: List[Any]) -> Optional[int]:
+        return self.append_many([values])[0]
+
+    def append_many(self, rows: List[List[Any]]) -> List[Optional[int]]:
+        # Un solo append; las filas quedan contiguas a partir de la primera.
+        with sheets_service() as service:
+            res = service.spreadsheets().values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range=SHEET_EXAMS,
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body={"values": rows}
+            ).execute()
+        _forget_reads("Exams")
+        first = _row_from_range(res.get("updates", {}).get("updatedRange", ""))
+        return [None if first is None else first + i for i in range(len(rows))]
+
+    def update(self, row: int, values: List[Any]) -> None:
+        with sheets_service() as service:
+            service.spreadsheets().values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=f"Exams!A{row}:N{row}",
+                valueInputOption="RAW",
+                body={"values": [values]}
+            ).execute()
+        _forget_reads("Exams")
+
+
+class SheetsResponsesRepository:
+    def keys_ranges(self, first_row: int = 1) -> List[str]:
+        return [f"Responses!A{first_row}:A", f"Responses!D{first_row}:D"]
+
+    def keys(self, first_row: int = 1) -> Tuple[List[Tuple[str, str]], int]:
+        id_rows, cedula_rows = _batch_get_values(self.keys_ranges(first_row))
+
+        exam_ids = [r[0] if r else "" for r in id_rows]
+        cedulas = [r[0] if r else "" for r in cedula_rows]
+        pairs = [
+            (safe_str(exam_ids[i], 500), safe_str(cedulas[i], 500))
+            for i in range(min(len(exam_ids), len(cedulas)))
+        ]
+        return pairs, first_row - 1 + max(len(exam_ids), len(cedulas))
+
+    def rows(self, first_row: int = 1) -> List[Tuple[int, List[Any]]]:
+        a1_range = SHEET_RESPONSES if first_row <= 1 else f"Responses!A{first_row}:S"
+        values = _get_values(a1_range)
+        return list(enumerate(values, start=max(first_row, 1)))
+
+    def counter_rows(self, first_row: int = 1) -> List[Tuple[int, List[Any]]]:
+        # Solo A, D:F, N y Q (lo que usan los contadores de participación),
+        # en la forma de la fila completa con el resto de celdas vacías.
+        first_row = max(first_row, 1)
+        ranges = [f"Responses!{c}{first_row}:{d}" for c, d in (("A", "A"), ("D", "F"), ("N", "N"), ("Q", "Q"))]
+        ids, people, submitted, percents = _batch_get_values(ranges)
+        out: List[Tuple[int, List[Any]]] = []
+        for i in range(max(len(ids), len(people), len(submitted), len(percents))):
+            row = [""] * len(RESPONSE_COLUMNS)
+            row[0] = safe_get(ids[i] if i < len(ids) else [], 0, "")
+            row[3:6] = _padded(people[i] if i < len(people) else [], 3)
+            row[13] = safe_get(submitted[i] if i < len(submitted) else [], 0, "")
+            row[16] = safe_get(percents[i] if i < len(percents) else [], 0, "")
+            out.append((first_row + i, row))
+        return out
+
+    def iter_rows(self, exam_id: str, chunk_rows: int) -> Iterator[Tuple[int, List[Any]]]:
+        # Lectura por tramos para exportar. No pasa por la memoria de la
+        # petición ni por single-flight, así nunca se retiene la hoja entera.
+        # Se recorre hasta el final de la cuadrícula: un tramo vacío (filas
+        # borradas a mano) no indica que no haya más respuestas debajo.
+        last_row = self.row_count()
+        first = 1
+        while first <= last_row:
+            last = min(first + chunk_rows - 1, last_row)
+            with sheets_service() as service:
+                values = service.spreadsheets().values().get(
+                    spreadsheetId=SPREADSHEET_ID,
+                    range=f"Responses!A{first}:S{last}"
+                ).execute().get("values", [])
+            for n, r in enumerate(values, start=first):
+                if safe_get(r, 0, "") == exam_id:
+                    yield n, r
+            first = last + 1
+
+    def row_count(self) -> int:
+        with sheets_service() as service:
+            meta = service.spreadsheets().get(
+                spreadsheetId=SPREADSHEET_ID,
+                ranges=["Responses"],
+                fields="sheets.properties.gridProperties.rowCount"
+            ).execute()
+        sheets = meta.get("sheets") or [{}]
+        return int(sheets[0].get("properties", {}).get("gridProperties", {}).get("rowCount", 0))
+
+    def append(self, rows: List[List[Any]]) -> None:
+        with sheets_service() as service:
+            service.spreadsheets().values().append(
+                spreadsheetId=SPREADSHEET_ID,
+                range=SHEET_RESPONSES,
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body={"values": rows}
+            ).execute()
+        _forget_reads("Responses")
+
+
+class SheetsConfigStore:
+    def rows_ranges(self) -> List[str]:
+        return [SHEET_CONFIG]
+
+    def rows(self) -> List[List[Any]]:
+        return _get_values(SHEET_CONFIG)
+
+    def save(self, key: str, value_json: str) -> None:
+        with sheets_service() as service:
+            rows = service.spreadsheets().values().get(
+                spreadsheetId=SPREADSHEET_ID,
+                range=SHEET_CONFIG
+            ).execute().get("values", [])
+
+            row_index = None
+            for i, r in enumerate(rows, start=1):
+                if len(r) >= 1 and safe_str(r[0], 80) == key:
+                    row_index = i
+                    break
+
+            if row_index is None:
+                service.spreadsheets().values().append(
+                    spreadsheetId=SPREADSHEET_ID,
+                    range=SHEET_CONFIG,
+                    valueInputOption="RAW",
+                    insertDataOption="INSERT_ROWS",
+                    body={"values": [[key, value_json]]}
+                ).execute()
+            else:
+                service.spreadsheets().values().update(
+                    spreadsheetId=SPREADSHEET_ID,
+                    range=f"Config!A{row_index}:B{row_index}",
+                    valueInputOption="RAW",
+                    body={"values": [[key, value_json]]}
+                ).execute()
+        _forget_reads("Config")
+
+
+class SqliteDatabase:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        # Una conexión por hilo y por proceso (no se comparten tras un fork).
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        with self._init_lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._create_schema()
+                self._initialized = True
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            exam_cols = ", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in EXAM_COLUMNS)
+            response_cols = ", ".join(
+                f"{c} NOT NULL DEFAULT ''" if c in ("score", "total", "percent") else f"{c} TEXT NOT NULL DEFAULT ''"
+                for c in RESPONSE_COLUMNS
+            )
+            conn.executescript(f"""
+                CREATE TABLE IF NOT EXISTS exams (id INTEGER PRIMARY KEY AUTOINCREMENT, {exam_cols});
+                CREATE INDEX IF NOT EXISTS idx_exams_exam_id ON exams (exam_id);
+                CREATE INDEX IF NOT EXISTS idx_exams_course_date ON exams (course_date);
+                CREATE TABLE IF NOT EXISTS responses (id INTEGER PRIMARY KEY AUTOINCREMENT, {response_cols});
+                CREATE INDEX IF NOT EXISTS idx_responses_exam_cedula ON responses (exam_id, cedula);
+                CREATE TABLE IF NOT EXISTS config (key TEXT PRIMARY KEY, value TEXT NOT NULL DEFAULT '');
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connect()
+        with conn:
+            yield conn
+
+
+def _sqlite_values(row: Tuple[Any, ...]) -> List[str]:
+    # Misma forma que devuelve Sheets: strings y sin celdas vacías al final.
+    out = ["" if v is None else str(v) for v in row]
+    while out and out[-1] == "":
+        out.pop()
+    return out
+
+
+class SqliteExamsRepository:
+    _select = f"SELECT id, {', '.join(EXAM_COLUMNS)} FROM exams"
+
+    def __init__(self, db: SqliteDatabase, mirror: Optional["SheetsMirror"] = None):
+        self.db = db
+        self.mirror = mirror
+
+    # Las lecturas locales no se agrupan ni se proyectan: no hay rangos que
+    # pedir por adelantado y summary devuelve las filas completas.
+    def rows_ranges(self, first_row: int = 1, summary: bool = False) -> List[str]:
+        return []
+
+    def head_ranges(self, row: int) -> List[str]:
+        return []
+
+    def exam_id_ranges(self, row: int) -> List[str]:
+        return []
+
+    def row_ranges(self, row: int) -> List[str]:
+        return []
+
+    def rows(self, first_row: int = 1, summary: bool = False) -> List[Tuple[int, List[Any]]]:
+        cur = self.db.connect().execute(f"{self._select} WHERE id >= ? ORDER BY id", (first_row,))
+        return [(r[0], _sqlite_values(r[1:])) for r in cur]
+
+    def head_at(self, row: int) -> List[Any]:
+        r = self.db.connect().execute(f"{self._select} WHERE id = ?", (row,)).fetchone()
+        return _sqlite_values(r[1:7]) if r else []
+
+    def exam_id_at(self, row: int) -> str:
+        r = self.db.connect().execute("SELECT exam_id FROM exams WHERE id = ?", (row,)).fetchone()
+        return r[0] if r else ""
+
+    def row_at(self, row: int) -> List[Any]:
+        r = self.db.connect().execute(f"{self._select} WHERE id = ?", (row,)).fetchone()
+        return _sqlite_values(r[1:]) if r else []
+
+    def append(self, values: List[Any]) -> Optional[int]:
+        return self.append_many([values])[0]
+
+    def append_many(self, rows: List[List[Any]]) -> List[Optional[int]]:
+        placeholders = ", ".join("?" for _ in EXAM_COLUMNS)
+        ids: List[Optional[int]] = []
+        with self.db.transaction() as conn:
+            for values in rows:
+                cur = conn.execute(
+                    f"INSERT INTO exams ({', '.join(EXAM_COLUMNS)}) VALUES ({placeholders})",
+                    _padded(values, len(EXAM_COLUMNS))
+                )
+                ids.append(cur.lastrowid)
+        if self.mirror:
+            self.mirror.submit("exams.append", SHEETS_EXAMS_REPO.append_many, rows)
+        return ids
+
+    def update(self, row: int, values: List[Any]) -> None:
+        assignments = ", ".join(f"{c} = ?" for c in EXAM_COLUMNS)
+        with self.db.transaction() as conn:
+            conn.execute(
+                f"UPDATE exams SET {assignments} WHERE id = ?",
+                _padded(values, len(EXAM_COLUMNS)) + [row]
+            )
+        if self.mirror:
+            self.mirror.submit("exams.update", _mirror_exam_update, values)
+
+
+class SqliteResponsesRepository:
+    _select = f"SELECT id, {', '.join(RESPONSE_COLUMNS)} FROM responses"
+
+    def __init__(self, db: SqliteDatabase, mirror: Optional["SheetsMirror"] = None):
+        self.db = db
+        self.mirror = mirror
+
+    def keys_ranges(self, first_row: int = 1) -> List[str]:
+        return []
+
+    def keys(self, first_row: int = 1) -> Tuple[List[Tuple[str, str]], int]:
+        cur = self.db.connect().execute(
+            "SELECT id, exam_id, cedula FROM responses WHERE id >= ? ORDER BY id",
+            (first_row,)
+        )
+        pairs: List[Tuple[str, str]] = []
+        last_row = first_row - 1
+        for row_id, exam_id, cedula in cur:
+            pairs.append((exam_id, cedula))
+            last_row = row_id
+        return pairs, last_row
+
+    def rows(self, first_row: int = 1) -> List[Tuple[int, List[Any]]]:
+        cur = self.db.connect().execute(f"{self._select} WHERE id >= ? ORDER BY id", (first_row,))
+        return [(r[0], _sqlite_values(r[1:])) for r in cur]
+
+    def counter_rows(self, first_row: int = 1) -> List[Tuple[int, List[Any]]]:
+        return self.rows(first_row)
+
+    def iter_rows(self, exam_id: str, chunk_rows: int) -> Iterator[Tuple[int, List[Any]]]:
+        cur = self.db.connect().execute(f"{self._select} WHERE exam_id = ? ORDER BY id", (exam_id,))
+        while True:
+            batch = cur.fetchmany(chunk_rows)
+            if not batch:
+                return
+            for r in batch:
+                yield r[0], _sqlite_values(r[1:])
+
+    def append(self, rows: List[List[Any]]) -> None:
+        placeholders = ", ".join("?" for _ in RESPONSE_COLUMNS)
+        with self.db.transaction() as conn:
+            conn.executemany(
+                f"INSERT INTO responses ({', '.join(RESPONSE_COLUMNS)}) VALUES ({placeholders})",
+                [_padded(r, len(RESPONSE_COLUMNS)) for r in rows]
+            )
+        if self.mirror:
+            self.mirror.submit("responses.append", SHEETS_RESPONSES_REPO.append, rows)
+
+
+class SqliteConfigStore:
+    def __init__(self, db: SqliteDatabase, mirror: Optional["SheetsMirror"] = None):
+        self.db = db
+        self.mirror = mirror
+
+    def rows_ranges(self) -> List[str]:
+        return []
+
+    def rows(self) -> List[List[Any]]:
+        cur = self.db.connect().execute("SELECT key, value FROM config ORDER BY rowid")
+        return [[k, v] for k, v in cur]
+
+    def save(self, key: str, value_json: str) -> None:
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO config (key, value) VALUES (?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value_json)
+            )
+        if self.mirror:
+            self.mirror.submit("config.save", SHEETS_CONFIG_STORE.save, key, value_json)
+
+
+class SheetsMirror:
+    # Copia en segundo plano (best effort) de las escrituras locales a la
+    # hoja de cálculo, para quienes siguen leyendo el Sheets.
+    def __init__(self, retries: int = 5):
+        self.retries = retries
+        self._queue: "queue.Queue[Tuple[str, Any, Tuple[Any, ...]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self.stats = {"submitted": 0, "mirrored": 0, "failed": 0}
+
+    def submit(self, name: str, fn, *args) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True).start()
+            self.stats["submitted"] += 1
+        self._queue.put((name, fn, args))
+
+    def _run(self) -> None:
+        while True:
+            name, fn, args = self._queue.get()
+            for attempt in range(self.retries):
+                try:
+                    fn(*args)
+                    with self._lock:
+                        self.stats["mirrored"] += 1
+                    break
+                except Exception as e:
+                    if attempt == self.retries - 1:
+                        with self._lock:
+                            self.stats["failed"] += 1
+                        app.logger.error("No se pudo replicar %s en Sheets: %s", name, e)
+                    else:
+                        time.sleep(min(60.0, 2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "queued": self._queue.qsize()}
+
+
+def _mirror_exam_update(values: List[Any]) -> None:
+    row = SHEETS_EXAMS_REPO.find_row(safe_str(values[0], 500))
+    if row is None:
+        SHEETS_EXAMS_REPO.append(values)
+    else:
+        SHEETS_EXAMS_REPO.update(row, values)
+
+
+class Storage:
+    def __init__(self, name: str, exams, responses, config, mirror: Optional[SheetsMirror] = None):
+        self.name = name
+        self.exams = exams
+        self.responses = responses
+        self.config = config
+        self.mirror = mirror
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"backend": self.name}
+        if self.mirror:
+            out["mirror"] = self.mirror.snapshot()
+        return out
+
+
+SHEETS_EXAMS_REPO = SheetsExamsRepository()
+SHEETS_RESPONSES_REPO = SheetsResponsesRepository()
+SHEETS_CONFIG_STORE = SheetsConfigStore()
+
+
+def build_storage(backend: str) -> Storage:
+    if backend == "sheets":
+        return Storage("sheets", SHEETS_EXAMS_REPO, SHEETS_RESPONSES_REPO, SHEETS_CONFIG_STORE)
+
+    if backend == "sqlite":
+        db = SqliteDatabase(SQLITE_PATH)
+        mirror = SheetsMirror() if STORAGE_MIRROR_SHEETS else None
+        return Storage(
+            "sqlite",
+            SqliteExamsRepository(db, mirror),
+            SqliteResponsesRepository(db, mirror),
+            SqliteConfigStore(db, mirror),
+            mirror
+        )
+
+    raise RuntimeError(f"STORAGE_BACKEND desconocido: {backend}")
+
+
+STORAGE = build_storage(STORAGE_BACKEND)
+
+
+def get_storage() -> Storage:
+    return STORAGE
+
+
 # =========================================================
 # PREGUNTAS FIJAS
 # =========================================================
@@ -183,13 +1745,14 @@ DEFAULT_QUESTIONS: List[Dict[str, Any]] = [
 
 
 # =========================================================
-# CONFIG EN SHEETS
+# CONFIG
 # =========================================================
-def load_config(service) -> Dict[str, Any]:
-    rows = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_CONFIG
-    ).execute().get("values", [])
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "300"))
+CONFIG_CACHE_MAX_STALE = float(os.getenv("CONFIG_CACHE_MAX_STALE", "3600"))
+
+
+def _fetch_config(store: Storage) -> Dict[str, Any]:
+    rows = store.config.rows()
 
     cfg: Dict[str, Any] = {}
     for r in rows:
@@ -206,46 +1769,124 @@ def load_config(service) -> Dict[str, Any]:
     return cfg
 
 
-def save_config_key(service, key: str, value: Any) -> None:
-    rows = service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_CONFIG
-    ).execute().get("values", [])
-
-    row_index = None
-    for i, r in enumerate(rows, start=1):
-        if len(r) >= 1 and safe_str(r[0], 80) == key:
-            row_index = i
-            break
-
+class ConfigCache:
+    # Dentro del TTL se sirve de memoria; entre TTL y TTL + MAX_STALE se
+    # sirve el valor viejo mientras un hilo lo recarga; más allá se recarga
+    # en línea.
+    def __init__(self, store: Storage, ttl: float, max_stale: float):
+        self.store = store
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._refreshing = False
+        self.version = 0
+        self._etag_memo: Tuple[Any, str, Optional[datetime]] = (None, "", None)
+
+    def get(self) -> Dict[str, Any]:
+        with self._lock:
+            data = self._data
+            age = time.monotonic() - self._loaded_at
+            start_refresh = (
+                data is not None
+                and self.ttl <= age < self.ttl + self.max_stale
+                and not self._refreshing
+            )
+            if start_refresh:
+                self._refreshing = True
+
+        if data is not None and age < self.ttl + self.max_stale:
+            if start_refresh:
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            return data
+
+        return self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        with self._load_lock:
+            with self._lock:
+                if self._data is not None and time.monotonic() - self._loaded_at < self.ttl:
+                    return self._data
+                generation = self._generation
+            cfg = _fetch_config(self.store)
+            self._store(cfg, generation)
+            return cfg
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._lock:
+                generation = self._generation
+            cfg = _fetch_config(self.store)
+            self._store(cfg, generation)
+        except Exception:
+            app.logger.exception("No se pudo refrescar la configuración")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _store(self, cfg: Dict[str, Any], generation: int) -> None:
+        with self._lock:
+            # Una escritura posterior al inicio de la lectura gana.
+            if generation != self._generation:
+                return
+            self._data = cfg
+            self._loaded_at = time.monotonic()
+            self.version += 1
+
+    def pending_ranges(self) -> List[str]:
+        # Solo hay que leer si get() va a recargar en línea.
+        with self._lock:
+            usable = self._data is not None and time.monotonic() - self._loaded_at < self.ttl + self.max_stale
+        return [] if usable else self.store.config.rows_ranges()
+
+    def write_through(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._data is not None:
+                data = dict(self._data)
+                data[key] = value
+                self._data = data
+            self.version += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data = None
+            self._loaded_at = 0.0
+            self.version += 1
+
+    def etag(self) -> Tuple[str, Optional[datetime]]:
+        # Hash del contenido: igual en todos los workers y estable aunque el
+        # refresco en segundo plano traiga los mismos valores.
+        data = self.get()
+        memo = self._etag_memo
+        if memo[0] is data:
+            return memo[1], memo[2]
+        tag = content_hash(data)
+        last_modified = memo[2] if tag == memo[1] else datetime.now(UTC)
+        self._etag_memo = (data, tag, last_modified)
+        return tag, last_modified
+
+
+CONFIG_CACHE = ConfigCache(STORAGE, CONFIG_CACHE_TTL, CONFIG_CACHE_MAX_STALE)
+
+
+def load_config() -> Dict[str, Any]:
+    return dict(CONFIG_CACHE.get())
+
+
+def save_config_key(key: str, value: Any) -> None:
     value_json = json.dumps(value, ensure_ascii=False)
-
-    if row_index is None:
-        service.spreadsheets().values().append(
-            spreadsheetId=SPREADSHEET_ID,
-            range=SHEET_CONFIG,
-            valueInputOption="RAW",
-            insertDataOption="INSERT_ROWS",
-            body={"values": [[key, value_json]]}
-        ).execute()
-    else:
-        service.spreadsheets().values().update(
-            spreadsheetId=SPREADSHEET_ID,
-            range=f"Config!A{row_index}:B{row_index}",
-            valueInputOption="RAW",
-            body={"values": [[key, value_json]]}
-        ).execute()
+    STORAGE.config.save(key, value_json)
+    CONFIG_CACHE.write_through(key, json.loads(value_json))
 
 
-def get_default_questions(service=None) -> List[Dict[str, Any]]:
+def _build_default_questions(overrides: Any) -> List[Dict[str, Any]]:
     questions = [dict(q) for q in DEFAULT_QUESTIONS]
 
-    if service is None:
-        return questions
-
-    cfg = load_config(service)
-    overrides = cfg.get("default_question_overrides", {})
-
     if not isinstance(overrides, dict):
         return questions
 
@@ -264,6 +1905,28 @@ def get_default_questions(service=None) -> List[Dict[str, Any]]:
     return questions
 
 
+# [overrides, preguntas]: se reconstruye solo cuando cambia el objeto de
+# overrides en la config cacheada.
+_DEFAULT_QUESTIONS_MEMO: List[Any] = [None, None]
+
+
+def _shared_default_questions() -> List[Dict[str, Any]]:
+    global _DEFAULT_QUESTIONS_MEMO
+    overrides = load_config().get("default_question_overrides")
+    memo = _DEFAULT_QUESTIONS_MEMO
+    if memo[1] is None or memo[0] is not overrides:
+        memo = [overrides, _build_default_questions(overrides)]
+        _DEFAULT_QUESTIONS_MEMO = memo
+    return memo[1]
+
+
+def get_default_questions(with_overrides: bool = True) -> List[Dict[str, Any]]:
+    # Copia profunda: la memoria es de todo el proceso.
+    if not with_overrides:
+        return copy.deepcopy(DEFAULT_QUESTIONS)
+    return copy.deepcopy(_shared_default_questions())
+
+
 # =========================================================
 # VALIDATE QUESTIONS
 # =========================================================
@@ -334,140 +1997,2339 @@ def validate_question(q: Dict[str, Any]) -> Tuple[bool, str]:
 
 
 # =========================================================
-# SHEETS HELPERS
+# CATÁLOGO DE EXÁMENES
 # =========================================================
-def _load_exams_rows(service) -> List[List[str]]:
-    return service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_EXAMS
-    ).execute().get("values", [])
+def _exam_from_row(r: List[Any]) -> Dict[str, Any]:
+    # Las filas de resumen traen None en F: el examen queda sin preguntas
+    # (ni etag) hasta que ExamCatalog lea esa celda.
+    has_questions = not (len(r) > 5 and r[5] is None)
+    cells = [safe_get(r, i, "") for i in range(len(EXAM_COLUMNS))]
 
+    try:
+        custom_questions = json.loads(cells[5]) if cells[5] else []
+    except Exception:
+        custom_questions = []
 
-def _load_responses_rows(service) -> List[List[str]]:
-    return service.spreadsheets().values().get(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_RESPONSES
-    ).execute().get("values", [])
+    if not isinstance(custom_questions, list):
+        custom_questions = []
+
+    summary = cells[:5] + cells[6:]
+    while summary and not summary[-1]:
+        summary.pop()
+
+    return {
+        "id": cells[0],
+        "facilitator": cells[1],
+        "facilitator_cedula": cells[2],
+        "course": cells[3],
+        "created_at": cells[4],
+        "custom_questions": custom_questions if has_questions else None,
+        "questions_json": safe_get(r, 5, "[]") if has_questions else None,
+        "course_date": cells[6],
+        "course_duration": cells[7],
+        "num_invites": cells[8],
+        "facilitator_email": cells[9],
+        "system_area": cells[10],
+        "system_title": cells[11],
+        "course_description": cells[12],
+        "exam_url": cells[13],
+        "row_len": len(r) if has_questions else max((i + 1 for i, c in enumerate(cells) if c), default=0),
+        "summary_etag": content_hash(summary),
+        "etag": content_hash(cells) if has_questions else None,
+    }
 
 
-def get_exam_by_id(service, exam_id: str) -> Optional[Dict[str, Any]]:
-    rows = _load_exams_rows(service)
-    default_questions = get_default_questions(service)
+EXAM_CATALOG_TTL = float(os.getenv("EXAM_CATALOG_TTL", "300"))
+EXAM_CATALOG_SYNC_INTERVAL = float(os.getenv("EXAM_CATALOG_SYNC_INTERVAL", "5"))
+# Cada cuánto se vuelve a leer la fila de un examen antes de servir su
+# página (al corregir se lee siempre) y cuánto se recuerda un id inexistente.
+EXAM_VERIFY_INTERVAL = float(os.getenv("EXAM_VERIFY_INTERVAL", "15"))
+EXAM_MISSING_TTL = float(os.getenv("EXAM_MISSING_TTL", "10"))
+EXAM_MISSING_MAX = 10000
+
+
+class ExamCatalog:
+    # Índice exam_id -> (fila, examen parseado). Se carga una vez, se
+    # completa leyendo solo las filas nuevas cuando falta un id y se
+    # recarga entero en segundo plano cada EXAM_CATALOG_TTL segundos para
+    # recoger ediciones hechas directamente en la hoja.
+    def __init__(self, store: Storage, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._synced_rows = 0
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._reloading = False
+        self._puts_during_reload: Optional[Dict[str, Tuple[int, Dict[str, Any]]]] = None
+        self._synced_at = 0.0
+        self.version = 0
+        self._etag_memo: Tuple[int, str, Optional[datetime]] = (-1, "", None)
+        self._verified_at: Dict[str, float] = {}
+        self._missing: Dict[str, float] = {}
+
+    def _index_rows(self, index: Dict[str, Tuple[int, Dict[str, Any]]], rows: List[Tuple[int, List[Any]]]) -> None:
+        for n, r in rows:
+            exam_id = safe_get(r, 0, "")
+            if not exam_id:
+                continue
+            current = index.get(exam_id)
+            # Con ids repetidos gana la primera fila, igual que el escaneo lineal.
+            if current is None or current[0] >= n:
+                index[exam_id] = (n, _exam_from_row(r))
+
+    def ensure_loaded(self, blocking: bool = True) -> bool:
+        # blocking=False: si otro hilo ya está leyendo, no se espera y
+        # devuelve False.
+        if self._loaded:
+            if time.monotonic() - self._loaded_at >= self.ttl:
+                self._reload_in_background()
+            return True
+        if not self._sync_lock.acquire(blocking=blocking):
+            return False
+        try:
+            if not self._loaded:
+                self._full_load()
+        finally:
+            self._sync_lock.release()
+        return True
 
-    for r in rows:
-        if len(r) >= 1 and safe_get(r, 0, "") == exam_id:
+    def _full_load(self) -> None:
+        with self._lock:
+            self._puts_during_reload = {}
+        try:
+            rows = self.store.exams.rows(summary=True)
+            index: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+            self._index_rows(index, rows)
+            with self._lock:
+                index.update(self._puts_during_reload or {})
+                self._index = index
+                self._synced_rows = rows[-1][0] if rows else 0
+                self._loaded = True
+                self._loaded_at = self._synced_at = time.monotonic()
+                self.version += 1
+        finally:
+            with self._lock:
+                self._puts_during_reload = None
+
+    def _reload_in_background(self) -> None:
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
             try:
-                custom_questions = json.loads(safe_get(r, 5, "")) if safe_get(r, 5, "") else []
+                with self._sync_lock:
+                    self._full_load()
             except Exception:
-                custom_questions = []
+                app.logger.exception("No se pudo recargar el catálogo de exámenes")
+            finally:
+                with self._lock:
+                    self._reloading = False
 
-            if not isinstance(custom_questions, list):
-                custom_questions = []
+        threading.Thread(target=run, daemon=True).start()
 
-            questions = default_questions + custom_questions
+    def sync_new_rows(self, blocking: bool = True) -> bool:
+        if not self._sync_lock.acquire(blocking=blocking):
+            return False
+        try:
+            rows = self.store.exams.rows(self._synced_rows + 1, summary=True)
+            with self._lock:
+                self._index_rows(self._index, rows)
+                if rows:
+                    self._synced_rows = max(self._synced_rows, rows[-1][0])
+                self._synced_at = time.monotonic()
+                if rows:
+                    self.version += 1
+        finally:
+            self._sync_lock.release()
+        return True
+
+    def refresh(self, blocking: bool = True) -> bool:
+        # Para listados: recoge filas nuevas de otros workers como mucho
+        # cada EXAM_CATALOG_SYNC_INTERVAL segundos.
+        if not self.ensure_loaded(blocking):
+            return False
+        if time.monotonic() - self._synced_at >= EXAM_CATALOG_SYNC_INTERVAL:
+            return self.sync_new_rows(blocking)
+        return True
 
+    def etag(self) -> Tuple[str, Optional[datetime]]:
+        memo = self._etag_memo
+        if memo[0] == self.version:
+            return memo[1], memo[2]
+        version, entries = self.entries()
+        digest = hashlib.sha1()
+        for row, e in entries:
+            digest.update(f"{row}:{e['summary_etag']}\n".encode("utf-8"))
+        tag = digest.hexdigest()[:20]
+        last_modified = memo[2] if tag == memo[1] else datetime.now(UTC)
+        self._etag_memo = (version, tag, last_modified)
+        return tag, last_modified
+
+    def entries(self) -> Tuple[int, List[Tuple[int, Dict[str, Any]]]]:
+        with self._lock:
+            return self.version, sorted(self._index.values(), key=lambda x: x[0])
+
+    def lookup(self, exam_id: str, max_age: Optional[float] = None) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # max_age: si la fila se confirmó hace más de eso, se vuelve a leer
+        # entera para recoger ediciones de otros workers o de la hoja.
+        self.ensure_loaded()
+        entry = self._index.get(exam_id)
+        if entry is None and exam_id:
+            if self._known_missing(exam_id):
+                return None
+            # Puede haberlo creado otro worker: solo se leen las filas nuevas.
+            self.sync_new_rows()
+            entry = self._index.get(exam_id)
+            if entry is None:
+                self._remember_missing(exam_id)
+                return None
+        if entry is not None and self._stale(exam_id, max_age):
+            return self._verify(exam_id, entry)
+        if entry is not None and entry[1]["etag"] is None:
+            entry = self._load_questions(exam_id, entry)
+        return entry
+
+    def _stale(self, exam_id: str, max_age: Optional[float]) -> bool:
+        if max_age is None:
+            return False
+        return time.monotonic() - self._verified_at.get(exam_id, 0.0) >= max_age
+
+    def _known_missing(self, exam_id: str) -> bool:
+        until = self._missing.get(exam_id)
+        return until is not None and until > time.monotonic()
+
+    def _remember_missing(self, exam_id: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._missing) >= EXAM_MISSING_MAX:
+                self._missing = {k: t for k, t in self._missing.items() if t > now}
+                if len(self._missing) >= EXAM_MISSING_MAX:
+                    self._missing.clear()
+            self._missing[exam_id] = now + EXAM_MISSING_TTL
+
+    def _verify(self, exam_id: str, entry: Tuple[int, Dict[str, Any]]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # Relee la fila completa (A:N, una sola fila) y reemplaza la entrada
+        # si cambió; si la fila ya no es la del examen, se recarga el índice.
+        for _ in range(2):
+            row = entry[0]
+            values = self.store.exams.row_at(row)
+            if safe_get(values, 0, "") == exam_id:
+                fresh = (row, _exam_from_row(_padded(values, len(EXAM_COLUMNS))))
+                with self._lock:
+                    if entry[1]["etag"] != fresh[1]["etag"]:
+                        if self._index.get(exam_id) is entry:
+                            self._index[exam_id] = fresh
+                        self.version += 1
+                    else:
+                        fresh = entry
+                    self._verified_at[exam_id] = time.monotonic()
+                return fresh
+
+            with self._sync_lock:
+                self._full_load()
+            entry = self._index.get(exam_id)
+            if entry is None:
+                self._remember_missing(exam_id)
+                return None
+        return None
+
+    def _load_questions(self, exam_id: str, entry: Tuple[int, Dict[str, Any]]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # El índice se arma sin la columna F; las preguntas de un examen se
+        # leen (junto con A:E para confirmar el id) la primera vez que hacen
+        # falta. Si la fila ya no es la del examen, se recarga el índice.
+        for _ in range(2):
+            row, summary = entry
+            head = self.store.exams.head_at(row)
+            if safe_get(head, 0, "") == exam_id:
+                values = _padded(head, 6) + [summary[c] for c in EXAM_COLUMNS[6:]]
+                detailed = (row, _exam_from_row(values))
+                with self._lock:
+                    if self._index.get(exam_id) is entry:
+                        self._index[exam_id] = detailed
+                return detailed
+
+            with self._sync_lock:
+                self._full_load()
+            entry = self._index.get(exam_id)
+            if entry is None or entry[1]["etag"] is not None:
+                return entry
+        return None
+
+    def pending_ranges(self, exam_id: str, verify: bool = False,
+                       max_age: Optional[float] = None) -> List[str]:
+        # Lo que leerían lookup() (y locate() con verify) para este id.
+        if not self._loaded:
+            return self.store.exams.rows_ranges(summary=True)
+        entry = self._index.get(exam_id)
+        if entry is None:
+            if self._known_missing(exam_id):
+                return []
+            return self.store.exams.rows_ranges(self._synced_rows + 1, summary=True)
+        if self._stale(exam_id, max_age):
+            ranges = self.store.exams.row_ranges(entry[0])
+        elif entry[1]["etag"] is None:
+            ranges = self.store.exams.head_ranges(entry[0])
+        else:
+            ranges = []
+        return ranges + (self.store.exams.exam_id_ranges(entry[0]) if verify else [])
+
+    def locate(self, exam_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        # Antes de escribir en una fila se confirma leyendo solo su exam_id:
+        # si alguien borró o movió filas en la hoja, se recarga el índice.
+        entry = self.lookup(exam_id)
+        if entry is None:
+            return None
+        if self.store.exams.exam_id_at(entry[0]) == exam_id:
+            return entry
+        with self._sync_lock:
+            self._full_load()
+        return self._index.get(exam_id)
+
+    def cached(self, exam_id: str) -> bool:
+        # Sin leer nada: si el examen ya tiene sus preguntas en el índice.
+        entry = self._index.get(exam_id)
+        return entry is not None and entry[1]["etag"] is not None
+
+    def put(self, exam_id: str, row: Optional[int], values: List[Any]) -> None:
+        if row is None:
+            return
+        entry = (row, _exam_from_row(values))
+        with self._lock:
+            self._index[exam_id] = entry
+            self._verified_at[exam_id] = time.monotonic()
+            self._missing.pop(exam_id, None)
+            self.version += 1
+            if self._puts_during_reload is not None:
+                self._puts_during_reload[exam_id] = entry
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
             return {
-                "id": safe_get(r, 0, ""),
-                "facilitator": safe_get(r, 1, ""),
-                "facilitator_cedula": safe_get(r, 2, ""),
-                "course": safe_get(r, 3, ""),
-                "created_at": safe_get(r, 4, ""),
-                "questions": questions,
-                "default_questions": default_questions,
-                "custom_questions": custom_questions,
-                "course_date": safe_get(r, 6, ""),
-                "course_duration": safe_get(r, 7, ""),
-                "num_invites": safe_get(r, 8, ""),
-                "facilitator_email": safe_get(r, 9, ""),
-                "system_area": safe_get(r, 10, ""),
-                "system_title": safe_get(r, 11, ""),
-                "course_description": safe_get(r, 12, ""),
-                "exam_url": safe_get(r, 13, ""),
+                "loaded": self._loaded,
+                "exams": len(self._index),
+                "synced_rows": self._synced_rows,
+                "version": self.version,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded else None,
             }
-    return None
 
 
-def has_submission(service, exam_id: str, cedula: str) -> bool:
-    rows = _load_responses_rows(service)
-    for r in rows:
-        if len(r) >= 4 and safe_get(r, 0, "") == exam_id and safe_get(r, 3, "") == cedula:
+EXAM_CATALOG = ExamCatalog(STORAGE, EXAM_CATALOG_TTL)
+
+
+class ExamFilterIndex:
+    # Claves de búsqueda normalizadas una sola vez por examen, cubetas por
+    # área y título exactos y fechas ordenadas para buscar rangos con bisect.
+    def __init__(self, entries: List[Tuple[int, Dict[str, Any]]]):
+        self.items: List[Dict[str, Any]] = []
+        self.areas: List[str] = []
+        self.titles: List[str] = []
+        self.haystacks: List[str] = []
+        self.course_dates: List[str] = []
+        self.by_area: Dict[str, List[int]] = {}
+        self.by_title: Dict[str, List[int]] = {}
+
+        for _, e in entries:
+            exam_id = e["id"]
+            if not exam_id or normalize_text(exam_id) in ("EXAM_ID", "ID"):
+                continue
+
+            pos = len(self.items)
+            area = e["system_area"]
+            title = e["system_title"]
+            n_area = normalize_text(area)
+            n_title = normalize_text(title)
+
+            self.items.append({
+                "id": exam_id,
+                "facilitator": e["facilitator"],
+                "facilitator_cedula": e["facilitator_cedula"],
+                "course": e["course"],
+                "created_at": e["created_at"],
+                "course_description": e["course_description"],
+                "course_date": e["course_date"],
+                "course_duration": e["course_duration"],
+                "num_invites": e["num_invites"],
+                "facilitator_email": e["facilitator_email"],
+                "system_area": area,
+                "system_title": title,
+                "exam_url": e["exam_url"],
+            })
+            self.areas.append(n_area)
+            self.titles.append(n_title)
+            self.haystacks.append(normalize_text(
+                f"{e['course']} {e['facilitator']} {e['course_description']} {title} {area}"
+            ))
+            self.course_dates.append(safe_str(e["course_date"], 20).strip())
+            self.by_area.setdefault(n_area, []).append(pos)
+            self.by_title.setdefault(n_title, []).append(pos)
+
+        dated = sorted((cd, pos) for pos, cd in enumerate(self.course_dates) if cd)
+        self.sorted_dates = [cd for cd, _ in dated]
+        self.sorted_date_pos = [pos for _, pos in dated]
+
+    def query(self, n_area: str, n_title: str, n_q: str, date_from: str, date_to: str) -> List[int]:
+        candidates: List[List[int]] = []
+        if n_area:
+            candidates.append(self.by_area.get(n_area, []))
+        if n_title:
+            candidates.append(self.by_title.get(n_title, []))
+        if date_from or date_to:
+            lo = bisect.bisect_left(self.sorted_dates, date_from) if date_from else 0
+            hi = bisect.bisect_right(self.sorted_dates, date_to) if date_to else len(self.sorted_dates)
+            candidates.append(self.sorted_date_pos[lo:hi])
+
+        # Se recorre el conjunto candidato más pequeño y se comprueba el resto.
+        positions = min(candidates, key=len) if candidates else range(len(self.items))
+        out: List[int] = []
+        for pos in positions:
+            if n_area and self.areas[pos] != n_area:
+                continue
+            if n_title and self.titles[pos] != n_title:
+                continue
+            if date_from or date_to:
+                cd = self.course_dates[pos]
+                if not cd or (date_from and cd < date_from) or (date_to and cd > date_to):
+                    continue
+            if n_q and n_q not in self.haystacks[pos]:
+                continue
+            out.append(pos)
+
+        # Más recientes primero, igual que el listado por filas invertido.
+        out.sort(reverse=True)
+        return out
+
+
+_EXAM_FILTER_INDEX: List[Any] = [-1, None]
+_EXAM_FILTER_INDEX_LOCK = threading.Lock()
+
+
+def get_exam_filter_index() -> ExamFilterIndex:
+    global _EXAM_FILTER_INDEX
+    EXAM_CATALOG.refresh()
+    if _EXAM_FILTER_INDEX[0] == EXAM_CATALOG.version:
+        return _EXAM_FILTER_INDEX[1]
+
+    with _EXAM_FILTER_INDEX_LOCK:
+        version, entries = EXAM_CATALOG.entries()
+        if _EXAM_FILTER_INDEX[0] != version:
+            _EXAM_FILTER_INDEX = [version, ExamFilterIndex(entries)]
+        return _EXAM_FILTER_INDEX[1]
+
+
+def _exam_view(e: Dict[str, Any], default_questions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Las preguntas del catálogo y las fijas se comparten entre peticiones:
+    # cada vista lleva su propia copia.
+    default_questions = copy.deepcopy(default_questions)
+    custom_questions = copy.deepcopy(e["custom_questions"])
+    return {
+        "id": e["id"],
+        "facilitator": e["facilitator"],
+        "facilitator_cedula": e["facilitator_cedula"],
+        "course": e["course"],
+        "created_at": e["created_at"],
+        "questions": default_questions + custom_questions,
+        "default_questions": default_questions,
+        "custom_questions": custom_questions,
+        "course_date": e["course_date"],
+        "course_duration": e["course_duration"],
+        "num_invites": e["num_invites"],
+        "facilitator_email": e["facilitator_email"],
+        "system_area": e["system_area"],
+        "system_title": e["system_title"],
+        "course_description": e["course_description"],
+        "exam_url": e["exam_url"],
+    }
+
+
+def get_exam_by_id(exam_id: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    entry = EXAM_CATALOG.lookup(exam_id, max_age)
+    if entry is None:
+        return None
+    return _exam_view(entry[1], _shared_default_questions())
+
+
+class SubmissionIndex:
+    # Conjunto de (exam_id, cedula) ya enviados. Arranca leyendo solo las
+    # columnas A y D de Responses y después solo las filas nuevas.
+    def __init__(self, store: Storage):
+        self.store = store
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._keys: set = set()
+        self._synced_rows = 0
+        self._loaded = False
+        self._key_locks: Dict[Tuple[str, str], List[Any]] = {}
+
+    def sync(self, not_before: Optional[float] = None) -> None:
+        # Los envíos concurrentes que no encuentran su clave comparten la
+        # misma lectura de filas nuevas, siempre que haya empezado después de
+        # que llegaran (not_before): una lectura anterior puede no ver el
+        # append que otro worker hizo mientras tanto.
+        def run():
+            with self._sync_lock:
+                pairs, last_row = self.store.responses.keys(self._synced_rows + 1)
+                with self._lock:
+                    self._keys.update((e, c) for e, c in pairs if e and c)
+                    self._synced_rows = max(self._synced_rows, last_row)
+                self._loaded = True
+
+        SHEETS_FLIGHTS.do(
+            ("sync", "Responses!A:D"),
+            run,
+            group="Responses",
+            timeout=SHEETS_FLIGHT_TIMEOUTS["Responses"],
+            not_before=not_before
+        )
+
+    def contains(self, exam_id: str, cedula: str) -> bool:
+        key = (exam_id, cedula)
+        if self._loaded and key in self._keys:
             return True
-    return False
+        # Otro worker pudo haber escrito: se leen solo las filas nuevas.
+        self.sync(_reads_not_before())
+        return key in self._keys
+
+    def pending_ranges(self, exam_id: str, cedula: str) -> List[str]:
+        if self._loaded and (exam_id, cedula) in self._keys:
+            return []
+        return self.store.responses.keys_ranges(self._synced_rows + 1)
+
+    def add(self, exam_id: str, cedula: str) -> None:
+        with self._lock:
+            self._keys.add((exam_id, cedula))
+
+    @contextmanager
+    def key_lock(self, exam_id: str, cedula: str):
+        key = (exam_id, cedula)
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = [threading.Lock(), 0]
+                self._key_locks[key] = entry
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "submissions": len(self._keys),
+                "synced_rows": self._synced_rows,
+                "locked_keys": len(self._key_locks),
+            }
+
+
+SUBMISSIONS = SubmissionIndex(STORAGE)
+
+
+def has_submission(exam_id: str, cedula: str) -> bool:
+    # Los envíos encolados aún no están en la hoja pero cuentan igual.
+    if offload(RESPONSES_QUEUE.contains, exam_id, cedula):
+        return True
+    return SUBMISSIONS.contains(exam_id, cedula)
+
+
+def prefetch_exam_reads(exam_id: str, cedula: str = "", max_age: Optional[float] = None) -> None:
+    # Config, fila del examen y claves de Responses que falten, en una sola
+    # llamada a Sheets en vez de una por caché.
+    ranges = CONFIG_CACHE.pending_ranges() + EXAM_CATALOG.pending_ranges(exam_id, max_age=max_age)
+    if cedula:
+        ranges += SUBMISSIONS.pending_ranges(exam_id, cedula)
+    prefetch_reads(ranges)
+
+
+def load_exam_for_submit(exam_id: str, cedula: str) -> Optional[Dict[str, Any]]:
+    # En modo asíncrono las claves nuevas de Responses (la lectura que más
+    # crece con la hoja) se piden en paralelo y el examen no las espera para
+    # resolverse; con el worker sync va todo en un solo batchGet. La fila del
+    # examen se relee siempre: la clave de respuestas puede haber cambiado en
+    # otro worker después de que este la cacheara.
+    if not async_worker():
+        prefetch_exam_reads(exam_id, cedula, max_age=0)
+        return get_exam_by_id(exam_id, max_age=0)
+
+    def exam_side():
+        prefetch_reads(CONFIG_CACHE.pending_ranges() + EXAM_CATALOG.pending_ranges(exam_id, max_age=0))
+        return get_exam_by_id(exam_id, max_age=0)
+
+    exam, _ = run_concurrently(
+        exam_side,
+        lambda: prefetch_reads(SUBMISSIONS.pending_ranges(exam_id, cedula))
+    )
+    return exam
+
+
+_EXAM_LIST_MEMO: List[Any] = [-1, []]
 
 
-def list_exams(service) -> List[Dict[str, Any]]:
-    rows = _load_exams_rows(service)
+def list_exams() -> List[Dict[str, Any]]:
+    global _EXAM_LIST_MEMO
+    EXAM_CATALOG.refresh()
+    version, entries = EXAM_CATALOG.entries()
+    if _EXAM_LIST_MEMO[0] == version:
+        return _EXAM_LIST_MEMO[1]
+
     out: List[Dict[str, Any]] = []
-    for r in rows:
-        if len(r) >= 4:
-            exam_id = safe_get(r, 0, "").strip()
+    for _, e in entries:
+        if e["row_len"] >= 4:
+            exam_id = e["id"]
             if not exam_id or normalize_text(exam_id) in ("EXAM_ID", "ID"):
                 continue
             out.append({
                 "id": exam_id,
-                "facilitator": safe_get(r, 1, ""),
-                "facilitator_cedula": safe_get(r, 2, ""),
-                "course": safe_get(r, 3, ""),
-                "created_at": safe_get(r, 4, ""),
-                "system_area": safe_get(r, 10, ""),
-                "system_title": safe_get(r, 11, ""),
-                "course_date": safe_get(r, 6, ""),
-                "exam_url": safe_get(r, 13, ""),
+                "facilitator": e["facilitator"],
+                "facilitator_cedula": e["facilitator_cedula"],
+                "course": e["course"],
+                "created_at": e["created_at"],
+                "system_area": e["system_area"],
+                "system_title": e["system_title"],
+                "course_date": e["course_date"],
+                "num_invites": e["num_invites"],
+                "exam_url": e["exam_url"],
             })
     out.reverse()
+    _EXAM_LIST_MEMO = [version, out]
+    return out
+
+
+# =========================================================
+# RESPUESTAS: ESCRITURA DIFERIDA (write-behind)
+# =========================================================
+RESPONSES_WRITE_BEHIND = os.getenv("RESPONSES_WRITE_BEHIND", "0") == "1"
+RESPONSES_FLUSH_INTERVAL = float(os.getenv("RESPONSES_FLUSH_INTERVAL", "2"))
+RESPONSES_FLUSH_BATCH = int(os.getenv("RESPONSES_FLUSH_BATCH", "500"))
+RESPONSES_FLUSH_MAX_BACKOFF = float(os.getenv("RESPONSES_FLUSH_MAX_BACKOFF", "120"))
+RESPONSES_CLAIM_TIMEOUT = float(os.getenv("RESPONSES_CLAIM_TIMEOUT", "300"))
+
+
+class ResponseQueue:
+    # Cola durable en SQLite (instance/). El envío se confirma cuando la fila
+    # está en disco; un hilo por proceso la vuelca a Sheets en lotes con un
+    # solo append. Las filas se "reclaman" antes de enviarlas para que varios
+    # workers de gunicorn no suban la misma fila; si un proceso muere con
+    # filas reclamadas, otro las retoma pasado RESPONSES_CLAIM_TIMEOUT.
+    # Un append que falló puede haber llegado igual a la hoja: al reintentar
+    # se descartan las filas cuyo (exam_id, cedula), que solo puede enviarse
+    # una vez, ya está en Responses.
+    def __init__(self, path: str, enabled: bool):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+        self._initialized = False
+        self.stats = {
+            "enqueued": 0,
+            "flushed_rows": 0,
+            "duplicates_skipped": 0,
+            "flush_calls": 0,
+            "flush_errors": 0,
+            "last_error": "",
+            "last_flush_at": "",
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def _init_db(self) -> None:
+        if self._initialized:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_responses ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " exam_id TEXT NOT NULL,"
+                " cedula TEXT NOT NULL,"
+                " row_json TEXT NOT NULL,"
+                " queued_at REAL NOT NULL,"
+                " claimed_by TEXT,"
+                " claimed_at REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(pending_responses)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE pending_responses ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pending_responses_key"
+                " ON pending_responses (exam_id, cedula)"
+            )
+        finally:
+            conn.close()
+        self._initialized = True
+
+    def ensure_started(self) -> None:
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._init_db()
+            self._pid = os.getpid()
+            # Al arrancar, las filas que quedaron en la cola se reenvían.
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def enqueue(self, exam_id: str, cedula: str, row: List[Any]) -> None:
+        self.ensure_started()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO pending_responses (exam_id, cedula, row_json, queued_at) VALUES (?, ?, ?, ?)",
+                (exam_id, cedula, json.dumps(row, ensure_ascii=False), time.time())
+            )
+        finally:
+            conn.close()
+        with self._lock:
+            self.stats["enqueued"] += 1
+
+    def contains(self, exam_id: str, cedula: str) -> bool:
+        if not self.enabled:
+            return False
+        self.ensure_started()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM pending_responses WHERE exam_id = ? AND cedula = ? LIMIT 1",
+                (exam_id, cedula)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row is not None
+
+    def pending(self) -> int:
+        if not self.enabled:
+            return 0
+        self.ensure_started()
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM pending_responses").fetchone()[0]
+        finally:
+            conn.close()
+
+    def pending_rows(self, exam_id: str) -> List[List[Any]]:
+        if not self.enabled:
+            return []
+        self.ensure_started()
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "SELECT row_json FROM pending_responses WHERE exam_id = ? ORDER BY id",
+                (exam_id,)
+            )
+            return [json.loads(r[0]) for r in cur]
+        finally:
+            conn.close()
+
+    def _claim(self, conn: sqlite3.Connection) -> List[Tuple[int, str, str, str, int]]:
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, row_json, exam_id, cedula, attempts FROM pending_responses"
+                " WHERE claimed_by IS NULL OR claimed_at < ?"
+                " ORDER BY id LIMIT ?",
+                (now - RESPONSES_CLAIM_TIMEOUT, RESPONSES_FLUSH_BATCH)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE pending_responses SET claimed_by = ?, claimed_at = ?, attempts = attempts + 1"
+                    " WHERE id = ?",
+                    [(owner, now, r[0]) for r in rows]
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def flush_once(self) -> int:
+        conn = self._connect()
+        try:
+            claimed = self._claim(conn)
+            if not claimed:
+                return 0
+            try:
+                rows = [r for r in claimed if not r[4]]
+                retried = [r for r in claimed if r[4]]
+                if retried:
+                    present = set(STORAGE.responses.keys()[0])
+                    rows += [r for r in retried if (r[2], r[3]) not in present]
+                    rows.sort(key=lambda r: r[0])
+                if rows:
+                    STORAGE.responses.append([json.loads(r[1]) for r in rows])
+            except Exception:
+                conn.executemany(
+                    "UPDATE pending_responses SET claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+                    [(r[0],) for r in claimed]
+                )
+                raise
+            conn.executemany("DELETE FROM pending_responses WHERE id = ?", [(r[0],) for r in claimed])
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.stats["flushed_rows"] += len(rows)
+            self.stats["duplicates_skipped"] += len(claimed) - len(rows)
+            self.stats["flush_calls"] += 1
+            self.stats["last_flush_at"] = datetime.now(UTC).isoformat()
+        return len(claimed)
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            if failures:
+                delay = min(RESPONSES_FLUSH_MAX_BACKOFF, RESPONSES_FLUSH_INTERVAL * (2 ** failures))
+                delay *= random.uniform(0.5, 1.5)
+            else:
+                delay = RESPONSES_FLUSH_INTERVAL
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                # Se sigue vaciando mientras haya lotes completos.
+                with sheets_lane("submit"):
+                    while self.flush_once() >= RESPONSES_FLUSH_BATCH:
+                        pass
+                failures = 0
+            except Exception as e:
+                failures = min(failures + 1, 16)
+                with self._lock:
+                    self.stats["flush_errors"] += 1
+                    self.stats["last_error"] = str(e)[:300]
+                app.logger.warning("No se pudieron volcar respuestas a Sheets: %s", e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._lock:
+            stats = dict(self.stats)
+        return {"enabled": True, "pending": self.pending(), **stats}
+
+
+RESPONSES_QUEUE = ResponseQueue(
+    os.path.join(app.instance_path, "responses_queue.sqlite3"),
+    RESPONSES_WRITE_BEHIND
+)
+RESPONSES_QUEUE.ensure_started()
+
+
+@app.before_request
+def _start_response_queue():
+    RESPONSES_QUEUE.ensure_started()
+
+
+def append_response_row(exam_id: str, cedula: str, row: List[Any]) -> None:
+    if RESPONSES_QUEUE.enabled:
+        offload(RESPONSES_QUEUE.enqueue, exam_id, cedula, row)
+        return
+
+    STORAGE.responses.append([row])
+
+
+# =========================================================
+# ENVÍOS IDEMPOTENTES
+# =========================================================
+# La página del examen reintenta el envío (cola offline) con el mismo
+# Idempotency-Key; el resultado del primer envío se guarda y los reintentos
+# lo reciben tal cual, sin calificar ni tocar Sheets. Antes de calificar se
+# reserva la clave con un recibo vacío: un duplicado simultáneo (en este u
+# otro worker) espera ese recibo en vez de chocar con el 409. La misma clave
+# con otro contenido es un error del cliente (422).
+SUBMIT_RECEIPTS_TTL = float(os.getenv("SUBMIT_RECEIPTS_TTL", str(7 * 24 * 3600)))
+SUBMIT_RECEIPT_WAIT = float(os.getenv("SUBMIT_RECEIPT_WAIT", "20"))
+# Un recibo vacío más viejo que esto quedó de un worker que murió calificando.
+SUBMIT_RECEIPT_PENDING_TTL = float(os.getenv("SUBMIT_RECEIPT_PENDING_TTL", "120"))
+IDEMPOTENCY_KEY_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class SubmitReceipts:
+    # SQLite en instance/, compartido por los workers del host. Con varios
+    # hosts, un reintento que cae en otro recibe el 409 de siempre.
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.stats = {"stored": 0, "replayed": 0, "purged": 0, "waited": 0, "conflicts": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        self._init_db()
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _init_db(self) -> None:
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS submit_receipts ("
+                    " idem_key TEXT PRIMARY KEY,"
+                    " exam_id TEXT NOT NULL,"
+                    " cedula TEXT NOT NULL,"
+                    " result_json TEXT NOT NULL,"
+                    " created_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_submit_receipts_created"
+                    " ON submit_receipts (created_at)"
+                )
+                # result_json = '' es un envío que se está calificando.
+                columns = {r[1] for r in conn.execute("PRAGMA table_info(submit_receipts)")}
+                if "payload_hash" not in columns:
+                    conn.execute("ALTER TABLE submit_receipts ADD COLUMN payload_hash TEXT NOT NULL DEFAULT ''")
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def begin(self, key: str, exam_id: str, cedula: str, payload_hash: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        # En una sola transacción: "replay" con el resultado guardado,
+        # "conflict" si la clave vino con otro contenido, "pending" si otro
+        # envío con la misma clave se está calificando, u "owner" si este
+        # reservó la clave y debe calificar.
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT exam_id, cedula, payload_hash, result_json, created_at FROM submit_receipts"
+                    " WHERE idem_key = ?",
+                    (key,)
+                ).fetchone()
+                state, result = "owner", None
+                if row is not None and row[4] >= now - self.ttl:
+                    # Los recibos anteriores al hash solo se comparan por examen y cédula.
+                    if (row[0], row[1]) != (exam_id, cedula) or (row[2] and row[2] != payload_hash):
+                        state = "conflict"
+                    elif row[3]:
+                        state, result = "replay", json.loads(row[3])
+                    elif row[4] >= now - SUBMIT_RECEIPT_PENDING_TTL:
+                        state = "pending"
+                if state == "owner":
+                    conn.execute(
+                        "INSERT OR REPLACE INTO submit_receipts"
+                        " (idem_key, exam_id, cedula, payload_hash, result_json, created_at)"
+                        " VALUES (?, ?, ?, ?, '', ?)",
+                        (key, exam_id, cedula, payload_hash, now)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        with self._lock:
+            if state == "replay":
+                self.stats["replayed"] += 1
+            elif state == "conflict":
+                self.stats["conflicts"] += 1
+        return state, result
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict[str, Any]]:
+        # Espera a que quien reservó la clave deje el resultado. None si no
+        # llega a tiempo o si se liberó la reserva (el envío falló).
+        with self._lock:
+            self.stats["waited"] += 1
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            row = offload(self._result_row, key)
+            if row is None:
+                return None
+            if row[0]:
+                with self._lock:
+                    self.stats["replayed"] += 1
+                return json.loads(row[0])
+        return None
+
+    def _result_row(self, key: str) -> Optional[Tuple[str]]:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT result_json FROM submit_receipts WHERE idem_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+
+    def abandon(self, key: str) -> None:
+        # Libera una reserva sin resultado; no toca recibos ya guardados.
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM submit_receipts WHERE idem_key = ? AND result_json = ''", (key,))
+        finally:
+            conn.close()
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE submit_receipts SET result_json = ?, created_at = ? WHERE idem_key = ?",
+                (json.dumps(result, ensure_ascii=False), now, key)
+            )
+            # Limpieza ocasional de recibos vencidos.
+            purged = 0
+            if random.random() < 0.01:
+                purged = conn.execute(
+                    "DELETE FROM submit_receipts WHERE created_at < ?", (now - self.ttl,)
+                ).rowcount
+        finally:
+            conn.close()
+        with self._lock:
+            self.stats["stored"] += 1
+            self.stats["purged"] += purged
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ttl_s": self.ttl, **self.stats}
+
+
+SUBMIT_RECEIPTS = SubmitReceipts(
+    os.path.join(app.instance_path, "submit_receipts.sqlite3"),
+    SUBMIT_RECEIPTS_TTL
+)
+
+
+def replayed_submit(result: Dict[str, Any]) -> Response:
+    resp = jsonify(result)
+    resp.headers["Idempotent-Replayed"] = "true"
+    return resp
+
+
+# =========================================================
+# CALIFICACIÓN (plan compilado por examen)
+# =========================================================
+GRADE_NONE = 0
+GRADE_SINGLE = 1
+GRADE_MULTI = 2
+
+ANSWER_COLUMNS = {
+    "turno": "Turno",
+    "gerencia": "Gerencia",
+    "area": "Área",
+    "nivel_antes": "¿Cómo calificarías tu nivel de conocimiento sobre el tema antes de iniciar la formación?",
+    "nivel": "¿Nivel de conocimiento del tema de la formación?",
+    "calif": "De una escala de 1 a 5 cómo calificas el entrenamiento proporcionado por el Instructor.",
+    "comentarios": "Tienes alguna sugerencia, aporte o comentarios sobre el entrenamiento recibido?",
+}
+
+
+def compile_grading_plan(questions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    items: List[Tuple[bool, int, str, str, Any, Any]] = []
+
+    for q in questions:
+        qtype = q.get("type")
+        title = safe_str(q.get("title"), 300)
+        type_str = safe_str(q.get("type"), 20)
+        is_check = qtype == "check"
+        kind, expected, expected_set = GRADE_NONE, None, None
+
+        if q.get("scored", True) is not True:
+            pass
+
+        elif qtype in ("multiple", "true_false"):
+            correct_idx = q.get("correct", None)
+            options = q.get("options", [])
+            if isinstance(correct_idx, int) and isinstance(options, list) and 0 <= correct_idx < len(options):
+                kind = GRADE_SINGLE
+                expected = safe_str(options[correct_idx], 500)
+
+        elif is_check:
+            correct_list = q.get("correct", None)
+            options = q.get("options", [])
+            if isinstance(correct_list, list) and isinstance(options, list):
+                if all(isinstance(idx, int) and 0 <= idx < len(options) for idx in correct_list):
+                    kind = GRADE_MULTI
+                    expected = [safe_str(options[idx], 500) for idx in correct_list]
+                    expected_set = frozenset(expected)
+
+        items.append((is_check, kind, title, type_str, expected, expected_set))
+
+    # Primer índice cuyo título normalizado coincide.
+    normalized_titles = [normalize_text(safe_str(q.get("title"), 300)) for q in questions]
+    answer_index: Dict[str, Optional[int]] = {}
+    for name, title in ANSWER_COLUMNS.items():
+        wanted = normalize_text(title)
+        answer_index[name] = next((i for i, t in enumerate(normalized_titles) if t == wanted), None)
+
+    return {"items": items, "answer_index": answer_index}
+
+
+_GRADING_PLANS: Dict[str, Tuple[List[Any], Dict[str, Any]]] = {}
+_GRADING_PLANS_LOCK = threading.Lock()
+
+
+def get_grading_plan(exam: Dict[str, Any]) -> Dict[str, Any]:
+    # El plan sigue vigente mientras las preguntas sean iguales. Cada vista
+    # del examen es una copia, así que se compara el contenido con una copia
+    # propia del plan.
+    questions = exam.get("questions", [])
+    cached = _GRADING_PLANS.get(exam["id"])
+    if cached and cached[0] == questions:
+        return cached[1]
+
+    plan = compile_grading_plan(questions)
+    with _GRADING_PLANS_LOCK:
+        _GRADING_PLANS[exam["id"]] = (copy.deepcopy(questions), plan)
+    return plan
+
+
+def grade_answers(plan: Dict[str, Any], answers: List[Any]) -> Tuple[List[Any], int, int, List[Dict[str, Any]]]:
+    cleaned_answers: List[Any] = []
+    details: List[Dict[str, Any]] = []
+    score = 0
+    total = 0
+
+    for i, (is_check, kind, title, type_str, expected, expected_set) in enumerate(plan["items"]):
+        a = answers[i]
+
+        if is_check:
+            value = safe_list_of_str(a, item_max_len=200, max_items=50)
+            if not value and isinstance(a, str) and a.strip():
+                value = [safe_str(a, 200)]
+        else:
+            value = safe_str(a, 500)
+        cleaned_answers.append(value)
+
+        if kind == GRADE_SINGLE:
+            total += POINTS_PER_QUESTION
+            is_ok = value == expected
+            if is_ok:
+                score += POINTS_PER_QUESTION
+            details.append({
+                "index": i,
+                "title": title,
+                "type": type_str,
+                "is_correct": is_ok,
+                "user_value": value,
+                "correct_value": expected
+            })
+
+        elif kind == GRADE_MULTI:
+            total += POINTS_PER_QUESTION
+            user_clean = [safe_str(x, 500) for x in value if safe_str(x, 500)]
+            is_ok = set(user_clean) == expected_set
+            if is_ok:
+                score += POINTS_PER_QUESTION
+            details.append({
+                "index": i,
+                "title": title,
+                "type": type_str,
+                "is_correct": is_ok,
+                "user_value": user_clean,
+                "correct_value": expected
+            })
+
+        else:
+            details.append({
+                "index": i,
+                "title": title,
+                "type": type_str,
+                "is_correct": None,
+                "user_value": value,
+                "correct_value": None
+            })
+
+    return cleaned_answers, score, total, details
+
+
+def planned_answer(plan: Dict[str, Any], answers: List[Any], name: str, default: Any = "") -> Any:
+    idx = plan["answer_index"].get(name)
+    if idx is None or idx >= len(answers):
+        return default
+    return answers[idx]
+
+
+# =========================================================
+# ANALÍTICA Y PARTICIPACIÓN POR EXAMEN
+# =========================================================
+# Agregados por examen que se actualizan con cada envío y se completan con
+# las filas nuevas de Responses (de otros workers) sin releer el histórico.
+# Cada (exam_id, cédula) se cuenta una sola vez, venga del envío local o de
+# la hoja. Sirven al análisis por pregunta y a los contadores de
+# participación de los listados.
+ANALYTICS_SYNC_INTERVAL = float(os.getenv("ANALYTICS_SYNC_INTERVAL", "5"))
+ANALYTICS_MAX_DISTINCT = 50
+SCORE_BUCKETS = 10
+
+
+def _new_exam_aggregate() -> Dict[str, Any]:
+    return {
+        "participants": 0,
+        "graded_participants": 0,
+        "percent_sum": 0.0,
+        "percents": [],
+        "buckets": [0] * SCORE_BUCKETS,
+        "last_submission_at": "",
+        "by_turno": {},
+        "by_gerencia": {},
+        "questions": {},
+        # Las estadísticas por pregunta van por índice: valen para la versión
+        # de las preguntas con este hash y solo cuentan envíos desde
+        # answers_since (al editar el examen se empiezan de cero).
+        "questions_hash": None,
+        "answers_since": "",
+    }
+
+
+def _percent_value(percent: Any) -> Optional[float]:
+    try:
+        return float(percent)
+    except (TypeError, ValueError):
+        return None
+
+
+class ExamAnalytics:
+    def __init__(self, store: Storage):
+        self.store = store
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._exams: Dict[str, Dict[str, Any]] = {}
+        # Envíos ya sumados a los contadores y a las estadísticas por
+        # pregunta; los contadores pueden ir por delante (lectura proyectada).
+        self._counted: set = set()
+        self._answered: set = set()
+        self._synced_rows = 0
+        self._synced_at = 0.0
+        self._counted_rows = 0
+        self._counted_at = 0.0
+        self._refreshing = False
+        self.version = 0
+        self.changed_at: Optional[datetime] = None
+        self._participation_memo: Tuple[int, Dict[str, Dict[str, Any]], str] = (-1, {}, "")
+
+    def _aggregate(self, exam_id: str) -> Dict[str, Any]:
+        agg = self._exams.get(exam_id)
+        if agg is None:
+            agg = self._exams[exam_id] = _new_exam_aggregate()
+        return agg
+
+    def _fold_counts(self, exam_id: str, cedula: str, percent: Any,
+                     turno: str, gerencia: str, submitted_at: str) -> None:
+        key = (exam_id, cedula)
+        if key in self._counted:
+            return
+        self._counted.add(key)
+        self.version += 1
+        self.changed_at = datetime.now(UTC)
+
+        agg = self._aggregate(exam_id)
+        agg["participants"] += 1
+        agg["last_submission_at"] = max(agg["last_submission_at"], submitted_at)
+        agg["by_turno"][turno] = agg["by_turno"].get(turno, 0) + 1
+        agg["by_gerencia"][gerencia] = agg["by_gerencia"].get(gerencia, 0) + 1
+
+        pct = _percent_value(percent)
+        if pct is not None:
+            agg["graded_participants"] += 1
+            agg["percent_sum"] += pct
+            bisect.insort(agg["percents"], pct)
+            agg["buckets"][min(int(pct // SCORE_BUCKETS), SCORE_BUCKETS - 1)] += 1
+
+    def _fold_answers(self, exam_id: str, cedula: str, answers: List[Any], correct: set, failed: set,
+                      submitted_at: str) -> None:
+        key = (exam_id, cedula)
+        if key in self._answered:
+            return
+        self._answered.add(key)
+
+        agg = self._aggregate(exam_id)
+        if submitted_at < agg["answers_since"]:
+            return
+        for i, value in enumerate(answers):
+            q = agg["questions"].get(i)
+            if q is None:
+                q = agg["questions"][i] = {"answered": 0, "correct": 0, "incorrect": 0, "values": {}}
+            values = value if isinstance(value, list) else [value]
+            values = [safe_str(v, 200) for v in values if safe_str(v, 200)]
+            if values:
+                q["answered"] += 1
+            if i in correct:
+                q["correct"] += 1
+            elif i in failed:
+                q["incorrect"] += 1
+            hist = q["values"]
+            for v in values:
+                # Las respuestas libres no caben en un histograma: pasado el
+                # límite de valores distintos solo se cuentan los ya vistos.
+                if v in hist or len(hist) < ANALYTICS_MAX_DISTINCT:
+                    hist[v] = hist.get(v, 0) + 1
+
+    def record(self, exam_id: str, cedula: str, answers: List[Any], percent: Any,
+               details: List[Dict[str, Any]], turno: str, gerencia: str, submitted_at: str) -> None:
+        correct = {d.get("index") for d in details if d.get("is_correct") is True}
+        failed = {d.get("index") for d in details if d.get("is_correct") is False}
+        with self._lock:
+            self._fold_counts(exam_id, cedula, percent, turno, gerencia, submitted_at)
+            self._fold_answers(exam_id, cedula, answers, correct, failed, submitted_at)
+
+    def _fold_row(self, values: List[Any], answers: bool = True) -> None:
+        exam_id = safe_get(values, 0, "")
+        cedula = safe_get(values, 3, "")
+        if not exam_id or not cedula or normalize_text(exam_id) in ("EXAM_ID", "ID"):
+            return
+        self._fold_counts(
+            exam_id, cedula, safe_get(values, 16, ""),
+            safe_get(values, 4, ""), safe_get(values, 5, ""), safe_get(values, 13, "")
+        )
+        if not answers:
+            return
+        failed = {d.get("index") for d in _json_list(values[17] if len(values) > 17 else "") if isinstance(d, dict)}
+        correct = {d.get("index") for d in _json_list(values[18] if len(values) > 18 else "") if isinstance(d, dict)}
+        self._fold_answers(
+            exam_id, cedula, _json_list(values[12] if len(values) > 12 else ""), correct, failed,
+            safe_get(values, 13, "")
+        )
+
+    def reset_questions(self, exam_id: str, questions_hash: Optional[str] = None) -> None:
+        # Tras editar las preguntas, lo sumado por índice describe otras
+        # preguntas: se descarta y se cuenta solo lo que llegue desde ahora.
+        with self._lock:
+            agg = self._aggregate(exam_id)
+            agg["questions"] = {}
+            agg["questions_hash"] = questions_hash
+            agg["answers_since"] = datetime.now(UTC).isoformat()
+
+    def sync(self, force: bool = False) -> None:
+        # Filas completas (A:S): para el reporte por pregunta.
+        if not force and time.monotonic() - self._synced_at < ANALYTICS_SYNC_INTERVAL:
+            return
+        with self._sync_lock:
+            rows = self.store.responses.rows(self._synced_rows + 1)
+            with self._lock:
+                for _, values in rows:
+                    self._fold_row(values)
+                if rows:
+                    self._synced_rows = max(self._synced_rows, rows[-1][0])
+                    self._counted_rows = max(self._counted_rows, self._synced_rows)
+                self._synced_at = time.monotonic()
+
+    def sync_counts(self) -> None:
+        # Solo las columnas de los contadores de participación.
+        with self._sync_lock:
+            rows = self.store.responses.counter_rows(self._counted_rows + 1)
+            with self._lock:
+                for _, values in rows:
+                    self._fold_row(values, answers=False)
+                if rows:
+                    self._counted_rows = max(self._counted_rows, rows[-1][0])
+                self._counted_at = time.monotonic()
+
+    def refresh_counts_in_background(self) -> None:
+        # Los listados no esperan a Sheets: sirven lo ya sumado y, si toca,
+        # un hilo lee las filas nuevas (la primera vez, toda la hoja).
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._counted_at < ANALYTICS_SYNC_INTERVAL:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.sync_counts()
+            except Exception:
+                app.logger.exception("No se pudieron sincronizar los contadores de participación")
+            finally:
+                with self._lock:
+                    self._counted_at = time.monotonic()
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def rebuild(self) -> None:
+        # Reconstruye todo desde el histórico en una sola pasada.
+        with self._sync_lock:
+            rows = self.store.responses.rows()
+            with self._lock:
+                # Los cortes por edición se conservan: la hoja no guarda con
+                # qué versión de las preguntas se respondió cada fila.
+                kept = {
+                    exam_id: (agg["questions_hash"], agg["answers_since"])
+                    for exam_id, agg in self._exams.items() if agg["answers_since"]
+                }
+                self._exams = {}
+                for exam_id, (questions_hash, since) in kept.items():
+                    agg = self._aggregate(exam_id)
+                    agg["questions_hash"], agg["answers_since"] = questions_hash, since
+                self._counted = set()
+                self._answered = set()
+                self.version += 1
+                self.changed_at = datetime.now(UTC)
+                for _, values in rows:
+                    self._fold_row(values)
+                self._synced_rows = self._counted_rows = rows[-1][0] if rows else 0
+                self._synced_at = self._counted_at = time.monotonic()
+
+    def report(self, exam: Dict[str, Any]) -> Dict[str, Any]:
+        # Solo recorre las preguntas del examen: O(preguntas).
+        questions = exam.get("questions", [])
+        plan = get_grading_plan(exam)
+
+        # Preguntas cambiadas en otro worker o en la hoja: mismo corte que al
+        # editar por la API.
+        questions_hash = content_hash(questions)
+        agg = self._exams.get(exam["id"])
+        if agg is not None and agg["questions_hash"] not in (None, questions_hash):
+            self.reset_questions(exam["id"], questions_hash)
+
+        with self._lock:
+            agg = self._exams.get(exam["id"]) or _new_exam_aggregate()
+            if agg["questions_hash"] is None and exam["id"] in self._exams:
+                agg["questions_hash"] = questions_hash
+            participants = agg["participants"]
+            graded_participants = agg["graded_participants"]
+            percent_sum = agg["percent_sum"]
+            buckets = list(agg["buckets"])
+            stats = {i: {**q, "values": dict(q["values"])} for i, q in agg["questions"].items()}
+
+        items = []
+        for i, q in enumerate(questions):
+            _, kind, title, type_str, expected, expected_set = plan["items"][i]
+            st = stats.get(i) or {"answered": 0, "correct": 0, "incorrect": 0, "values": {}}
+            hist = st["values"]
+            graded = kind != GRADE_NONE
+            attempts = st["correct"] + st["incorrect"]
+
+            options = []
+            listed = set()
+            for opt in q.get("options", []) if isinstance(q.get("options"), list) else []:
+                value = safe_str(opt, 200)
+                listed.add(value)
+                count = hist.get(value, 0)
+                if kind == GRADE_SINGLE:
+                    is_correct = value == expected
+                elif kind == GRADE_MULTI:
+                    is_correct = value in expected_set
+                else:
+                    is_correct = None
+                options.append({
+                    "value": value,
+                    "count": count,
+                    "frequency": round(count / participants, 4) if participants else None,
+                    "is_correct": is_correct,
+                })
+
+            items.append({
+                "index": i,
+                "title": title,
+                "type": type_str,
+                "answered": st["answered"],
+                "graded": graded,
+                "attempts": attempts if graded else None,
+                "correct": st["correct"] if graded else None,
+                "incorrect": st["incorrect"] if graded else None,
+                # Índice de dificultad clásico: proporción de aciertos.
+                "difficulty": round(st["correct"] / attempts, 4) if graded and attempts else None,
+                "options": options,
+                "other_answers": sum(c for v, c in hist.items() if v not in listed) if options else None,
+            })
+
+        step = 100 // SCORE_BUCKETS
+        return {
+            "exam_id": exam["id"],
+            "participants": participants,
+            "average_percent": round(percent_sum / graded_participants, 2) if graded_participants else None,
+            "score_distribution": [
+                {"from": b * step, "to": 100 if b == SCORE_BUCKETS - 1 else (b + 1) * step - 1, "count": c}
+                for b, c in enumerate(buckets)
+            ],
+            "questions": items,
+        }
+
+    def participation(self) -> Tuple[Dict[str, Dict[str, Any]], str]:
+        # Contadores de todos los exámenes y su hash, recalculados solo
+        # cuando entra un envío nuevo.
+        memo = self._participation_memo
+        if memo[0] == self.version:
+            return memo[1], memo[2]
+
+        with self._lock:
+            version = self.version
+            out: Dict[str, Dict[str, Any]] = {}
+            for exam_id, agg in self._exams.items():
+                percents = agg["percents"]
+                n = len(percents)
+                if n:
+                    median = percents[n // 2] if n % 2 else (percents[n // 2 - 1] + percents[n // 2]) / 2
+                out[exam_id] = {
+                    "submissions": agg["participants"],
+                    "mean_percent": round(agg["percent_sum"] / n, 2) if n else None,
+                    "median_percent": round(median, 2) if n else None,
+                    "last_submission_at": agg["last_submission_at"],
+                    "by_turno": dict(agg["by_turno"]),
+                    "by_gerencia": dict(agg["by_gerencia"]),
+                }
+
+        tag = content_hash(out)
+        self._participation_memo = (version, out, tag)
+        return out, tag
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "exams": len(self._exams),
+                "responses": len(self._counted),
+                "synced_rows": self._synced_rows,
+                "counted_rows": self._counted_rows,
+                "version": self.version,
+            }
+
+
+ANALYTICS = ExamAnalytics(STORAGE)
+
+EMPTY_PARTICIPATION = {
+    "submissions": 0,
+    "mean_percent": None,
+    "median_percent": None,
+    "last_submission_at": "",
+    "by_turno": {},
+    "by_gerencia": {},
+}
+
+
+def _completion_rate(submissions: int, num_invites: Any) -> Optional[float]:
+    try:
+        invites = int(safe_str(num_invites, 20))
+    except ValueError:
+        return None
+    return round(submissions / invites, 4) if invites > 0 else None
+
+
+def participation_state(etag: str, last_modified: Optional[datetime]):
+    # Contadores ya sumados (se ponen al día en segundo plano, sin bloquear
+    # el listado) y la versión combinada catálogo + contadores para ETag /
+    # Last-Modified.
+    ANALYTICS.refresh_counts_in_background()
+    counters, counters_tag = ANALYTICS.participation()
+    changed_at = ANALYTICS.changed_at
+    if changed_at is not None and (last_modified is None or changed_at > last_modified):
+        last_modified = changed_at
+    return counters, content_hash([etag, counters_tag]), last_modified
+
+
+def with_participation(items: List[Dict[str, Any]], counters: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for item in items:
+        c = counters.get(item["id"], EMPTY_PARTICIPATION)
+        out.append({
+            **item,
+            **c,
+            "completion_rate": _completion_rate(c["submissions"], item.get("num_invites", "")),
+        })
     return out
 
 
-def answer_by_title(questions: List[Dict[str, Any]], answers: List[Any], title: str, default: Any = "") -> Any:
-    wanted = normalize_text(title)
-    for i, q in enumerate(questions):
-        if normalize_text(safe_str(q.get("title"), 300)) == wanted:
-            if 0 <= i < len(answers):
-                return answers[i]
-            break
-    return default
+# =========================================================
+# RESPUESTAS CONDICIONALES (ETag / Last-Modified)
+# =========================================================
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional_json(etag: str, last_modified: Optional[datetime], build_payload):
+    # Si el cliente ya tiene esta versión se responde 304 sin construir el cuerpo.
+    if _not_modified(etag, last_modified):
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify(build_payload())
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+# =========================================================
+# CACHÉ DE PÁGINAS DE EXAMEN
+# =========================================================
+EXAM_PAGE_CACHE_SIZE = int(os.getenv("EXAM_PAGE_CACHE_SIZE", "500"))
+EXAM_PAGE_BUILD_TIMEOUT = float(os.getenv("EXAM_PAGE_BUILD_TIMEOUT", "30"))
+
+
+class ExamPageCache:
+    # HTML ya renderizado de /exam/<id>. La entrada vale mientras la fila del
+    # examen (su etag), las preguntas fijas y la versión de los recursos
+    # estáticos (las URLs de imágenes van en el HTML) sean las mismas. Si varias
+    # peticiones llegan con la entrada fría, solo una renderiza y el resto
+    # espera su resultado.
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._pages: "OrderedDict[str, Tuple[Tuple[str, int], Any, str, str]]" = OrderedDict()
+        self._building: Dict[str, List[Any]] = {}
+        self.stats = {"hits": 0, "renders": 0, "coalesced": 0}
+
+    def get(self, exam_id: str) -> Optional[Tuple[str, str]]:
+        entry = EXAM_CATALOG.lookup(exam_id, EXAM_VERIFY_INTERVAL)
+        if entry is None:
+            return None
+        e = entry[1]
+        defaults = _shared_default_questions()
+        key = (e["etag"], ASSETS.version)
+
+        while True:
+            with self._lock:
+                cached = self._pages.get(exam_id)
+                if cached and cached[0] == key and cached[1] is defaults:
+                    self._pages.move_to_end(exam_id)
+                    self.stats["hits"] += 1
+                    return cached[2], cached[3]
+
+                building = self._building.get(exam_id)
+                if building is None:
+                    building = [threading.Event(), None]
+                    self._building[exam_id] = building
+                    leader = True
+                else:
+                    self.stats["coalesced"] += 1
+                    leader = False
+
+            if leader:
+                try:
+                    return self._render(exam_id, key, e, defaults)
+                finally:
+                    with self._lock:
+                        self._building.pop(exam_id, None)
+                    building[0].set()
+
+            # Si quien renderizaba falló, se vuelve a intentar desde el
+            # principio y otra petición toma el relevo.
+            if not building[0].wait(EXAM_PAGE_BUILD_TIMEOUT):
+                raise RuntimeError("Tiempo de espera agotado renderizando el examen")
+
+    def _render(self, exam_id: str, key: Tuple[str, int], e: Dict[str, Any],
+                defaults: List[Dict[str, Any]]) -> Tuple[str, str]:
+        html = render_template(
+            "exam.html",
+            exam=_exam_view(e, defaults),
+            forms_url=GOOGLE_FORMS_URL,
+            default_questions_count=len(defaults)
+        )
+        etag = hashlib.sha1(html.encode("utf-8")).hexdigest()[:20]
+        with self._lock:
+            self._pages[exam_id] = (key, defaults, html, etag)
+            self._pages.move_to_end(exam_id)
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+            self.stats["renders"] += 1
+        return html, etag
+
+    def cached(self, exam_id: str) -> bool:
+        with self._lock:
+            return exam_id in self._pages
+
+    def invalidate(self, exam_id: Optional[str] = None) -> None:
+        with self._lock:
+            if exam_id is None:
+                self._pages.clear()
+            else:
+                self._pages.pop(exam_id, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "pages": len(self._pages), "max_size": self.max_size}
+
+
+EXAM_PAGES = ExamPageCache(EXAM_PAGE_CACHE_SIZE)
+
+
+# =========================================================
+# RECURSOS ESTÁTICOS (huellas, variantes y precompresión)
+# =========================================================
+# Al arrancar (o con `flask build-assets` en el despliegue) cada archivo de
+# static/ se copia a ASSETS_DIR con el hash de su contenido en el nombre,
+# las imágenes se reducen a WebP/AVIF en varios anchos y los .js/.css se
+# precomprimen. Como el nombre cambia con el contenido, /assets/ se sirve
+# como inmutable. Codificar las imágenes tarda: al arrancar se hace en un
+# hilo y, mientras tanto, las páginas usan lo que ya exista.
+ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(app.instance_path, "assets"))
+ASSETS_BUILD_ON_START = os.getenv("ASSETS_BUILD_ON_START", "1") == "1"
+ASSET_WIDTHS = [int(w) for w in os.getenv("ASSET_WIDTHS", "480,960,1600").split(",") if w.strip()]
+ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_PIPELINE_VERSION = "1"
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+COMPRESSIBLE_EXTENSIONS = {".js", ".css"}
+IMAGE_FORMATS = [("avif", "AVIF", {"quality": 55, "speed": 8}), ("webp", "WEBP", {"quality": 80})]
+
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+
+def _asset_slug(stem: str) -> str:
+    ascii_stem = unicodedata.normalize("NFKD", stem).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", ascii_stem).strip("-") or "asset"
+
+
+class AssetManifest:
+    def __init__(self, source_dir: str, out_dir: str):
+        self.source_dir = source_dir
+        self.out_dir = out_dir
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self.version = 0
+        self.stats = {"files": 0, "written": 0, "errors": 0}
+
+    def _emit(self, name: str, produce) -> bool:
+        # Los nombres llevan el hash: si ya existe, ya está bien. Se escribe
+        # a un temporal y se renombra para que varios workers no se pisen.
+        path = os.path.join(self.out_dir, name)
+        if os.path.exists(path):
+            return True
+        data = produce()
+        if data is None:
+            return False
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.stats["written"] += 1
+        return True
+
+    def build(self, encode_images: bool = True) -> None:
+        os.makedirs(self.out_dir, exist_ok=True)
+        files: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(os.listdir(self.source_dir)):
+            path = os.path.join(self.source_dir, name)
+            if not os.path.isfile(path):
+                continue
+            try:
+                files[name] = self._build_file(name, path, encode_images)
+            except Exception:
+                self.stats["errors"] += 1
+                app.logger.exception("No se pudo procesar el recurso estático %s", name)
+        self._files = files
+        self.stats["files"] = len(files)
+        self.version += 1
+
+    def start(self) -> None:
+        # Lo rápido (huellas y precompresión) en línea; las variantes de
+        # imagen en un hilo. El candado de archivo deja a un solo proceso
+        # codificando; los demás esperan y solo recogen los nombres.
+        self.build(encode_images=False)
+        if Image is None:
+            return
+
+        def run():
+            try:
+                with open(os.path.join(self.out_dir, ".build.lock"), "w") as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    self.build()
+            except Exception:
+                app.logger.exception("No se pudieron generar las variantes de imagen")
+
+        start_background(run)
+
+    def ensure_started(self) -> None:
+        # Una vez por proceso, con la primera petición (no al importar: con
+        # --preload los hilos no sobreviven al fork).
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        try:
+            self.start()
+        except Exception:
+            app.logger.exception("No se pudieron preparar los recursos estáticos")
+
+    def _build_file(self, name: str, path: str, encode_images: bool) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha1(ASSET_PIPELINE_VERSION.encode("ascii") + data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        ext = ext.lower()
+        slug = _asset_slug(stem)
+
+        entry: Dict[str, Any] = {"file": f"{slug}.{digest}{ext}", "variants": {}}
+        self._emit(entry["file"], lambda: data)
+
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            self._emit(entry["file"] + ".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._emit(entry["file"] + ".br", lambda: brotli.compress(data, quality=11))
+
+        if ext in IMAGE_EXTENSIONS and Image is not None:
+            entry["variants"] = self._image_variants(path, slug, digest, encode_images)
+        return entry
+
+    def _image_variants(self, path: str, slug: str, digest: str, encode: bool) -> Dict[str, List[Tuple[int, str]]]:
+        Image.init()
+        variants: Dict[str, List[Tuple[int, str]]] = {}
+        with Image.open(path) as im:
+            width, height = im.size
+            widths = [w for w in ASSET_WIDTHS if w < width]
+            if ASSET_WIDTHS and width <= max(ASSET_WIDTHS):
+                widths.append(width)
+
+            resized: Dict[int, Any] = {}
+
+            def encode_variant(w: int, fmt: str, options: Dict[str, Any]) -> Optional[bytes]:
+                if w not in resized:
+                    src = im if im.mode in ("RGB", "RGBA") else im.convert("RGBA")
+                    resized[w] = src if w == width else src.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                buf = io.BytesIO()
+                try:
+                    resized[w].save(buf, format=fmt, **options)
+                except Exception:
+                    app.logger.exception("No se pudo generar %s de %s a %spx", fmt, path, w)
+                    return None
+                return buf.getvalue()
+
+            for key, fmt, options in IMAGE_FORMATS:
+                if fmt not in Image.SAVE:
+                    continue
+                out = []
+                for w in widths:
+                    name = f"{slug}-{w}w.{digest}.{key}"
+                    if os.path.exists(os.path.join(self.out_dir, name)):
+                        out.append((w, name))
+                    elif encode and self._emit(name, lambda: encode_variant(w, fmt, options)):
+                        out.append((w, name))
+                if out:
+                    variants[key] = out
+        return variants
+
+    def url(self, name: str) -> str:
+        entry = self._files.get(name)
+        if entry is None:
+            return url_for("static", filename=name)
+        return url_for("serve_asset", filename=entry["file"])
+
+    def srcset(self, name: str, key: str) -> str:
+        entry = self._files.get(name)
+        variants = entry["variants"].get(key, []) if entry else []
+        return ", ".join(f"{url_for('serve_asset', filename=f)} {w}w" for w, f in variants)
+
+    def image_set(self, name: str, width: int) -> Markup:
+        # image-set() de CSS con la variante de ese ancho en cada formato;
+        # vacío si no hay variantes (la regla url() previa queda vigente).
+        entry = self._files.get(name)
+        options = []
+        for key, _, _ in IMAGE_FORMATS:
+            for w, f in entry["variants"].get(key, []) if entry else []:
+                if w == width:
+                    options.append(f'url("{url_for("serve_asset", filename=f)}") type("image/{key}")')
+        return Markup(f"image-set({', '.join(options)})") if options else Markup("")
+
+    def picture_sources(self, name: str, sizes: str) -> Markup:
+        # <source> de cada formato disponible, del más liviano al más
+        # compatible; el <img> de respaldo lo pone la plantilla.
+        tags = []
+        for key, _, _ in IMAGE_FORMATS:
+            srcset = self.srcset(name, key)
+            if srcset:
+                tags.append(
+                    f'<source type="image/{key}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">'
+                )
+        return Markup("\n".join(tags))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, "version": self.version, "pillow": Image is not None, "brotli": brotli is not None}
+
+
+ASSETS = AssetManifest(app.static_folder, ASSETS_DIR)
+app.jinja_env.globals.update(
+    asset_url=ASSETS.url,
+    picture_sources=ASSETS.picture_sources,
+    image_set=ASSETS.image_set,
+)
+
+
+@app.before_request
+def _start_assets():
+    if ASSETS_BUILD_ON_START:
+        ASSETS.ensure_started()
+
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    ASSETS.build()
+    click.echo(json.dumps(ASSETS.snapshot()))
+
+
+@app.route("/assets/<path:filename>")
+def serve_asset(filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding = None
+    if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+        for name, suffix in (("br", ".br"), ("gzip", ".gz")):
+            candidate = safe_join(ASSETS_DIR, filename + suffix)
+            if request.accept_encodings[name] and candidate and os.path.isfile(candidate):
+                filename, encoding = filename + suffix, name
+                break
+
+    resp = send_from_directory(ASSETS_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+# =========================================================
+# ROUTES (UI)
+# =========================================================
+@app.route("/")
+def index():
+    return render_template("home.html")
+
+
+@app.route("/creator")
+def creator():
+    return render_template("index.html")
+
+
+@app.route("/upload_support", methods=["GET"])
+def upload_support_page():
+    return render_template("upload_support.html")
+
+
+# =========================================================
+# ARCHIVOS DE APOYO (almacenamiento por contenido)
+# =========================================================
+# Cada archivo se guarda una sola vez en UPLOADS_DIR/objects con su SHA-256
+# como nombre: subir dos veces la misma presentación no ocupa más disco. Las
+# subidas se copian por bloques (nunca el archivo entero en memoria) y las
+# grandes pueden ir por partes con Content-Range y retomarse tras un corte.
+# Cada examen tiene un manifiesto JSON con nombre, hash y tamaño de lo que
+# se le adjuntó. Suben el facilitador del examen (con su cédula) o un
+# administrador.
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", os.path.join(app.instance_path, "uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(4 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+UPLOAD_MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "10"))
+UPLOAD_MAX_SESSIONS_PER_EXAM = int(os.getenv("UPLOAD_MAX_SESSIONS_PER_EXAM", "5"))
+# Un temporal sin escrituras en este tiempo es de una subida cortada (o de
+# un worker que murió a mitad).
+UPLOAD_TMP_TTL = float(os.getenv("UPLOAD_TMP_TTL", "3600"))
+UPLOAD_SWEEP_INTERVAL = 60.0
+UPLOAD_ALLOWED_EXTENSIONS = {
+    e.strip().lower().lstrip(".")
+    for e in os.getenv(
+        "UPLOAD_ALLOWED_EXTENSIONS",
+        "pdf,ppt,pptx,odp,doc,docx,odt,xls,xlsx,ods,csv,txt,png,jpg,jpeg,webp,zip"
+    ).split(",")
+    if e.strip()
+}
+UPLOAD_COPY_BUFFER = 1024 * 1024
+# Se muestran en el navegador; el resto se descarga (un HTML o SVG subido
+# no debe ejecutarse en nuestro dominio).
+UPLOAD_INLINE_TYPES = {"application/pdf", "image/png", "image/jpeg", "image/webp"}
+
+# Tope de cualquier cuerpo (también los que llegan sin Content-Length, por
+# partes): lo más grande que se acepta es un archivo más el multipart.
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES + 1024 * 1024
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+UPLOAD_EXAM_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,20}$")
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadRejected(Exception):
+    def __init__(self, message: str, status: int = 400, **extra: Any):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def upload_name(name: Any) -> str:
+    # Nombre visible (el original, acotado) validado por extensión.
+    name = safe_str(os.path.basename(safe_str(name, 300).replace("\\", "/")), 200)
+    ext = os.path.splitext(name)[1].lower().lstrip(".")
+    if not name or ext not in UPLOAD_ALLOWED_EXTENSIONS:
+        raise UploadRejected(f"Tipo de archivo no permitido: {name or 'sin nombre'}")
+    return name
+
+
+class UploadStore:
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+        self.stats = {
+            "stored": 0, "deduplicated": 0, "bytes_stored": 0,
+            "sessions_started": 0, "sessions_completed": 0, "swept": 0,
+        }
+
+    def _dir(self, name: str) -> str:
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _copy(self, stream, out, limit: int, h=None) -> int:
+        copied = 0
+        while copied < limit:
+            chunk = stream.read(min(UPLOAD_COPY_BUFFER, limit - copied))
+            if not chunk:
+                break
+            out.write(chunk)
+            if h is not None:
+                h.update(chunk)
+            copied += len(chunk)
+        return copied
+
+    def _commit(self, tmp: str, digest: str, size: int) -> bool:
+        # Si el contenido ya estaba, el temporal sobra. os.replace es atómico:
+        # dos subidas iguales a la vez dejan el mismo archivo.
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(tmp)
+            self._count(deduplicated=1)
+            return True
+        os.replace(tmp, path)
+        self._count(stored=1, bytes_stored=size)
+        return False
+
+    def _remove_older_than(self, directory: str, cutoff: float) -> int:
+        removed = 0
+        for fname in os.listdir(directory):
+            path = os.path.join(directory, fname)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def sweep(self) -> None:
+        # Temporales huérfanos y subidas por partes vencidas, como mucho una
+        # vez por minuto por proceso.
+        now = time.time()
+        with self._lock:
+            if now - self._swept_at < UPLOAD_SWEEP_INTERVAL:
+                return
+            self._swept_at = now
+        removed = self._remove_older_than(self._dir("tmp"), now - UPLOAD_TMP_TTL)
+        removed += self._remove_older_than(self._dir("partial"), now - UPLOAD_SESSION_TTL)
+        self._count(swept=removed)
+
+    def store_stream(self, stream) -> Tuple[str, int, bool]:
+        self.sweep()
+        fd, tmp = tempfile.mkstemp(dir=self._dir("tmp"))
+        h = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = self._copy(stream, out, UPLOAD_MAX_BYTES + 1, h)
+            if size > UPLOAD_MAX_BYTES:
+                raise UploadRejected("El archivo supera el tamaño máximo permitido", 413)
+            digest = h.hexdigest()
+            return digest, size, self._commit(tmp, digest, size)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # --- Subidas por partes (reanudables) ---
+
+    def _session_paths(self, upload_id: str) -> Tuple[str, str]:
+        base = os.path.join(self._dir("partial"), upload_id)
+        return base + ".part", base + ".json"
+
+    def _open_sessions(self, exam_id: str) -> int:
+        partial = self._dir("partial")
+        count = 0
+        for fname in os.listdir(partial):
+            if not fname.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(partial, fname), encoding="utf-8") as f:
+                    count += json.load(f).get("exam_id") == exam_id
+            except (OSError, ValueError):
+                pass
+        return count
+
+    def start_session(self, exam_id: str, name: str, size: int) -> Dict[str, Any]:
+        if size < 1 or size > UPLOAD_MAX_BYTES:
+            raise UploadRejected("El archivo supera el tamaño máximo permitido", 413)
+        self.sweep()
+        upload_id = uuid.uuid4().hex
+        part, meta = self._session_paths(upload_id)
+        info = {"upload_id": upload_id, "exam_id": exam_id, "name": name, "size": size, "created_at": time.time()}
+        # El candado hace que contar y crear sea atómico entre workers.
+        with open(os.path.join(self._dir("partial"), ".sessions.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self._open_sessions(exam_id) >= UPLOAD_MAX_SESSIONS_PER_EXAM:
+                raise UploadRejected(
+                    f"Máximo {UPLOAD_MAX_SESSIONS_PER_EXAM} subidas abiertas por examen; termina o espera a que venzan las pendientes",
+                    429
+                )
+            open(part, "wb").close()
+            with open(meta, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+        self._count(sessions_started=1)
+        return {**info, "offset": 0}
+
+    def session(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        if not UPLOAD_ID_RE.match(upload_id):
+            return None
+        part, meta = self._session_paths(upload_id)
+        try:
+            with open(meta, encoding="utf-8") as f:
+                info = json.load(f)
+            return {**info, "offset": os.path.getsize(part)}
+        except (OSError, ValueError):
+            return None
+
+    def append_chunk(self, info: Dict[str, Any], start: int, length: int, stream) -> Tuple[int, Optional[Tuple[str, int, bool]]]:
+        # El flock serializa las partes de una misma subida entre workers. El
+        # offset es lo que hay en disco: si una parte se cortó a medias, el
+        # cliente sigue desde ahí.
+        part, meta = self._session_paths(info["upload_id"])
+        with open(part, "r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            offset = os.fstat(f.fileno()).st_size
+            if start != offset:
+                raise UploadRejected("La parte no continúa donde quedó la subida", 409, offset=offset)
+            if start + length > info["size"]:
+                raise UploadRejected("La parte excede el tamaño declarado", 400, offset=offset)
+            f.seek(offset)
+            offset += self._copy(stream, f, length)
+            f.flush()
+            if offset < info["size"]:
+                return offset, None
+
+            h = hashlib.sha256()
+            f.seek(0)
+            while True:
+                chunk = f.read(UPLOAD_COPY_BUFFER)
+                if not chunk:
+                    break
+                h.update(chunk)
+            digest = h.hexdigest()
+            deduplicated = self._commit(part, digest, offset)
+        os.remove(meta)
+        self._count(sessions_completed=1)
+        return offset, (digest, offset, deduplicated)
+
+    # --- Manifiesto por examen ---
+
+    def _manifest_path(self, exam_id: str) -> str:
+        return os.path.join(self._dir("manifests"), f"{exam_id}.json")
+
+    def manifest(self, exam_id: str) -> List[Dict[str, Any]]:
+        try:
+            with open(self._manifest_path(exam_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def attach(self, exam_id: str, name: str, digest: str, size: int) -> Dict[str, Any]:
+        path = self._manifest_path(exam_id)
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.manifest(exam_id)
+            for entry in entries:
+                if entry["sha256"] == digest and entry["name"] == name:
+                    return entry
+            entry = {
+                "name": name,
+                "sha256": digest,
+                "size": size,
+                "content_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                "uploaded_at": datetime.now(UTC).isoformat(),
+            }
+            entries.append(entry)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        return entry
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "root": self.root}
+
+
+UPLOADS = UploadStore(UPLOADS_DIR)
+
+
+def _upload_view(entry: Dict[str, Any], deduplicated: Optional[bool] = None) -> Dict[str, Any]:
+    view = {
+        **entry,
+        "url": url_for("serve_upload", digest=entry["sha256"], filename=secure_filename(entry["name"]) or "archivo"),
+    }
+    if deduplicated is not None:
+        view["deduplicated"] = deduplicated
+    return view
+
+
+def _upload_exam_id(raw: Any) -> Tuple[str, Optional[Tuple[Any, int]]]:
+    exam_id = safe_str(raw, 20)
+    if not exam_id:
+        return "", (jsonify({"error": "Falta exam_id"}), 400)
+    if not UPLOAD_EXAM_ID_RE.match(exam_id) or not EXAM_CATALOG.lookup(exam_id):
+        return "", (jsonify({"error": "Examen no encontrado"}), 404)
+    return exam_id, None
 
 
-# =========================================================
-# ROUTES (UI)
-# =========================================================
-@app.route("/")
-def index():
-    return render_template("home.html")
+def _upload_target(raw_exam_id: Any, facilitator_cedula: Any) -> Tuple[str, Optional[Tuple[Any, int]]]:
+    exam_id, error = _upload_exam_id(raw_exam_id)
+    if error:
+        return "", error
+    if session.get("is_admin"):
+        return exam_id, None
+    entry = EXAM_CATALOG.lookup(exam_id)
+    expected = entry[1]["facilitator_cedula"] if entry else ""
+    given = safe_str(facilitator_cedula, 15)
+    if not given or not expected or not hmac.compare_digest(given, expected):
+        return "", (jsonify({"error": "Solo el facilitador del examen (con su cédula) o un administrador puede subir soportes"}), 403)
+    return exam_id, None
 
 
-@app.route("/creator")
-def creator():
-    return render_template("index.html")
+@app.errorhandler(UploadRejected)
+def _upload_rejected(e):
+    return jsonify({"error": str(e), **e.extra}), e.status
 
 
-@app.route("/upload_support", methods=["GET"])
-def upload_support_page():
-    return render_template("upload_support.html")
+@app.errorhandler(RequestEntityTooLarge)
+def _request_too_large(e):
+    return jsonify({"error": "El archivo supera el tamaño máximo permitido"}), 413
 
 
 @app.route("/api/upload_support", methods=["POST"])
 def upload_support_api():
-    exam_id = request.form.get("exam_id")
-    files = request.files.getlist("files")
-
-    if not exam_id:
-        return jsonify({"error": "Falta exam_id"}), 400
+    exam_id, error = _upload_target(request.form.get("exam_id"), request.form.get("facilitator_cedula"))
+    if error:
+        return error
 
+    files = [f for f in request.files.getlist("files") if f and f.filename]
     if not files:
         return jsonify({"error": "No se enviaron archivos"}), 400
+    if len(files) > UPLOAD_MAX_FILES:
+        return jsonify({"error": f"Máximo {UPLOAD_MAX_FILES} archivos por solicitud"}), 400
 
+    names = [upload_name(f.filename) for f in files]
     saved_files = []
-    for file in files:
-        if file and file.filename:
-            saved_files.append({
-                "name": file.filename,
-                "url": f"/uploads/{file.filename}"
-            })
+    for file, name in zip(files, names):
+        digest, size, deduplicated = UPLOADS.store_stream(file.stream)
+        saved_files.append(_upload_view(UPLOADS.attach(exam_id, name, digest, size), deduplicated))
 
     return jsonify({"files": saved_files}), 200
 
 
+@app.route("/api/upload_support/<exam_id>", methods=["GET"])
+def upload_support_list(exam_id):
+    exam_id, error = _upload_exam_id(exam_id)
+    if error:
+        return error
+    return jsonify({"exam_id": exam_id, "files": [_upload_view(e) for e in UPLOADS.manifest(exam_id)]})
+
+
+@app.route("/api/upload_support/sessions", methods=["POST"])
+def upload_session_start():
+    data = request.get_json(silent=True) or {}
+    exam_id, error = _upload_target(data.get("exam_id"), data.get("facilitator_cedula"))
+    if error:
+        return error
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Tamaño inválido"}), 400
+
+    info = UPLOADS.start_session(exam_id, upload_name(data.get("name")), size)
+    return jsonify({**info, "chunk_size": UPLOAD_CHUNK_BYTES}), 201
+
+
+# Las partes y la consulta no vuelven a pedir la cédula: el upload_id (128
+# bits al azar) solo lo tiene quien abrió la subida.
+@app.route("/api/upload_support/sessions/<upload_id>", methods=["GET"])
+def upload_session_status(upload_id):
+    info = UPLOADS.session(upload_id)
+    if info is None:
+        return jsonify({"error": "Subida no encontrada o vencida"}), 404
+    return jsonify({**info, "chunk_size": UPLOAD_CHUNK_BYTES})
+
+
+@app.route("/api/upload_support/sessions/<upload_id>", methods=["PUT"])
+def upload_session_chunk(upload_id):
+    # Cuerpo crudo con "Content-Range: bytes inicio-fin/total"; se lee de
+    # request.stream por bloques, sin pasar por el parser de formularios.
+    info = UPLOADS.session(upload_id)
+    if info is None:
+        return jsonify({"error": "Subida no encontrada o vencida"}), 404
+
+    m = CONTENT_RANGE_RE.match(request.headers.get("Content-Range", ""))
+    if not m:
+        return jsonify({"error": "Falta Content-Range válido", "offset": info["offset"]}), 400
+    start, end, total = (int(x) for x in m.groups())
+    if total != info["size"] or end < start:
+        return jsonify({"error": "Content-Range no coincide con la subida", "offset": info["offset"]}), 400
+    if end - start + 1 > UPLOAD_CHUNK_BYTES:
+        return jsonify({"error": f"Cada parte admite como máximo {UPLOAD_CHUNK_BYTES} bytes", "offset": info["offset"]}), 413
+
+    offset, done = UPLOADS.append_chunk(info, start, end - start + 1, request.stream)
+    if done is None:
+        return jsonify({"upload_id": upload_id, "offset": offset, "size": info["size"]}), 200
+
+    digest, size, deduplicated = done
+    entry = UPLOADS.attach(info["exam_id"], info["name"], digest, size)
+    return jsonify({"upload_id": upload_id, "offset": offset, "file": _upload_view(entry, deduplicated)}), 201
+
+
+@app.route("/uploads/<digest>/<path:filename>")
+def serve_upload(digest, filename):
+    if not SHA256_RE.match(digest):
+        abort(404)
+    path = UPLOADS.object_path(digest)
+    if not os.path.isfile(path):
+        abort(404)
+
+    # El contenido no cambia nunca para un mismo hash: ETag = hash, caché
+    # inmutable y Range/304 los resuelve send_file.
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    resp = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=mimetype not in UPLOAD_INLINE_TYPES,
+        download_name=filename,
+        conditional=True,
+        etag=digest,
+        max_age=ASSET_MAX_AGE
+    )
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    resp.headers["X-Content-Type-Options"] = "nosniff"
+    return resp
+
+
 # =========================================================
 # DEBUG
 # =========================================================
@@ -478,23 +4340,53 @@ def debug_sheets():
         "SHEET_RESPONSES": SHEET_RESPONSES,
         "SHEET_CONFIG": SHEET_CONFIG,
         "spreadsheet_id": SPREADSHEET_ID,
+        "sheets_api_endpoint": SHEETS_API_ENDPOINT or None,
         "disable_ssl_verify": DISABLE_SSL_VERIFY,
+        "storage": STORAGE.snapshot(),
+        "sheets_pool": SHEETS_POOL.snapshot(),
+        "sheets_scheduler": SHEETS_SCHEDULER.snapshot(),
+        "exam_catalog": EXAM_CATALOG.snapshot(),
+        "submissions": SUBMISSIONS.snapshot(),
+        "responses_queue": RESPONSES_QUEUE.snapshot(),
+        "exam_pages": EXAM_PAGES.snapshot(),
+        "single_flight": SHEETS_FLIGHTS.snapshot(),
+        "analytics": ANALYTICS.snapshot(),
+        "assets": ASSETS.snapshot(),
+        "metrics": METRICS.snapshot(),
+        "prewarm": PREWARMER.snapshot(),
+        "uploads": UPLOADS.snapshot(),
+        "submit_receipts": SUBMIT_RECEIPTS.snapshot(),
         "is_admin": bool(session.get("is_admin"))
     })
 
 
+@app.route("/metrics")
+def metrics():
+    if METRICS_TOKEN:
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth, f"Bearer {METRICS_TOKEN}"):
+            return jsonify({"error": "No autorizado"}), 401
+    elif not session.get("is_admin") and request.remote_addr not in ("127.0.0.1", "::1"):
+        return jsonify({"error": "No autorizado"}), 401
+    return Response(METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # =========================================================
 # API CONFIG PÚBLICA
 # =========================================================
 @app.route("/api/config/public", methods=["GET"])
 def api_public_config():
-    service = get_sheets_service()
-    cfg = load_config(service)
-    return jsonify({
-        "system_areas": cfg.get("system_areas", []),
-        "system_topics": cfg.get("system_topics", {}),
-        "ui_texts": cfg.get("ui_texts", {}),
-    })
+    etag, last_modified = CONFIG_CACHE.etag()
+
+    def payload():
+        cfg = load_config()
+        return {
+            "system_areas": cfg.get("system_areas", []),
+            "system_topics": cfg.get("system_topics", {}),
+            "ui_texts": cfg.get("ui_texts", {}),
+        }
+
+    return conditional_json(etag, last_modified, payload)
 
 
 # =========================================================
@@ -539,15 +4431,15 @@ def api_admin_ui_texts_update():
     if not value:
         return jsonify({"error": "El valor no puede estar vacío"}), 400
 
-    service = get_sheets_service()
-    cfg = load_config(service)
+    cfg = load_config()
 
     ui = cfg.get("ui_texts")
     if not isinstance(ui, dict):
         ui = {}
+    ui = dict(ui)
 
     ui[key] = value
-    save_config_key(service, "ui_texts", ui)
+    save_config_key("ui_texts", ui)
     return jsonify({"status": "ok"})
 
 
@@ -577,9 +4469,8 @@ def api_admin_system_config_save():
         else:
             topics_clean[kk] = []
 
-    service = get_sheets_service()
-    save_config_key(service, "system_areas", areas_clean)
-    save_config_key(service, "system_topics", topics_clean)
+    save_config_key("system_areas", areas_clean)
+    save_config_key("system_topics", topics_clean)
 
     return jsonify({"status": "ok"})
 
@@ -590,8 +4481,7 @@ def api_admin_system_config_save():
 @app.route("/api/admin/default_questions/options", methods=["GET"])
 @admin_required
 def api_admin_default_questions_get():
-    service = get_sheets_service()
-    questions = get_default_questions(service)
+    questions = get_default_questions()
 
     out = []
     for q in questions:
@@ -647,8 +4537,7 @@ def api_admin_default_questions_save():
 
         overrides[title] = clean_opts
 
-    service = get_sheets_service()
-    save_config_key(service, "default_question_overrides", overrides)
+    save_config_key("default_question_overrides", overrides)
 
     return jsonify({"status": "ok"})
 
@@ -656,189 +4545,223 @@ def api_admin_default_questions_save():
 # =========================================================
 # API: EXAMS
 # =========================================================
+_EXAM_LIST_WITH_COUNTERS: List[Any] = [None, None, []]
+
+
 @app.route("/api/exams", methods=["GET"])
 def api_exams():
-    service = get_sheets_service()
-    return jsonify({"exams": list_exams(service)})
+    EXAM_CATALOG.refresh()
+    counters, etag, last_modified = participation_state(*EXAM_CATALOG.etag())
+
+    def payload():
+        global _EXAM_LIST_WITH_COUNTERS
+        exams = list_exams()
+        memo = _EXAM_LIST_WITH_COUNTERS
+        if memo[0] is not exams or memo[1] is not counters:
+            memo = _EXAM_LIST_WITH_COUNTERS = [exams, counters, with_participation(exams, counters)]
+        return {"exams": memo[2]}
+
+    return conditional_json(etag, last_modified, payload)
 
 
 @app.route("/api/exams/filter", methods=["GET"])
 def api_exams_filter():
-    service = get_sheets_service()
-    rows = _load_exams_rows(service)
-
     system_area = safe_str(request.args.get("system_area"), 120)
     system_title = safe_str(request.args.get("system_title"), 220)
     q = safe_str(request.args.get("q"), 200)
     date_from = safe_str(request.args.get("date_from"), 20)
     date_to = safe_str(request.args.get("date_to"), 20)
 
-    n_area = normalize_text(system_area)
-    n_title = normalize_text(system_title)
-    n_q = normalize_text(q)
+    try:
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+        offset = int(request.args.get("offset") or 0)
+    except ValueError:
+        return jsonify({"error": "Parámetros de paginación inválidos"}), 400
+    if (limit is not None and limit < 1) or offset < 0:
+        return jsonify({"error": "Parámetros de paginación inválidos"}), 400
+
+    EXAM_CATALOG.refresh()
+    counters, etag, last_modified = participation_state(*EXAM_CATALOG.etag())
+
+    def payload():
+        index = get_exam_filter_index()
+        matches = index.query(
+            normalize_text(system_area),
+            normalize_text(system_title),
+            normalize_text(q),
+            date_from,
+            date_to
+        )
+        page = matches[offset:offset + limit] if limit is not None else matches[offset:]
+        return {
+            "exams": with_participation([index.items[pos] for pos in page], counters),
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+        }
 
-    def in_range(course_date: str) -> bool:
-        cd = safe_str(course_date, 20).strip()
-        if not date_from and not date_to:
-            return True
-        if not cd:
-            return False
-        if date_from and cd < date_from:
-            return False
-        if date_to and cd > date_to:
-            return False
-        return True
+    return conditional_json(etag, last_modified, payload)
 
-    out: List[Dict[str, Any]] = []
 
-    for r in rows:
-        if not r:
-            continue
+@app.route("/api/exam/<exam_id>", methods=["GET"])
+def api_get_exam(exam_id):
+    entry = EXAM_CATALOG.lookup(safe_str(exam_id, 20))
+    if not entry:
+        return jsonify({"error": "Examen no encontrado"}), 404
 
-        exam_id = safe_get(r, 0, "").strip()
-        if not exam_id:
-            continue
-        if normalize_text(exam_id) in ("EXAM_ID", "ID"):
-            continue
+    e = entry[1]
+    _, last_modified = EXAM_CATALOG.etag()
+
+    # Solo se devuelven las preguntas propias, así que la versión depende
+    # únicamente de la fila del examen.
+    return conditional_json(e["etag"], last_modified, lambda: {
+        "id": e["id"],
+        "facilitator": e.get("facilitator", ""),
+        "facilitator_cedula": e.get("facilitator_cedula", ""),
+        "course": e.get("course", ""),
+        "created_at": e.get("created_at", ""),
+        "questions": e.get("custom_questions", []),
+        "course_date": e.get("course_date", ""),
+        "course_duration": e.get("course_duration", ""),
+        "num_invites": e.get("num_invites", ""),
+        "facilitator_email": e.get("facilitator_email", ""),
+        "system_area": e.get("system_area", ""),
+        "system_title": e.get("system_title", ""),
+        "course_description": e.get("course_description", ""),
+        "exam_url": e.get("exam_url", ""),
+    })
 
-        fac = safe_get(r, 1, "")
-        fac_ced = safe_get(r, 2, "")
-        course = safe_get(r, 3, "")
-        created_at = safe_get(r, 4, "")
-        course_date = safe_get(r, 6, "")
-        course_duration = safe_get(r, 7, "")
-        num_invites = safe_get(r, 8, "")
-        facilitator_email = safe_get(r, 9, "")
-        area = safe_get(r, 10, "")
-        title = safe_get(r, 11, "")
-        desc = safe_get(r, 12, "")
-        exam_url = safe_get(r, 13, "")
-
-        if n_area and normalize_text(area) != n_area:
-            continue
 
-        if n_title and normalize_text(title) != n_title:
-            continue
+# =========================================================
+# CREATE EXAM
+# =========================================================
+def build_exam_row(data: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> Tuple[Optional[List[Any]], str]:
+    # Valida una especificación de examen como la de /create_exam y arma su
+    # fila con id nuevo. Con base (duplicar), lo que falte sale del examen base.
+    def value(name: str) -> Any:
+        v = data.get(name)
+        if not v and base is not None:
+            v = base.get(name)
+        return v
+
+    facilitator = normalize_text(value("facilitator"))
+    facilitator_cedula = safe_str(value("facilitator_cedula"), 15)
+    course = safe_str(value("course"), 200)
+
+    course_date = safe_str(value("course_date"), 30)
+    course_duration = safe_str(value("course_duration"), 20)
+    num_invites = safe_str(value("num_invites"), 20)
+    facilitator_email = safe_str(value("facilitator_email"), 120)
+
+    system_area = safe_str(value("system_area"), 80)
+    system_title = safe_str(value("system_title"), 200)
+    course_description = safe_str(value("course_description"), 300)
+
+    # Al duplicar sin preguntas nuevas se copia el JSON del examen base tal
+    # cual, como en /duplicate_exam: ya se validó al crearlo y los dicts del
+    # catálogo no deben pasar por validate_question, que los modifica.
+    questions_json = None
+    custom_questions = data.get("questions", [])
+    if base is not None and "questions" not in data:
+        questions_json = base["questions_json"]
 
-        if n_q:
-            hay = normalize_text(f"{course} {fac} {desc} {title} {area}")
-            if n_q not in hay:
-                continue
+    if not facilitator or not facilitator_cedula or not course or not course_description:
+        return None, "Datos incompletos. La descripción del curso es obligatoria."
+    if not CEDULA_RE.match(facilitator_cedula):
+        return None, "Cédula del facilitador inválida (solo números, 5 a 15 dígitos)"
+    if questions_json is None:
+        if not isinstance(custom_questions, list):
+            return None, "Formato de preguntas inválido"
+
+        validated_custom: List[Dict[str, Any]] = []
+        for q in custom_questions:
+            ok, msg = validate_question(q)
+            if not ok:
+                return None, f"Pregunta inválida: {msg}"
+            validated_custom.append(q)
+        questions_json = json.dumps(validated_custom, ensure_ascii=False)
 
-        if not in_range(course_date):
-            continue
+    exam_id = uuid.uuid4().hex[:8]
+    exam_url = request.host_url.rstrip("/") + f"/exam/{exam_id}"
 
-        out.append({
-            "id": exam_id,
-            "facilitator": fac,
-            "facilitator_cedula": fac_ced,
-            "course": course,
-            "created_at": created_at,
-            "course_description": desc,
-            "course_date": course_date,
-            "course_duration": course_duration,
-            "num_invites": num_invites,
-            "facilitator_email": facilitator_email,
-            "system_area": area,
-            "system_title": title,
-            "exam_url": exam_url,
-        })
+    return [
+        exam_id,
+        facilitator,
+        facilitator_cedula,
+        course,
+        datetime.now(UTC).isoformat(),
+        questions_json,
+        course_date,
+        course_duration,
+        num_invites,
+        facilitator_email,
+        system_area,
+        system_title,
+        course_description,
+        exam_url
+    ], ""
 
-    out.reverse()
-    return jsonify({"exams": out})
 
+@app.route("/create_exam", methods=["POST"])
+def create_exam():
+    data = request.get_json(force=True) or {}
 
-@app.route("/api/exam/<exam_id>", methods=["GET"])
-def api_get_exam(exam_id):
-    service = get_sheets_service()
-    exam = get_exam_by_id(service, safe_str(exam_id, 20))
-    if not exam:
-        return jsonify({"error": "Examen no encontrado"}), 404
+    values, error = build_exam_row(data)
+    if values is None:
+        return jsonify({"error": error}), 400
+
+    store = get_storage()
+    EXAM_CATALOG.put(values[0], store.exams.append(values), values)
 
     return jsonify({
-        "id": exam["id"],
-        "facilitator": exam.get("facilitator", ""),
-        "facilitator_cedula": exam.get("facilitator_cedula", ""),
-        "course": exam.get("course", ""),
-        "created_at": exam.get("created_at", ""),
-        "questions": exam.get("custom_questions", []),
-        "course_date": exam.get("course_date", ""),
-        "course_duration": exam.get("course_duration", ""),
-        "num_invites": exam.get("num_invites", ""),
-        "facilitator_email": exam.get("facilitator_email", ""),
-        "system_area": exam.get("system_area", ""),
-        "system_title": exam.get("system_title", ""),
-        "course_description": exam.get("course_description", ""),
-        "exam_url": exam.get("exam_url", ""),
+        "exam_id": values[0],
+        "exam_url": values[13]
     })
 
 
 # =========================================================
-# CREATE EXAM
+# CREACIÓN MASIVA (ADMIN)
 # =========================================================
-@app.route("/create_exam", methods=["POST"])
-def create_exam():
-    data = request.get_json(force=True) or {}
-
-    facilitator = normalize_text(data.get("facilitator"))
-    facilitator_cedula = safe_str(data.get("facilitator_cedula"), 15)
-    course = safe_str(data.get("course"), 200)
+BULK_EXAMS_MAX = int(os.getenv("BULK_EXAMS_MAX", "300"))
 
-    course_date = safe_str(data.get("course_date"), 30)
-    course_duration = safe_str(data.get("course_duration"), 20)
-    num_invites = safe_str(data.get("num_invites"), 20)
-    facilitator_email = safe_str(data.get("facilitator_email"), 120)
 
-    system_area = safe_str(data.get("system_area"), 80)
-    system_title = safe_str(data.get("system_title"), 200)
-    course_description = safe_str(data.get("course_description"), 300)
+@app.route("/api/admin/exams/bulk", methods=["POST"])
+@admin_required
+def api_admin_exams_bulk():
+    # {"exams": [especificación, ...]} o
+    # {"duplicate_from": exam_id, "targets": [campos que cambian, ...]}.
+    # Se valida todo antes de escribir y se escribe con un solo append.
+    data = request.get_json(force=True) or {}
 
-    custom_questions = data.get("questions", [])
+    base = None
+    if data.get("duplicate_from"):
+        entry = EXAM_CATALOG.lookup(safe_str(data.get("duplicate_from"), 20))
+        if not entry or not entry[1]["questions_json"]:
+            return jsonify({"error": "Formación no encontrada"}), 404
+        base = entry[1]
+        specs = data.get("targets")
+    else:
+        specs = data.get("exams")
 
-    if not facilitator or not facilitator_cedula or not course or not course_description:
-        return jsonify({"error": "Datos incompletos. La descripción del curso es obligatoria."}), 400
-    if not CEDULA_RE.match(facilitator_cedula):
-        return jsonify({"error": "Cédula del facilitador inválida (solo números, 5 a 15 dígitos)"}), 400
-    if not isinstance(custom_questions, list):
-        return jsonify({"error": "Formato de preguntas inválido"}), 400
+    if not isinstance(specs, list) or not specs or not all(isinstance(x, dict) for x in specs):
+        return jsonify({"error": "Debes enviar la lista de exámenes"}), 400
+    if len(specs) > BULK_EXAMS_MAX:
+        return jsonify({"error": f"Máximo {BULK_EXAMS_MAX} exámenes por solicitud"}), 413
 
-    validated_custom: List[Dict[str, Any]] = []
-    for q in custom_questions:
-        ok, msg = validate_question(q)
-        if not ok:
-            return jsonify({"error": f"Pregunta inválida: {msg}"}), 400
-        validated_custom.append(q)
+    rows: List[List[Any]] = []
+    for i, spec in enumerate(specs, start=1):
+        values, error = build_exam_row(spec, base)
+        if values is None:
+            return jsonify({"error": f"Examen {i}: {error}", "index": i - 1}), 400
+        rows.append(values)
 
-    exam_id = uuid.uuid4().hex[:8]
-    exam_url = request.host_url.rstrip("/") + f"/exam/{exam_id}"
-    service = get_sheets_service()
-
-    service.spreadsheets().values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_EXAMS,
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body={"values": [[
-            exam_id,
-            facilitator,
-            facilitator_cedula,
-            course,
-            datetime.now(UTC).isoformat(),
-            json.dumps(validated_custom, ensure_ascii=False),
-            course_date,
-            course_duration,
-            num_invites,
-            facilitator_email,
-            system_area,
-            system_title,
-            course_description,
-            exam_url
-        ]]}
-    ).execute()
+    store = get_storage()
+    for values, row in zip(rows, store.exams.append_many(rows)):
+        EXAM_CATALOG.put(values[0], row, values)
 
     return jsonify({
-        "exam_id": exam_id,
-        "exam_url": exam_url
+        "status": "ok",
+        "exams": [{"exam_id": values[0], "exam_url": values[13]} for values in rows]
     })
 
 
@@ -867,46 +4790,36 @@ def duplicate_exam(exam_id):
     if not CEDULA_RE.match(facilitator_cedula):
         return jsonify({"error": "Cédula del facilitador inválida (solo números, 5 a 15 dígitos)"}), 400
 
-    service = get_sheets_service()
-    rows = _load_exams_rows(service)
+    store = get_storage()
+    entry = EXAM_CATALOG.lookup(exam_id)
+    old = entry[1] if entry else None
 
-    old = None
-    for r in rows:
-        if len(r) >= 6 and safe_get(r, 0, "") == exam_id:
-            old = r
-            break
-
-    if not old:
+    if not old or not old["questions_json"]:
         return jsonify({"error": "Formación no encontrada"}), 404
 
-    questions_json = safe_get(old, 5, "[]")
-    course_description = safe_get(old, 12, "")
+    questions_json = old["questions_json"]
+    course_description = old["course_description"]
 
     new_exam_id = uuid.uuid4().hex[:8]
     new_exam_url = request.host_url.rstrip("/") + f"/exam/{new_exam_id}"
 
-    service.spreadsheets().values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_EXAMS,
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body={"values": [[
-            new_exam_id,
-            facilitator,
-            facilitator_cedula,
-            course,
-            datetime.now(UTC).isoformat(),
-            questions_json,
-            course_date,
-            course_duration,
-            num_invites,
-            facilitator_email,
-            system_area,
-            system_title,
-            course_description,
-            new_exam_url
-        ]]}
-    ).execute()
+    values = [
+        new_exam_id,
+        facilitator,
+        facilitator_cedula,
+        course,
+        datetime.now(UTC).isoformat(),
+        questions_json,
+        course_date,
+        course_duration,
+        num_invites,
+        facilitator_email,
+        system_area,
+        system_title,
+        course_description,
+        new_exam_url
+    ]
+    EXAM_CATALOG.put(new_exam_id, store.exams.append(values), values)
 
     return jsonify({
         "exam_id": new_exam_id,
@@ -934,18 +4847,13 @@ def api_update_exam(exam_id):
     if not isinstance(questions_in, list):
         return jsonify({"error": "Debes enviar la lista de preguntas"}), 400
 
-    service = get_sheets_service()
-    row = None
-    rows = _load_exams_rows(service)
-    for idx, r in enumerate(rows, start=1):
-        if len(r) >= 1 and safe_get(r, 0, "") == exam_id:
-            row = idx
-            break
-
-    if not row:
+    store = get_storage()
+    prefetch_reads(EXAM_CATALOG.pending_ranges(exam_id, verify=True))
+    entry = EXAM_CATALOG.locate(exam_id)
+    if not entry:
         return jsonify({"error": "Examen no encontrado"}), 404
 
-    old = get_exam_by_id(service, exam_id)
+    row, old = entry
     created_at = old.get("created_at") if old else datetime.now(UTC).isoformat()
 
     course_date = safe_str(data.get("course_date") or (old.get("course_date") if old else ""), 30)
@@ -968,28 +4876,26 @@ def api_update_exam(exam_id):
 
     exam_url = request.host_url.rstrip("/") + f"/exam/{exam_id}"
 
-    update_range = f"Exams!A{row}:N{row}"
-    service.spreadsheets().values().update(
-        spreadsheetId=SPREADSHEET_ID,
-        range=update_range,
-        valueInputOption="RAW",
-        body={"values": [[
-            exam_id,
-            facilitator,
-            facilitator_cedula,
-            course,
-            created_at,
-            json.dumps(validated, ensure_ascii=False),
-            course_date,
-            course_duration,
-            num_invites,
-            facilitator_email,
-            system_area,
-            system_title,
-            course_description,
-            exam_url
-        ]]}
-    ).execute()
+    values = [
+        exam_id,
+        facilitator,
+        facilitator_cedula,
+        course,
+        created_at,
+        json.dumps(validated, ensure_ascii=False),
+        course_date,
+        course_duration,
+        num_invites,
+        facilitator_email,
+        system_area,
+        system_title,
+        course_description,
+        exam_url
+    ]
+    store.exams.update(row, values)
+    EXAM_CATALOG.put(exam_id, row, values)
+    if validated != old.get("custom_questions"):
+        ANALYTICS.reset_questions(exam_id)
 
     return jsonify({
         "status": "ok",
@@ -1003,16 +4909,25 @@ def api_update_exam(exam_id):
 # =========================================================
 @app.route("/exam/<exam_id>")
 def show_exam(exam_id):
-    service = get_sheets_service()
-    exam = get_exam_by_id(service, safe_str(exam_id, 20))
-    if not exam:
+    exam_id = safe_str(exam_id, 20)
+    prefetch_exam_reads(exam_id, max_age=EXAM_VERIFY_INTERVAL)
+    page = EXAM_PAGES.get(exam_id)
+    if not page:
         abort(404)
-    return render_template(
-        "exam.html",
-        exam=exam,
-        forms_url=GOOGLE_FORMS_URL,
-        default_questions_count=len(get_default_questions(service))
-    )
+
+    html, etag = page
+    resp = make_response(html)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+
+# El service worker se sirve desde la raíz para poder controlar /exam/.
+@app.route("/exam-sw.js")
+def exam_service_worker():
+    resp = send_from_directory(app.static_folder, "exam-sw.js", mimetype="text/javascript", max_age=0)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 # =========================================================
@@ -1037,8 +4952,43 @@ def submit_exam():
     if not isinstance(answers, list):
         return jsonify({"error": "Formato de respuestas inválido"}), 400
 
-    service = get_sheets_service()
-    exam = get_exam_by_id(service, exam_id)
+    # La verificación de duplicados no reutiliza lecturas de Sheets que
+    # empezaron antes de este envío.
+    g._sheets_not_before = time.monotonic()
+
+    idem_key = (request.headers.get("Idempotency-Key") or "").strip()
+    if idem_key and not IDEMPOTENCY_KEY_RE.match(idem_key):
+        return jsonify({"error": "Idempotency-Key inválida"}), 400
+    if not idem_key:
+        return grade_and_record_submission(exam_id, nombre, registro, cedula, answers, "")
+
+    payload_hash = content_hash([exam_id, nombre, registro, cedula, answers])
+    state, receipt = offload(SUBMIT_RECEIPTS.begin, idem_key, exam_id, cedula, payload_hash)
+    if state == "pending":
+        receipt = SUBMIT_RECEIPTS.wait(idem_key, SUBMIT_RECEIPT_WAIT)
+        if receipt is None:
+            # El otro intento falló (liberó la clave) o sigue calificando.
+            state, receipt = offload(SUBMIT_RECEIPTS.begin, idem_key, exam_id, cedula, payload_hash)
+    if state == "conflict":
+        return jsonify({"error": "Idempotency-Key ya usada con otro contenido"}), 422
+    if receipt is not None:
+        return replayed_submit(receipt)
+    if state == "pending":
+        resp = jsonify({"error": "El envío con esta clave todavía se está procesando"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "5"
+        return resp
+
+    try:
+        return grade_and_record_submission(exam_id, nombre, registro, cedula, answers, idem_key)
+    finally:
+        # Si no quedó recibo (404, 409, error), la clave vuelve a estar libre.
+        offload(SUBMIT_RECEIPTS.abandon, idem_key)
+
+
+def grade_and_record_submission(exam_id: str, nombre: str, registro: str, cedula: str,
+                                answers: List[Any], idem_key: str):
+    exam = load_exam_for_submit(exam_id, cedula)
     if not exam:
         return jsonify({"error": "Examen no encontrado"}), 404
 
@@ -1046,153 +4996,15 @@ def submit_exam():
     if len(answers) != len(questions):
         return jsonify({"error": "Cantidad de respuestas no coincide con el examen"}), 400
 
-    if has_submission(service, exam_id, cedula):
-        return jsonify({"error": "Ya existe un envío para esta cédula en este examen"}), 409
-
-    cleaned_answers: List[Any] = []
-    for i, q in enumerate(questions):
-        qtype = q.get("type")
-        a = answers[i]
-
-        if qtype == "check":
-            arr = safe_list_of_str(a, item_max_len=200, max_items=50)
-            if not arr and isinstance(a, str) and a.strip():
-                arr = [safe_str(a, 200)]
-            cleaned_answers.append(arr)
-        else:
-            cleaned_answers.append(safe_str(a, 500))
-
-    score = 0
-    total = 0
-    details: List[Dict[str, Any]] = []
-
-    for i, q in enumerate(questions):
-        qtype = q.get("type")
-        title = safe_str(q.get("title"), 300)
-
-        if q.get("scored", True) is not True:
-            details.append({
-                "index": i,
-                "title": title,
-                "type": safe_str(q.get("type"), 20),
-                "is_correct": None,
-                "user_value": cleaned_answers[i],
-                "correct_value": None
-            })
-            continue
-
-        if qtype in ("multiple", "true_false"):
-            correct_idx = q.get("correct", None)
-            options = q.get("options", [])
-
-            if not (isinstance(correct_idx, int) and isinstance(options, list)) or correct_idx < 0 or correct_idx >= len(options):
-                details.append({
-                    "index": i,
-                    "title": title,
-                    "type": safe_str(q.get("type"), 20),
-                    "is_correct": None,
-                    "user_value": cleaned_answers[i],
-                    "correct_value": None
-                })
-                continue
-
-            total += POINTS_PER_QUESTION
-            correct_value = safe_str(options[correct_idx], 500)
-            is_ok = isinstance(cleaned_answers[i], str) and cleaned_answers[i] == correct_value
-
-            if is_ok:
-                score += POINTS_PER_QUESTION
-
-            details.append({
-                "index": i,
-                "title": title,
-                "type": safe_str(q.get("type"), 20),
-                "is_correct": is_ok,
-                "user_value": cleaned_answers[i],
-                "correct_value": correct_value
-            })
-
-        elif qtype == "check":
-            correct_list = q.get("correct", None)
-            options = q.get("options", [])
-
-            if not (isinstance(correct_list, list) and isinstance(options, list)):
-                details.append({
-                    "index": i,
-                    "title": title,
-                    "type": safe_str(q.get("type"), 20),
-                    "is_correct": None,
-                    "user_value": cleaned_answers[i],
-                    "correct_value": None
-                })
-                continue
-
-            correct_values = []
-            ok = True
-            for idx in correct_list:
-                if not isinstance(idx, int) or idx < 0 or idx >= len(options):
-                    ok = False
-                    break
-                correct_values.append(safe_str(options[idx], 500))
-
-            if not ok:
-                details.append({
-                    "index": i,
-                    "title": title,
-                    "type": safe_str(q.get("type"), 20),
-                    "is_correct": None,
-                    "user_value": cleaned_answers[i],
-                    "correct_value": None
-                })
-                continue
-
-            total += POINTS_PER_QUESTION
-
-            user_vals = cleaned_answers[i]
-            if not isinstance(user_vals, list):
-                details.append({
-                    "index": i,
-                    "title": title,
-                    "type": safe_str(q.get("type"), 20),
-                    "is_correct": None,
-                    "user_value": cleaned_answers[i],
-                    "correct_value": correct_values
-                })
-                continue
-
-            user_clean = [safe_str(x, 500) for x in user_vals if safe_str(x, 500)]
-            user_set = set(user_clean)
-            correct_set = set(correct_values)
-            is_ok = (user_set == correct_set)
-
-            if is_ok:
-                score += POINTS_PER_QUESTION
-
-            details.append({
-                "index": i,
-                "title": title,
-                "type": safe_str(q.get("type"), 20),
-                "is_correct": is_ok,
-                "user_value": user_clean,
-                "correct_value": correct_values
-            })
-
-        else:
-            details.append({
-                "index": i,
-                "title": title,
-                "type": safe_str(q.get("type"), 20),
-                "is_correct": None,
-                "user_value": cleaned_answers[i],
-                "correct_value": None
-            })
+    plan = get_grading_plan(exam)
+    cleaned_answers, score, total, details = grade_answers(plan, answers)
 
     percent = round((score / total) * 100, 2) if total > 0 else ""
 
-    turno = safe_str(answer_by_title(questions, cleaned_answers, "Turno", ""), 200)
-    gerencia = safe_str(answer_by_title(questions, cleaned_answers, "Gerencia", ""), 200)
+    turno = safe_str(planned_answer(plan, cleaned_answers, "turno", ""), 200)
+    gerencia = safe_str(planned_answer(plan, cleaned_answers, "gerencia", ""), 200)
 
-    area_vals_any = answer_by_title(questions, cleaned_answers, "Área", [])
+    area_vals_any = planned_answer(plan, cleaned_answers, "area", [])
     area_vals = area_vals_any if isinstance(area_vals_any, list) else []
     area_vals = [safe_str(x, 200) for x in area_vals if safe_str(x, 200)]
 
@@ -1207,22 +5019,10 @@ def submit_exam():
 
     area_txt = ", ".join(area_normal)
 
-    nivel_antes = safe_str(
-        answer_by_title(questions, cleaned_answers, "¿Cómo calificarías tu nivel de conocimiento sobre el tema antes de iniciar la formación?", ""),
-        20
-    )
-    nivel = safe_str(
-        answer_by_title(questions, cleaned_answers, "¿Nivel de conocimiento del tema de la formación?", ""),
-        200
-    )
-    calif = safe_str(
-        answer_by_title(questions, cleaned_answers, "De una escala de 1 a 5 cómo calificas el entrenamiento proporcionado por el Instructor.", ""),
-        20
-    )
-    comentarios = safe_str(
-        answer_by_title(questions, cleaned_answers, "Tienes alguna sugerencia, aporte o comentarios sobre el entrenamiento recibido?", ""),
-        500
-    )
+    nivel_antes = safe_str(planned_answer(plan, cleaned_answers, "nivel_antes", ""), 20)
+    nivel = safe_str(planned_answer(plan, cleaned_answers, "nivel", ""), 200)
+    calif = safe_str(planned_answer(plan, cleaned_answers, "calif", ""), 20)
+    comentarios = safe_str(planned_answer(plan, cleaned_answers, "comentarios", ""), 500)
 
     answers_json = json.dumps(cleaned_answers, ensure_ascii=False)
 
@@ -1250,14 +5050,15 @@ def submit_exam():
     correc_json = json.dumps(correct_list, ensure_ascii=False)
     failed_json = json.dumps(failed_list, ensure_ascii=False)
 
-    submitted_at = datetime.now(UTC).isoformat()
+    # El candado por (examen, cédula) evita que dos envíos simultáneos de la
+    # misma persona pasen ambos la verificación antes de escribir.
+    with SUBMISSIONS.key_lock(exam_id, cedula):
+        if has_submission(exam_id, cedula):
+            return jsonify({"error": "Ya existe un envío para esta cédula en este examen"}), 409
 
-    service.spreadsheets().values().append(
-        spreadsheetId=SPREADSHEET_ID,
-        range=SHEET_RESPONSES,
-        valueInputOption="RAW",
-        insertDataOption="INSERT_ROWS",
-        body={"values": [[
+        submitted_at = datetime.now(UTC).isoformat()
+
+        append_response_row(exam_id, cedula, [
             exam_id,       # A
             nombre,        # B
             registro,      # C
@@ -1277,18 +5078,451 @@ def submit_exam():
             percent,       # Q
             failed_json,   # R
             correc_json    # S
-        ]]}
-    ).execute()
+        ])
+        SUBMISSIONS.add(exam_id, cedula)
+        ANALYTICS.record(exam_id, cedula, cleaned_answers, percent, details, turno, gerencia, submitted_at)
+
+        result = {
+            "status": "ok",
+            "score": score,
+            "total": total,
+            "percent": percent,
+            "details": details,
+            "failed_json": failed_list,
+            "correc_json": correct_list
+        }
+        if idem_key:
+            # El envío ya quedó guardado: sin recibo, un reintento recibe 409.
+            try:
+                offload(SUBMIT_RECEIPTS.put, idem_key, result)
+            except Exception as e:
+                app.logger.warning("No se pudo guardar el recibo del envío: %s", e)
+
+    return jsonify(result)
+
+
+# =========================================================
+# EXPORTAR RESPUESTAS (ADMIN)
+# =========================================================
+# CSV y XLSX generados fila a fila: la fuente se lee por tramos y cada
+# tramo se envía en cuanto está listo, sin juntar el archivo en memoria.
+RESPONSES_EXPORT_CHUNK = int(os.getenv("RESPONSES_EXPORT_CHUNK", "2000"))
+EXPORT_FLUSH_ROWS = 200
+
+EXPORT_BASE_COLUMNS = [
+    ("Nombre", 1),
+    ("Registro", 2),
+    ("Cédula", 3),
+    ("Turno", 4),
+    ("Gerencia", 5),
+    ("Área", 6),
+    ("Área (otro)", 7),
+    ("Nivel antes", 8),
+    ("Nivel", 9),
+    ("Calificación", 10),
+    ("Comentarios", 11),
+    ("Enviado", 13),
+    ("Puntaje", 14),
+    ("Total", 15),
+    ("Porcentaje", 16),
+]
+EXPORT_NUMERIC_COLUMNS = {12, 13, 14}
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+XML_INVALID_CHARS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+NUMBER_RE = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def iter_response_rows(exam_id: str) -> Iterator[List[Any]]:
+    # Filas guardadas del examen y, al final, las que siguen en la cola de
+    # escritura diferida (sin repetir las que se volcaron mientras tanto).
+    seen = set()
+    for _, values in STORAGE.responses.iter_rows(exam_id, RESPONSES_EXPORT_CHUNK):
+        seen.add(safe_get(values, 3, ""))
+        yield values
+    for values in RESPONSES_QUEUE.pending_rows(exam_id):
+        if safe_get(values, 3, "") not in seen:
+            yield values
+
+
+def _export_cell(value: Any) -> str:
+    if isinstance(value, list):
+        return ", ".join(safe_str(x, 500) for x in value)
+    return safe_str(value, 5000)
+
+
+def export_layout(exam: Dict[str, Any]):
+    # Encabezado y función que convierte una fila de Responses en la fila
+    # exportada: una columna por pregunta y, en las que se califican, otra
+    # con el resultado.
+    questions = exam.get("questions", [])
+    plan = get_grading_plan(exam)
+    graded = {i for i, item in enumerate(plan["items"]) if item[1] != GRADE_NONE}
+
+    header = [label for label, _ in EXPORT_BASE_COLUMNS]
+    for i, q in enumerate(questions):
+        title = safe_str(q.get("title"), 300) or f"Pregunta {i + 1}"
+        header.append(f"{i + 1}. {title}")
+        if i in graded:
+            header.append(f"{i + 1}. Resultado")
+
+    def record(values: List[Any]) -> List[str]:
+        out = [safe_get(values, idx, "") for _, idx in EXPORT_BASE_COLUMNS]
+        answers = _json_list(values[12] if len(values) > 12 else "")
+        failed = {d.get("index") for d in _json_list(values[17] if len(values) > 17 else "") if isinstance(d, dict)}
+        correct = {d.get("index") for d in _json_list(values[18] if len(values) > 18 else "") if isinstance(d, dict)}
+
+        for i in range(len(questions)):
+            out.append(_export_cell(answers[i]) if i < len(answers) else "")
+            if i in graded:
+                out.append("Correcta" if i in correct else "Incorrecta" if i in failed else "")
+        return out
+
+    return header, record
+
+
+def _csv_safe(value: str) -> str:
+    # Evita que Excel interprete como fórmula un texto escrito por el usuario.
+    return "'" + value if value.startswith(CSV_FORMULA_PREFIXES) else value
+
+
+def _csv_chunks(header: List[str], records: Iterator[List[str]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM para que Excel abra el archivo como UTF-8.
+    buf.write("\ufeff")
+    writer.writerow(header)
+    yield buf.getvalue()
+
+    buf.seek(0)
+    buf.truncate()
+    for n, rec in enumerate(records, start=1):
+        writer.writerow([v if i in EXPORT_NUMERIC_COLUMNS else _csv_safe(v) for i, v in enumerate(rec)])
+        if n % EXPORT_FLUSH_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+class _ChunkSink:
+    # Destino sin seek para zipfile: guarda lo escrito hasta que el
+    # generador lo entrega.
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+XLSX_STATIC_PARTS = [
+    ("[Content_Types].xml",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ("_rels/.rels",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ("xl/workbook.xml",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Respuestas" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ("xl/_rels/workbook.xml.rels",
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+]
+
+
+def _xlsx_column(i: int) -> str:
+    name = ""
+    i += 1
+    while i:
+        i, rem = divmod(i - 1, 26)
+        name = chr(65 + rem) + name
+    return name
+
+
+def _xlsx_row(n: int, values: List[str], columns: List[str], numeric: set) -> str:
+    cells = []
+    for i, v in enumerate(values):
+        if not v:
+            continue
+        ref = f"{columns[i]}{n}"
+        if i in numeric and NUMBER_RE.match(v):
+            cells.append(f'<c r="{ref}"><v>{v}</v></c>')
+        else:
+            text = xml_escape(XML_INVALID_CHARS_RE.sub("", v))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{n}">{"".join(cells)}</row>'
+
+
+def _xlsx_chunks(header: List[str], records: Iterator[List[str]]) -> Iterator[bytes]:
+    # XLSX mínimo (una hoja, textos en línea) escrito directamente en un zip
+    # que se va entregando por partes.
+    columns = [_xlsx_column(i) for i in range(len(header))]
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, body in XLSX_STATIC_PARTS:
+            zf.writestr(name, body)
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(1, header, columns, set())
+            ).encode("utf-8"))
+            yield sink.take()
+
+            for n, rec in enumerate(records, start=2):
+                sheet.write(_xlsx_row(n, rec, columns, EXPORT_NUMERIC_COLUMNS).encode("utf-8"))
+                if n % EXPORT_FLUSH_ROWS == 0:
+                    yield sink.take()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.take()
+
+
+EXPORT_FORMATS = {
+    "csv": (_csv_chunks, "text/csv; charset=utf-8"),
+    "xlsx": (_xlsx_chunks, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+@app.route("/api/admin/exam/<exam_id>/responses.<fmt>", methods=["GET"])
+@admin_required
+def api_admin_export_responses(exam_id, fmt):
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    exam = get_exam_by_id(safe_str(exam_id, 20))
+    if not exam:
+        return jsonify({"error": "Examen no encontrado"}), 404
+
+    header, record = export_layout(exam)
+    records = (record(values) for values in iter_response_rows(exam["id"]))
+    chunks, mimetype = EXPORT_FORMATS[fmt]
+
+    filename = re.sub(r"[^A-Za-z0-9_-]", "", exam["id"]) or "examen"
+    resp = Response(stream_with_context(chunks(header, records)), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f'attachment; filename="respuestas_{filename}.{fmt}"'
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+# =========================================================
+# ANALÍTICA (ADMIN)
+# =========================================================
+@app.route("/api/admin/exam/<exam_id>/analytics", methods=["GET"])
+@admin_required
+def api_admin_exam_analytics(exam_id):
+    exam = get_exam_by_id(safe_str(exam_id, 20))
+    if not exam:
+        return jsonify({"error": "Examen no encontrado"}), 404
+
+    if request.args.get("rebuild") == "1":
+        ANALYTICS.rebuild()
+    else:
+        ANALYTICS.sync()
+    return jsonify(ANALYTICS.report(exam))
+
+
+# =========================================================
+# PRECALENTAMIENTO DE EXÁMENES PRÓXIMOS (por course_date)
+# =========================================================
+# Con la primera petición de cada worker y después cada PREWARM_INTERVAL
+# segundos se toman los exámenes cuya course_date cae entre
+# PREWARM_DAYS_BEFORE días antes y PREWARM_DAYS_AFTER días después de hoy
+# (en APP_TIMEZONE, o la hora local del servidor), y se dejan listos en este proceso: fila completa en
+# el catálogo, plan de calificación, página renderizada y claves de
+# Responses cargadas. Todo lo que falta se pide a Sheets en una sola lectura
+# por lote, así el primer participante de la sesión no paga el camino frío.
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "900"))
+PREWARM_DAYS_BEFORE = int(os.getenv("PREWARM_DAYS_BEFORE", "1"))
+PREWARM_DAYS_AFTER = int(os.getenv("PREWARM_DAYS_AFTER", "1"))
+PREWARM_MAX_EXAMS = int(os.getenv("PREWARM_MAX_EXAMS", str(min(EXAM_PAGE_CACHE_SIZE, 100))))
+APP_TIMEZONE = os.getenv("APP_TIMEZONE", "")
+
+
+def local_today() -> date:
+    # Las course_date son fechas del calendario local de los cursos.
+    if APP_TIMEZONE:
+        return datetime.now(ZoneInfo(APP_TIMEZONE)).date()
+    return datetime.now().date()
+
+
+def _course_day(value: Any) -> Optional[date]:
+    try:
+        return datetime.strptime(safe_str(value, 30).strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+class ExamPrewarmer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._exams: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats: Dict[str, Any] = {
+            "runs": 0, "skipped": 0, "warmed": 0, "errors": 0, "last_run_at": None, "last_run_ms": None,
+        }
+
+    def window(self) -> Tuple[date, date]:
+        today = local_today()
+        return today - timedelta(days=PREWARM_DAYS_BEFORE), today + timedelta(days=PREWARM_DAYS_AFTER)
+
+    def select(self, blocking: bool = True) -> Optional[List[str]]:
+        # Sin bloquear, None si el catálogo lo está leyendo otro hilo: las
+        # peticiones que lo esperan van primero y el ciclo se salta.
+        if not EXAM_CATALOG.refresh(blocking):
+            return None
+        first, last = self.window()
+        today = local_today()
+        picked = []
+        for _, e in EXAM_CATALOG.entries()[1]:
+            day = _course_day(e["course_date"])
+            if day is not None and first <= day <= last:
+                picked.append((abs((day - today).days), e["id"]))
+        # Si no caben todos, primero los de hoy.
+        picked.sort()
+        return [exam_id for _, exam_id in picked[:PREWARM_MAX_EXAMS]]
+
+    def _warm(self, exam_ids: List[str], reason: str) -> List[Dict[str, Any]]:
+        ranges = CONFIG_CACHE.pending_ranges() + SUBMISSIONS.pending_ranges("", "")
+        for exam_id in exam_ids:
+            ranges += EXAM_CATALOG.pending_ranges(exam_id, max_age=EXAM_VERIFY_INTERVAL)
+        prefetch_reads(list(dict.fromkeys(ranges)))
+        SUBMISSIONS.sync()
+
+        results = []
+        for exam_id in exam_ids:
+            started = time.perf_counter()
+            info: Dict[str, Any] = {"exam_id": exam_id, "reason": reason, "warmed_at": datetime.now(UTC).isoformat()}
+            try:
+                exam = get_exam_by_id(exam_id, EXAM_VERIFY_INTERVAL)
+                if exam is None:
+                    info["error"] = "Examen no encontrado"
+                else:
+                    info["course_date"] = exam["course_date"]
+                    get_grading_plan(exam)
+                    EXAM_PAGES.get(exam_id)
+            except Exception as e:
+                app.logger.exception("No se pudo precalentar el examen %s", exam_id)
+                info["error"] = str(e)[:300]
+            info["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results.append(info)
+
+        with self._lock:
+            for info in results:
+                self._exams.pop(info["exam_id"], None)
+                self._exams[info["exam_id"]] = info
+            while len(self._exams) > PREWARM_MAX_EXAMS * 2:
+                self._exams.popitem(last=False)
+            self.stats["warmed"] += sum(1 for info in results if "error" not in info)
+            self.stats["errors"] += sum(1 for info in results if "error" in info)
+        return results
+
+    def warm(self, exam_ids: List[str], lane: str = "background", reason: str = "manual") -> List[Dict[str, Any]]:
+        # Fuera de una petición hace falta un contexto para el cliente de
+        # Sheets, la memoria de lecturas y render_template.
+        with app.test_request_context("/"), sheets_lane(lane):
+            return self._warm(exam_ids, reason)
+
+    def run_once(self, lane: str = "background") -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        with app.test_request_context("/"), sheets_lane(lane):
+            exam_ids = self.select(blocking=lane != "background")
+            if exam_ids is None:
+                with self._lock:
+                    self.stats["skipped"] += 1
+                return []
+            results = self._warm(exam_ids, "course_date")
+        with self._lock:
+            self.stats["runs"] += 1
+            self.stats["last_run_at"] = datetime.now(UTC).isoformat()
+            self.stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return results
+
+    def ensure_started(self) -> None:
+        # Las cachés son de cada proceso: cada worker calienta las suyas.
+        if not PREWARM_ENABLED or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            try:
+                self.run_once()
+            except Exception:
+                app.logger.exception("No se pudieron precalentar los exámenes próximos")
+            time.sleep(PREWARM_INTERVAL)
+
+    def snapshot(self) -> Dict[str, Any]:
+        first, last = self.window()
+        with self._lock:
+            exams = [dict(info) for info in self._exams.values()]
+            stats = dict(self.stats)
+        for info in exams:
+            info["catalog_warm"] = EXAM_CATALOG.cached(info["exam_id"])
+            info["page_warm"] = EXAM_PAGES.cached(info["exam_id"])
+        return {
+            **stats,
+            "enabled": PREWARM_ENABLED,
+            "interval_seconds": PREWARM_INTERVAL,
+            "window": {"from": first.isoformat(), "to": last.isoformat()},
+            "submissions_loaded": SUBMISSIONS.snapshot()["loaded"],
+            "exams": exams,
+        }
+
+
+PREWARMER = ExamPrewarmer()
+
+
+@app.before_request
+def _start_prewarmer():
+    PREWARMER.ensure_started()
+
+
+@app.route("/api/admin/prewarm", methods=["GET"])
+@admin_required
+def api_admin_prewarm_status():
+    return jsonify(PREWARMER.snapshot())
+
+
+@app.route("/api/admin/prewarm", methods=["POST"])
+@admin_required
+def api_admin_prewarm():
+    data = request.get_json(silent=True) or {}
+    exam_id = safe_str(data.get("exam_id"), 20)
+    if not exam_id:
+        return jsonify({"status": "ok", "warmed": PREWARMER.run_once(lane="admin")})
+
+    result = PREWARMER.warm([exam_id], lane="admin")[0]
+    if result.get("error") == "Examen no encontrado":
+        return jsonify({"error": "Examen no encontrado"}), 404
+    return jsonify({"status": "ok", "warmed": [result]})
 
-    return jsonify({
-        "status": "ok",
-        "score": score,
-        "total": total,
-        "percent": percent,
-        "details": details,
-        "failed_json": failed_list,
-        "correc_json": correct_list
-    })
 
 
 # =========================================================
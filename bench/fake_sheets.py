@@ -0,0 +1,386 @@
+# Sheets falso para pruebas de carga sin tocar la hoja real.
+#
+# Implementa por HTTP la parte de la API v4 que usa app.py:
+# values.get, values.batchGet, values.append, values.update y
+# spreadsheets.get (solo el tamaño de la cuadrícula). Se siembra con
+# N exámenes y M respuestas y puede añadir latencia, 429 aleatorios o una
+# cuota por minuto como la de Google. La app lo usa con
+#
+#     SHEETS_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+#
+# Uso:
+#     python bench/fake_sheets.py --port 8765 --exams 200 --responses 100000 \
+#         --latency-ms 80 --jitter-ms 30 --error-rate 0.01
+#
+# GET /_stats devuelve las llamadas atendidas por operación y
+# POST /_stats/reset las pone a cero.
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter, deque
+from datetime import datetime, timedelta, UTC
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+_CELL_RE = re.compile(r"^([A-Z]*)([0-9]*)$")
+
+SEED_AREAS = ["Producción", "Calidad", "Mantenimiento", "Seguridad", "Logística"]
+SEED_TITLES = ["Inducción", "BPM", "Lockout", "Montacargas", "HACCP", "Primeros auxilios"]
+
+# Respuestas a las 7 preguntas fijas (sin sobrescrituras en Config).
+DEFAULT_ANSWERS = ["Turno 1", "Terceros", ["Mezclas"], "3", "Experto", "5", "Sin comentarios"]
+
+SEED_QUESTIONS = [
+    {"title": "Pregunta 1", "type": "multiple", "options": ["a", "b", "c"], "correct": 1},
+    {"title": "Pregunta 2", "type": "check", "options": ["x", "y", "z"], "correct": [0, 2]},
+    {"title": "Pregunta 3", "type": "true_false", "correct": 0},
+]
+SEED_ANSWERS = ["b", ["x", "z"], "VERDADERO"]
+
+
+def _column_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+
+def parse_range(a1: str) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+    # -> (hoja, col_inicio, fila_inicio, col_fin, fila_fin); None = hasta el final.
+    sheet, _, cells = a1.partition("!")
+    if not cells:
+        return sheet, 0, 1, None, None
+    start, _, end = cells.partition(":")
+    end = end or start
+    m1, m2 = _CELL_RE.match(start), _CELL_RE.match(end)
+    if not m1 or not m2:
+        raise ValueError(f"Rango inválido: {a1}")
+    c0 = _column_index(m1.group(1)) if m1.group(1) else 0
+    r0 = int(m1.group(2)) if m1.group(2) else 1
+    c1 = _column_index(m2.group(1)) if m2.group(1) else None
+    r1 = int(m2.group(2)) if m2.group(2) else None
+    return sheet, c0, r0, c1, r1
+
+
+def _cell(value: Any) -> str:
+    # Con valueInputOption=RAW Sheets devuelve todo como texto.
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return value if isinstance(value, str) else str(value)
+
+
+class SheetStore:
+    def __init__(self):
+        self.sheets: Dict[str, List[List[str]]] = {"Exams": [], "Responses": [], "Config": []}
+        self.lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.exam_ids: List[str] = []
+
+    def seed(self, exams: int, responses: int, seed: int = 1, host: str = "http://127.0.0.1:5000") -> None:
+        rng = random.Random(seed)
+        questions_json = json.dumps(SEED_QUESTIONS, ensure_ascii=False)
+        base_date = datetime(2024, 1, 1, tzinfo=UTC)
+
+        exams_rows = self.sheets["Exams"]
+        for i in range(exams):
+            exam_id = f"{i:08x}"
+            created = base_date + timedelta(hours=i)
+            exams_rows.append([
+                exam_id,
+                f"FACILITADOR {i % 40}",
+                str(10000000 + i % 40),
+                f"Curso {i}",
+                created.isoformat(),
+                questions_json,
+                created.date().isoformat(),
+                "2",
+                str(rng.randint(10, 60)),
+                f"facilitador{i % 40}@example.com",
+                SEED_AREAS[i % len(SEED_AREAS)],
+                SEED_TITLES[i % len(SEED_TITLES)],
+                f"Descripción del curso {i}",
+                f"{host}/exam/{exam_id}",
+            ])
+            self.exam_ids.append(exam_id)
+
+        if not self.exam_ids:
+            return
+
+        # Las cadenas repetidas se comparten entre filas para que un millón
+        # de respuestas quepa en memoria.
+        answers_json = json.dumps(DEFAULT_ANSWERS + SEED_ANSWERS, ensure_ascii=False)
+        details_json = json.dumps([], ensure_ascii=False)
+        submitted = base_date.isoformat()
+        responses_rows = self.sheets["Responses"]
+        for j in range(responses):
+            responses_rows.append([
+                self.exam_ids[j % len(self.exam_ids)],
+                "PARTICIPANTE",
+                str(j),
+                str(50000000 + j),
+                "Turno 1",
+                "Terceros",
+                "Mezclas",
+                "",
+                "3",
+                "Experto",
+                "5",
+                "",
+                answers_json,
+                submitted,
+                "3",
+                "3",
+                "100",
+                details_json,
+                details_json,
+            ])
+
+    def read(self, a1: str, major: str = "ROWS") -> Dict[str, Any]:
+        sheet, c0, r0, c1, r1 = parse_range(a1)
+        with self.lock:
+            rows = self.sheets.setdefault(sheet, [])
+            end = len(rows) if r1 is None else min(r1, len(rows))
+            values = []
+            for row in rows[r0 - 1:end]:
+                seg = row[c0:] if c1 is None else row[c0:c1 + 1]
+                end_col = len(seg)
+                while end_col and seg[end_col - 1] == "":
+                    end_col -= 1
+                values.append(seg[:end_col])
+        while values and not values[-1]:
+            values.pop()
+        if major == "COLUMNS" and values:
+            width = max(len(r) for r in values)
+            values = [[r[j] if j < len(r) else "" for r in values] for j in range(width)]
+            for col in values:
+                while col and col[-1] == "":
+                    col.pop()
+        result: Dict[str, Any] = {"range": a1, "majorDimension": major}
+        if values:
+            result["values"] = values
+        return result
+
+    def append(self, a1: str, values: List[List[Any]]) -> Dict[str, Any]:
+        sheet = a1.partition("!")[0]
+        with self.lock:
+            rows = self.sheets.setdefault(sheet, [])
+            start = len(rows) + 1
+            rows.extend([_cell(v) for v in row] for row in values)
+            end = len(rows)
+        width = max((len(r) for r in values), default=1)
+        last_col = ""
+        n = width
+        while n:
+            n, rem = divmod(n - 1, 26)
+            last_col = chr(65 + rem) + last_col
+        return {
+            "tableRange": f"{sheet}!A1:{last_col}{start - 1}",
+            "updates": {
+                "updatedRange": f"{sheet}!A{start}:{last_col}{end}",
+                "updatedRows": end - start + 1,
+            },
+        }
+
+    def metadata(self, names: List[str]) -> Dict[str, Any]:
+        # Como en Sheets, la cuadrícula tiene al menos 1000 filas y 26 columnas.
+        with self.lock:
+            sheets = [
+                {"properties": {"title": name, "gridProperties": {
+                    "rowCount": max(1000, len(rows)),
+                    "columnCount": max([26] + [len(r) for r in rows]),
+                }}}
+                for name, rows in self.sheets.items()
+                if not names or name in names
+            ]
+        return {"sheets": sheets}
+
+    def update(self, a1: str, values: List[List[Any]]) -> Dict[str, Any]:
+        sheet, c0, r0, _, _ = parse_range(a1)
+        with self.lock:
+            rows = self.sheets.setdefault(sheet, [])
+            for i, new in enumerate(values):
+                while len(rows) < r0 + i:
+                    rows.append([])
+                row = rows[r0 - 1 + i]
+                if len(row) < c0 + len(new):
+                    row.extend([""] * (c0 + len(new) - len(row)))
+                for j, v in enumerate(new):
+                    row[c0 + j] = _cell(v)
+        return {"updatedRange": a1, "updatedRows": len(values)}
+
+
+class Faults:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, quota_per_minute: int = 0, seed: int = 1):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: Dict[str, deque] = {"read": deque(), "write": deque()}
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def should_throttle(self, kind: str) -> bool:
+        with self._lock:
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return True
+            if not self.quota_per_minute:
+                return False
+            # Ventana deslizante de 60 s, como la cuota por minuto de Google.
+            window = self._window[kind]
+            now = time.monotonic()
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.quota_per_minute:
+                return True
+            window.append(now)
+            return False
+
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store: SheetStore
+    faults: Faults
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _route(self, method: str) -> None:
+        parts = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(parts.query)
+        path = urllib.parse.unquote(parts.path)
+        # El cuerpo se lee siempre para no desalinear la conexión keep-alive.
+        body = self._body() if method != "GET" else {}
+
+        if path == "/_stats":
+            if method == "GET":
+                with self.store.lock:
+                    rows = {name: len(rows) for name, rows in self.store.sheets.items()}
+                return self._send(200, {"calls": dict(self.store.calls), "rows": rows, "exam_ids": len(self.store.exam_ids)})
+        if path == "/_stats/reset" and method == "POST":
+            self.store.calls.clear()
+            return self._send(200, {"ok": True})
+        if path == "/_exam_ids" and method == "GET":
+            return self._send(200, {"exam_ids": self.store.exam_ids})
+
+        m = re.match(r"^/v4/spreadsheets/[^/]+(?:/values(?::(batchGet)|/(.+)))?$", path)
+        if not m or (method != "GET" and not m.group(1) and not m.group(2)):
+            return self._send(404, {"error": {"code": 404, "message": f"Ruta no soportada: {method} {path}", "status": "NOT_FOUND"}})
+
+        if not m.group(1) and not m.group(2):
+            op = "metadata"
+        elif m.group(1):
+            op = "batchGet"
+        elif method == "POST" and m.group(2).endswith(":append"):
+            op = "append"
+        elif method == "PUT":
+            op = "update"
+        else:
+            op = "get"
+        kind = "read" if method == "GET" else "write"
+
+        delay = self.faults.delay()
+        if delay:
+            time.sleep(delay)
+        if self.faults.should_throttle(kind):
+            self.store.calls[f"{op}_429"] += 1
+            return self._send(429, {"error": {
+                "code": 429,
+                "message": "Quota exceeded for quota metric 'Read requests' (fake)",
+                "status": "RESOURCE_EXHAUSTED",
+            }})
+        self.store.calls[op] += 1
+
+        try:
+            if op == "metadata":
+                # ranges=Responses o Responses!A1:S: solo cuenta el nombre de la hoja.
+                names = [r.partition("!")[0].strip("'") for r in query.get("ranges", [])]
+                return self._send(200, self.store.metadata(names))
+            if op == "batchGet":
+                major = (query.get("majorDimension") or ["ROWS"])[0]
+                ranges = query.get("ranges", [])
+                return self._send(200, {"valueRanges": [self.store.read(r, major) for r in ranges]})
+            if op == "get":
+                major = (query.get("majorDimension") or ["ROWS"])[0]
+                return self._send(200, self.store.read(m.group(2), major))
+            values = body.get("values", [])
+            if op == "append":
+                return self._send(200, self.store.append(m.group(2)[:-len(":append")], values))
+            return self._send(200, self.store.update(m.group(2), values))
+        except ValueError as e:
+            return self._send(400, {"error": {"code": 400, "message": str(e), "status": "INVALID_ARGUMENT"}})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+
+def make_server(store: SheetStore, faults: Faults, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("BoundFakeSheetsHandler", (FakeSheetsHandler,), {"store": store, "faults": faults})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sheets falso para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--exams", type=int, default=50)
+    parser.add_argument("--responses", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-url", default="http://127.0.0.1:5000", help="Base de los exam_url sembrados")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de llamadas que responden 429")
+    parser.add_argument("--quota-per-minute", type=int, default=0, help="Cuota de lecturas y de escrituras (0 = sin cuota)")
+    args = parser.parse_args()
+
+    store = SheetStore()
+    started = time.perf_counter()
+    store.seed(args.exams, args.responses, args.seed, args.app_url)
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.quota_per_minute, args.seed)
+    server = make_server(store, faults, args.host, args.port)
+    print(
+        f"Sheets falso en http://{args.host}:{server.server_address[1]} "
+        f"({args.exams} exámenes, {args.responses} respuestas, sembrado en {time.perf_counter() - started:.1f}s)",
+        flush=True
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# Escenarios de carga contra un Sheets falso (bench/fake_sheets.py).
+#
+# Levanta el Sheets falso en un subproceso, sembrado con --exams y
+# --responses, arranca la app en un servidor con hilos (o usa --target si ya
+# corre, p. ej. bajo gunicorn con SHEETS_API_ENDPOINT apuntando al falso) y
+# ejecuta:
+#
+#   exam_open     apertura en ráfaga de /exam/<id> por todo un salón
+#   submit_storm  todos envían /submit_exam al final de la sesión
+#   admin_poll    el panel consulta /api/exams/filter una y otra vez
+#
+# Por escenario reporta p50/p95/p99, peticiones por segundo, códigos HTTP y
+# llamadas a Sheets por petición (contadas por el falso). Ejemplo:
+#
+#     python bench/run.py --exams 500 --responses 100000 --latency-ms 80
+#     python bench/run.py --responses 1000000 --scenarios submit_storm --json out.json
+import argparse
+import http.client
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_sheets import DEFAULT_ANSWERS, SEED_ANSWERS  # noqa: E402
+
+SCENARIOS = ("exam_open", "submit_storm", "admin_poll")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Client:
+    # Una conexión keep-alive por hilo.
+    def __init__(self, base_url: str):
+        parts = urllib.parse.urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._local = threading.local()
+        self.cookie = ""
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        return conn
+
+    def request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                if resp.will_close:
+                    conn.close()
+                    self._local.conn = None
+                return resp.status, data, dict(resp.getheaders())
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        raise RuntimeError("inalcanzable")
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(name: str, calls: List[Callable[[], int]], concurrency: int, fake: Client) -> Dict[str, Any]:
+    fake.request("POST", "/_stats/reset", {})
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    lock = threading.Lock()
+
+    def timed(call: Callable[[], int]) -> None:
+        started = time.perf_counter()
+        try:
+            status = call()
+        except Exception:
+            status = 0
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, calls))
+    wall = time.perf_counter() - started
+
+    sheets_calls = json.loads(fake.request("GET", "/_stats")[1])["calls"]
+    n = len(latencies)
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": n,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n / wall, 1) if wall else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "sheets_calls": sheets_calls,
+        "sheets_calls_per_request": round(sum(sheets_calls.values()) / n, 3) if n else 0.0,
+    }
+
+
+def exam_open_calls(app: Client, exam_id: str, count: int) -> List[Callable[[], int]]:
+    return [lambda: app.request("GET", f"/exam/{exam_id}")[0] for _ in range(count)]
+
+
+def submit_storm_calls(app: Client, exam_id: str, count: int, first_cedula: int) -> List[Callable[[], int]]:
+    def submit(i: int) -> int:
+        return app.request("POST", "/submit_exam", {
+            "exam_id": exam_id,
+            "nombre": f"Participante {i}",
+            "registro": str(i),
+            "cedula": str(first_cedula + i),
+            "answers": DEFAULT_ANSWERS + SEED_ANSWERS,
+        })[0]
+    return [lambda i=i: submit(i) for i in range(count)]
+
+
+def admin_poll_calls(app: Client, count: int) -> List[Callable[[], int]]:
+    queries = [
+        "/api/exams/filter?limit=50",
+        "/api/exams/filter?system_area=Calidad&limit=50",
+        "/api/exams/filter?q=curso%201&limit=50",
+        "/api/exams/filter?date_from=2024-02-01&date_to=2024-03-01",
+    ]
+    return [lambda i=i: app.request("GET", queries[i % len(queries)])[0] for i in range(count)]
+
+
+def start_fake(args, port: int) -> subprocess.Popen:
+    cmd = [
+        sys.executable, os.path.join(BENCH_DIR, "fake_sheets.py"),
+        "--port", str(port),
+        "--exams", str(args.exams),
+        "--responses", str(args.responses),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--quota-per-minute", str(args.fake_quota),
+    ]
+    proc = subprocess.Popen(cmd)
+    fake = Client(f"http://127.0.0.1:{port}")
+    deadline = time.monotonic() + 600
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("El Sheets falso terminó al arrancar")
+        try:
+            fake.request("GET", "/_stats")
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit("El Sheets falso no respondió a tiempo")
+
+
+def start_app(args, fake_port: int) -> str:
+    # La configuración de app.py se lee al importar: primero el entorno.
+    instance = tempfile.mkdtemp(prefix="webeval-bench-")
+    os.environ.update({
+        "SHEETS_API_ENDPOINT": f"http://127.0.0.1:{fake_port}",
+        "SPREADSHEET_ID": "bench",
+        "STORAGE_BACKEND": "sheets",
+        "FLASK_INSTANCE_PATH": instance,
+        "ASSETS_BUILD_ON_START": "0",
+        "ADMIN_PASSWORD": args.admin_password,
+    })
+    if args.app_quota:
+        os.environ.setdefault("SHEETS_READS_PER_MINUTE", str(args.app_quota))
+        os.environ.setdefault("SHEETS_WRITES_PER_MINUTE", str(args.app_quota))
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    import app as webapp
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pruebas de carga con un Sheets falso")
+    parser.add_argument("--exams", type=int, default=200)
+    parser.add_argument("--responses", type=int, default=10000)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--opens", type=int, default=600, help="Aperturas de /exam/<id> en exam_open")
+    parser.add_argument("--submits", type=int, default=300, help="Envíos en submit_storm")
+    parser.add_argument("--polls", type=int, default=300, help="Consultas en admin_poll")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-quota", type=int, default=0, help="Cuota por minuto del Sheets falso (0 = sin cuota)")
+    parser.add_argument("--app-quota", type=int, default=1000000, help="Cuota por minuto que asume la app (0 = la de la app)")
+    parser.add_argument("--target", default="", help="URL de una app ya en marcha")
+    parser.add_argument("--fake-url", default="", help="URL de un Sheets falso ya en marcha")
+    parser.add_argument("--admin-password", default="bench")
+    parser.add_argument("--json", default="", help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Escenarios desconocidos: {', '.join(unknown)}")
+
+    proc = None
+    if args.fake_url:
+        fake_url = args.fake_url.rstrip("/")
+    else:
+        port = _free_port()
+        proc = start_fake(args, port)
+        fake_url = f"http://127.0.0.1:{port}"
+    fake = Client(fake_url)
+
+    try:
+        base_url = args.target.rstrip("/") if args.target else start_app(args, urllib.parse.urlsplit(fake_url).port)
+        app = Client(base_url)
+        exam_ids = json.loads(fake.request("GET", "/_exam_ids")[1])["exam_ids"]
+        if not exam_ids:
+            raise SystemExit("Hace falta al menos un examen sembrado (--exams)")
+        hot_exam = exam_ids[len(exam_ids) // 2]
+
+        results = []
+        for name in scenarios:
+            if name == "exam_open":
+                calls = exam_open_calls(app, hot_exam, args.opens)
+            elif name == "submit_storm":
+                calls = submit_storm_calls(app, hot_exam, args.submits, 900000000 + int(time.time()) % 1000000 * 1000)
+            else:
+                status, _, headers = app.request("POST", "/api/admin/login", {"password": args.admin_password})
+                if status != 200:
+                    raise SystemExit(f"No se pudo iniciar sesión como admin ({status})")
+                app.cookie = headers.get("Set-Cookie", "").split(";", 1)[0]
+                calls = admin_poll_calls(app, args.polls)
+            result = run_scenario(name, calls, args.concurrency, fake)
+            result.update({"exams": args.exams, "responses": args.responses})
+            results.append(result)
+            print(
+                f"{name:<13} n={result['requests']:<5} c={result['concurrency']:<3} "
+                f"p50={result['p50_ms']:>8.1f}ms p95={result['p95_ms']:>8.1f}ms p99={result['p99_ms']:>8.1f}ms "
+                f"rps={result['throughput_rps']:>7.1f} sheets/req={result['sheets_calls_per_request']:<6} "
+                f"status={result['statuses']}",
+                flush=True
+            )
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -177,7 +177,7 @@
 
   async function loadPublicConfig() {
     try {
-      const res = await fetch("/api/config/public", { cache: "no-store" });
+      const res = await fetch("/api/config/public", { cache: "no-cache" });
       const data = await res.json().catch(() => ({}));
 
       const areas = Array.isArray(data.system_areas) ? data.system_areas : [];
@@ -0,0 +1,128 @@
+// Almacén offline del examen, compartido por la página y el service worker
+// (exam-sw.js lo carga con importScripts): borradores de respuestas y cola
+// de envíos pendientes en IndexedDB.
+const EXAM_DB_NAME = "webeval-exam";
+const EXAM_DB_VERSION = 1;
+
+// Reintentos: backoff exponencial con jitter completo; si el servidor manda
+// Retry-After (503 por cuota de Sheets) se respeta como mínimo.
+const SUBMIT_RETRY_BASE_MS = 2000;
+const SUBMIT_RETRY_MAX_MS = 5 * 60 * 1000;
+
+// Los borradores viejos se borran al abrir cualquier examen.
+const EXAM_DRAFT_MAX_AGE_MS = 12 * 60 * 60 * 1000;
+
+function examDbOpen() {
+  return new Promise((resolve, reject) => {
+    const req = indexedDB.open(EXAM_DB_NAME, EXAM_DB_VERSION);
+    req.onupgradeneeded = () => {
+      const db = req.result;
+      if (!db.objectStoreNames.contains("drafts")) db.createObjectStore("drafts", { keyPath: "examId" });
+      if (!db.objectStoreNames.contains("outbox")) db.createObjectStore("outbox", { keyPath: "key" });
+    };
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+async function examDbRun(storeName, mode, fn) {
+  const db = await examDbOpen();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(storeName, mode);
+    const req = fn(tx.objectStore(storeName));
+    tx.oncomplete = () => { db.close(); resolve(req ? req.result : undefined); };
+    tx.onerror = tx.onabort = () => { db.close(); reject(tx.error); };
+  });
+}
+
+const examStore = {
+  getDraft: examId => examDbRun("drafts", "readonly", s => s.get(examId)),
+  putDraft: draft => examDbRun("drafts", "readwrite", s => s.put(draft)),
+  deleteDraft: examId => examDbRun("drafts", "readwrite", s => s.delete(examId)),
+  purgeDrafts: maxAgeMs => examDbRun("drafts", "readwrite", s => {
+    const cutoff = Date.now() - maxAgeMs;
+    s.openCursor().onsuccess = e => {
+      const cursor = e.target.result;
+      if (!cursor) return;
+      if (!(cursor.value.savedAt > cutoff)) cursor.delete();
+      cursor.continue();
+    };
+  }),
+  queued: () => examDbRun("outbox", "readonly", s => s.getAll()),
+  enqueue: item => examDbRun("outbox", "readwrite", s => s.put(item)),
+  dequeue: key => examDbRun("outbox", "readwrite", s => s.delete(key)),
+};
+
+function newSubmitKey() {
+  if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+  return Array.from({ length: 32 }, () => Math.floor(Math.random() * 16).toString(16)).join("");
+}
+
+function submitRetryDelay(attempts, retryAfterSeconds) {
+  const cap = Math.min(SUBMIT_RETRY_MAX_MS, SUBMIT_RETRY_BASE_MS * 2 ** attempts);
+  return Math.max(Math.random() * cap, (retryAfterSeconds || 0) * 1000);
+}
+
+// Terminales: 2xx, 409 (ya enviado) y errores de validación. Red caída,
+// 408, 429 y 5xx se reintentan.
+function submitIsFinal(status) {
+  if (status >= 200 && status < 300) return true;
+  return status >= 400 && status < 500 && status !== 408 && status !== 429;
+}
+
+async function deferSubmit(item, retryAfterSeconds) {
+  item.attempts = (item.attempts || 0) + 1;
+  item.nextAt = Date.now() + submitRetryDelay(item.attempts - 1, retryAfterSeconds);
+  try {
+    await examStore.enqueue(item);
+  } catch (e) {
+    // Sin IndexedDB el reintento solo vive mientras la página siga abierta.
+  }
+  return { done: false, nextAt: item.nextAt };
+}
+
+// Envía un elemento de la cola con su Idempotency-Key: si el primer intento
+// sí llegó al servidor, el reintento recibe el mismo resultado.
+async function sendQueuedSubmit(item) {
+  let res;
+  try {
+    res = await fetch("/submit_exam", {
+      method: "POST",
+      headers: { "Content-Type": "application/json", "Idempotency-Key": item.key },
+      body: JSON.stringify(item.payload),
+    });
+  } catch (e) {
+    return deferSubmit(item, 0);
+  }
+
+  if (!submitIsFinal(res.status)) {
+    return deferSubmit(item, parseFloat(res.headers.get("Retry-After")) || 0);
+  }
+
+  const data = await res.json().catch(() => ({}));
+  try {
+    await examStore.dequeue(item.key);
+  } catch (e) {
+    // Un reenvío posterior es inofensivo: la clave lo hace idempotente.
+  }
+  return { done: true, status: res.status, data };
+}
+
+// Envía lo que ya toca de la cola, uno a uno. Devuelve cuántos quedan.
+async function flushQueuedSubmits(onResult) {
+  const items = await examStore.queued();
+  let pending = 0;
+  for (const item of items) {
+    if (item.nextAt && item.nextAt > Date.now()) {
+      pending++;
+      continue;
+    }
+    const result = await sendQueuedSubmit(item);
+    if (result.done) {
+      if (onResult) await onResult(item, result);
+    } else {
+      pending++;
+    }
+  }
+  return pending;
+}
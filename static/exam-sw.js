@@ -0,0 +1,86 @@
+// Service worker de la página del examen (se sirve en /exam-sw.js con
+// alcance /exam/). Guarda el HTML del examen y sus recursos para abrirlo
+// sin red y vacía la cola de envíos con Background Sync.
+importScripts("/static/exam-offline.js");
+
+const EXAM_CACHE = "webeval-exam-v1";
+const OUTBOX_SYNC_TAG = "exam-outbox";
+
+self.addEventListener("install", () => self.skipWaiting());
+
+self.addEventListener("activate", event => {
+  event.waitUntil((async () => {
+    const names = await caches.keys();
+    await Promise.all(
+      names.filter(n => n.startsWith("webeval-exam-") && n !== EXAM_CACHE).map(n => caches.delete(n))
+    );
+    await self.clients.claim();
+  })());
+});
+
+async function notifySubmitted(item, result) {
+  const clients = await self.clients.matchAll({ type: "window" });
+  clients.forEach(c => c.postMessage({
+    type: "exam-submitted",
+    key: item.key,
+    examId: item.payload.exam_id,
+    status: result.status,
+    data: result.data,
+  }));
+}
+
+self.addEventListener("message", event => {
+  const msg = event.data || {};
+  if (msg.type === "precache" && Array.isArray(msg.urls)) {
+    // La página manda su propia URL y las de sus recursos (con huella).
+    event.waitUntil(
+      caches.open(EXAM_CACHE).then(cache => Promise.all(
+        msg.urls.map(url => cache.add(url).catch(() => null))
+      ))
+    );
+  } else if (msg.type === "flush") {
+    event.waitUntil(flushQueuedSubmits(notifySubmitted).catch(() => null));
+  }
+});
+
+self.addEventListener("sync", event => {
+  if (event.tag !== OUTBOX_SYNC_TAG) return;
+  // Si queda algo pendiente se rechaza para que el navegador reprograme.
+  event.waitUntil(flushQueuedSubmits(notifySubmitted).then(pending => {
+    if (pending) throw new Error("envíos pendientes");
+  }));
+});
+
+self.addEventListener("fetch", event => {
+  const req = event.request;
+  if (req.method !== "GET") return;
+  const url = new URL(req.url);
+  if (url.origin !== self.location.origin) return;
+
+  if (req.mode === "navigate" && url.pathname.startsWith("/exam/")) {
+    // Red primero (el servidor responde 304 con el ETag); sin red, la copia.
+    event.respondWith(
+      fetch(req).then(res => {
+        if (res.ok) {
+          const copy = res.clone();
+          event.waitUntil(caches.open(EXAM_CACHE).then(cache => cache.put(req, copy)));
+        }
+        return res;
+      }).catch(async () => (await caches.match(req, { ignoreSearch: true })) || Response.error())
+    );
+    return;
+  }
+
+  if (url.pathname.startsWith("/assets/")) {
+    // Los recursos llevan huella en el nombre: caché primero.
+    event.respondWith(
+      caches.match(req).then(hit => hit || fetch(req).then(res => {
+        if (res.ok) {
+          const copy = res.clone();
+          event.waitUntil(caches.open(EXAM_CACHE).then(cache => cache.put(req, copy)));
+        }
+        return res;
+      }))
+    );
+  }
+});
@@ -2,10 +2,30 @@ const examSelect = document.getElementById("exam_select");
 const fileContainer = document.getElementById("file_container");
 const addFileBtn = document.getElementById("btn_add_file");
 const uploadBtn = document.getElementById("btn_upload");
+const cedulaInput = document.getElementById("facilitator_cedula");
+const progress = document.getElementById("progress");
 const result = document.getElementById("result");
 
+// Reintentos de una parte (Wi-Fi de planta): backoff exponencial y, antes de
+// reenviar, se pregunta al servidor hasta dónde llegó la subida.
+const UPLOAD_RETRIES = 8;
+const UPLOAD_RETRY_BASE_MS = 1000;
+const UPLOAD_RETRY_MAX_MS = 30000;
+
 function setHTML(el, html){ el.innerHTML = html || ""; }
 
+function escapeHTML(s){
+  const div = document.createElement("div");
+  div.textContent = s == null ? "" : String(s);
+  return div.innerHTML;
+}
+
+const sleep = ms => new Promise(r => setTimeout(r, ms));
+
+async function readJSON(res){
+  return res.json().catch(()=>({}));
+}
+
 async function loadExams(){
   try{
     const res = await fetch("/api/exams");
@@ -38,6 +58,65 @@ addFileBtn.onclick = () => {
   fileContainer.appendChild(div);
 };
 
+// Sube un archivo por partes (Content-Range) a una sesión reanudable.
+// Devuelve la entrada del manifiesto o lanza un Error con el mensaje.
+async function uploadFile(exam_id, facilitator_cedula, file, onProgress){
+  const res = await fetch("/api/upload_support/sessions", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ exam_id, facilitator_cedula, name: file.name, size: file.size })
+  });
+  const session = await readJSON(res);
+  if(!res.ok) throw new Error(session.error || "No se pudo iniciar la subida");
+
+  const url = `/api/upload_support/sessions/${session.upload_id}`;
+  const chunk = session.chunk_size;
+  let offset = session.offset || 0;
+  let attempts = 0;
+
+  while(true){
+    const end = Math.min(offset + chunk, file.size);
+    let put = null;
+    try{
+      put = await fetch(url, {
+        method: "PUT",
+        headers: { "Content-Range": `bytes ${offset}-${end - 1}/${file.size}` },
+        body: file.slice(offset, end)
+      });
+    } catch(e){
+      // Sin red: se reintenta abajo.
+    }
+
+    if(put){
+      const data = await readJSON(put);
+      if(put.status === 201) return data.file;
+      if(put.ok || put.status === 409){
+        // 409: la parte no continuaba donde quedó la subida; se sigue desde ahí.
+        offset = data.offset;
+        attempts = 0;
+        onProgress(offset);
+        continue;
+      }
+      if(put.status < 500 && put.status !== 408 && put.status !== 429){
+        throw new Error(data.error || "Error subiendo");
+      }
+    }
+
+    attempts++;
+    if(attempts > UPLOAD_RETRIES) throw new Error("Se perdió la conexión; vuelve a intentarlo");
+    await sleep(Math.random() * Math.min(UPLOAD_RETRY_MAX_MS, UPLOAD_RETRY_BASE_MS * 2 ** attempts));
+    let status = null;
+    try{
+      status = await fetch(url);
+    } catch(e){
+      continue;
+    }
+    const data = await readJSON(status);
+    if(status.status === 404) throw new Error(data.error || "La subida venció");
+    if(status.ok) offset = data.offset;
+  }
+}
+
 uploadBtn.onclick = async () => {
   const exam_id = examSelect.value;
   if(!exam_id) return alert("Selecciona una formación");
@@ -46,35 +125,40 @@ uploadBtn.onclick = async () => {
   const files = inputs.map(i => i.files[0]).filter(Boolean);
   if(!files.length) return alert("Adjunta al menos un archivo");
 
-  const formData = new FormData();
-  formData.append("exam_id", exam_id);
-
-  files.forEach(f => formData.append("files", f));
+  const facilitator_cedula = cedulaInput.value.trim();
 
   uploadBtn.disabled = true;
   uploadBtn.textContent = "Subiendo...";
 
+  const saved = [];
+  const failed = [];
   try{
-    const res = await fetch("/upload_support", {
-      method: "POST",
-      body: formData
-    });
-
-    const data = await res.json().catch(()=>({}));
-
-    if(!res.ok){
-      alert(data.error || "Error subiendo");
-      return;
+    for(const [i, file] of files.entries()){
+      const label = `${i + 1}/${files.length} ${file.name}`;
+      try{
+        saved.push(await uploadFile(exam_id, facilitator_cedula, file, offset => {
+          const pct = file.size ? Math.floor(offset * 100 / file.size) : 100;
+          progress.textContent = `Subiendo ${label}: ${pct}%`;
+        }));
+      } catch(e){
+        failed.push({ name: file.name, error: e.message });
+      }
     }
 
-    let html = "✅ Soportes subidos:<br><br>";
-    (data.files || []).forEach(f=>{
-      html += `📌 <b>${f.name}</b><br><a href="${f.url}" target="_blank">${f.url}</a><br><br>`;
+    let html = "";
+    if(saved.length){
+      html += "✅ Soportes subidos:<br><br>";
+      saved.forEach(f=>{
+        html += `📌 <b>${escapeHTML(f.name)}</b><br><a href="${escapeHTML(f.url)}" target="_blank">${escapeHTML(f.url)}</a><br><br>`;
+      });
+    }
+    failed.forEach(f=>{
+      html += `❌ <b>${escapeHTML(f.name)}</b>: ${escapeHTML(f.error)}<br>`;
     });
-
     setHTML(result, html);
 
   } finally {
+    setHTML(progress, "");
     uploadBtn.disabled = false;
     uploadBtn.textContent = "📤 Subir soportes";
   }
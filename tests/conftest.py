@@ -0,0 +1,13 @@
+# Pruebas de las piezas internas de app.py (sin Sheets ni red).
+#
+#     python -m pytest -q
+#
+# app.py arranca hilos y colas al importarse; se apagan por entorno antes de
+# la importación.
+import os
+import sys
+
+os.environ.setdefault("PREWARM_ENABLED", "0")
+os.environ.setdefault("RESPONSES_WRITE_BEHIND", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
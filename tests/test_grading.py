@@ -0,0 +1,204 @@
+# grade_answers() con el plan compilado debe calificar igual que el bucle
+# que había en submit_exam antes del plan (reference_grade, copiado de ahí).
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+import app as A
+from app import POINTS_PER_QUESTION, normalize_text, safe_list_of_str, safe_str
+
+
+def reference_answer_by_title(questions: List[Dict[str, Any]], answers: List[Any], title: str, default: Any = "") -> Any:
+    wanted = normalize_text(title)
+    for i, q in enumerate(questions):
+        if normalize_text(safe_str(q.get("title"), 300)) == wanted:
+            if 0 <= i < len(answers):
+                return answers[i]
+            break
+    return default
+
+
+def reference_grade(questions: List[Dict[str, Any]], answers: List[Any]):
+    cleaned_answers: List[Any] = []
+    for i, q in enumerate(questions):
+        a = answers[i]
+        if q.get("type") == "check":
+            arr = safe_list_of_str(a, item_max_len=200, max_items=50)
+            if not arr and isinstance(a, str) and a.strip():
+                arr = [safe_str(a, 200)]
+            cleaned_answers.append(arr)
+        else:
+            cleaned_answers.append(safe_str(a, 500))
+
+    score = 0
+    total = 0
+    details: List[Dict[str, Any]] = []
+
+    def ungraded(i, q, title, correct_value=None):
+        details.append({
+            "index": i,
+            "title": title,
+            "type": safe_str(q.get("type"), 20),
+            "is_correct": None,
+            "user_value": cleaned_answers[i],
+            "correct_value": correct_value
+        })
+
+    for i, q in enumerate(questions):
+        qtype = q.get("type")
+        title = safe_str(q.get("title"), 300)
+
+        if q.get("scored", True) is not True:
+            ungraded(i, q, title)
+            continue
+
+        if qtype in ("multiple", "true_false"):
+            correct_idx = q.get("correct", None)
+            options = q.get("options", [])
+            if not (isinstance(correct_idx, int) and isinstance(options, list)) or correct_idx < 0 or correct_idx >= len(options):
+                ungraded(i, q, title)
+                continue
+            total += POINTS_PER_QUESTION
+            correct_value = safe_str(options[correct_idx], 500)
+            is_ok = isinstance(cleaned_answers[i], str) and cleaned_answers[i] == correct_value
+            if is_ok:
+                score += POINTS_PER_QUESTION
+            details.append({
+                "index": i,
+                "title": title,
+                "type": safe_str(q.get("type"), 20),
+                "is_correct": is_ok,
+                "user_value": cleaned_answers[i],
+                "correct_value": correct_value
+            })
+
+        elif qtype == "check":
+            correct_list = q.get("correct", None)
+            options = q.get("options", [])
+            if not (isinstance(correct_list, list) and isinstance(options, list)):
+                ungraded(i, q, title)
+                continue
+            correct_values = []
+            ok = True
+            for idx in correct_list:
+                if not isinstance(idx, int) or idx < 0 or idx >= len(options):
+                    ok = False
+                    break
+                correct_values.append(safe_str(options[idx], 500))
+            if not ok:
+                ungraded(i, q, title)
+                continue
+            total += POINTS_PER_QUESTION
+            user_vals = cleaned_answers[i]
+            if not isinstance(user_vals, list):
+                ungraded(i, q, title, correct_values)
+                continue
+            user_clean = [safe_str(x, 500) for x in user_vals if safe_str(x, 500)]
+            is_ok = set(user_clean) == set(correct_values)
+            if is_ok:
+                score += POINTS_PER_QUESTION
+            details.append({
+                "index": i,
+                "title": title,
+                "type": safe_str(q.get("type"), 20),
+                "is_correct": is_ok,
+                "user_value": user_clean,
+                "correct_value": correct_values
+            })
+
+        else:
+            ungraded(i, q, title)
+
+    columns = {
+        name: reference_answer_by_title(questions, cleaned_answers, title, [] if name == "area" else "")
+        for name, title in A.ANSWER_COLUMNS.items()
+    }
+    return cleaned_answers, score, total, details, columns
+
+
+def planned_grade(questions: List[Dict[str, Any]], answers: List[Any]):
+    plan = A.compile_grading_plan(questions)
+    cleaned, score, total, details = A.grade_answers(plan, answers)
+    columns = {
+        name: A.planned_answer(plan, cleaned, name, [] if name == "area" else "")
+        for name in A.ANSWER_COLUMNS
+    }
+    return cleaned, score, total, details, columns
+
+
+EDGE_QUESTIONS = [
+    {"title": "Turno", "type": "multiple", "options": ["Turno 1", "Turno 2"], "scored": False},
+    {"title": "  turno ", "type": "multiple", "options": ["A", "B"], "correct": 0},
+    {"title": "Área", "type": "check", "options": ["Mezclas", "Otro"], "scored": False},
+    {"title": "Índice fuera de rango", "type": "multiple", "options": ["a", "b"], "correct": 5},
+    {"title": "Índice negativo", "type": "true_false", "options": ["VERDADERO", "FALSO"], "correct": -1},
+    {"title": "Correcta no entera", "type": "multiple", "options": ["a", "b"], "correct": "1"},
+    {"title": "Opciones no lista", "type": "multiple", "options": "ab", "correct": 0},
+    {"title": "Check válida", "type": "check", "options": ["x", "y", "z"], "correct": [0, 2]},
+    {"title": "Check vacía", "type": "check", "options": ["x", "y"], "correct": []},
+    {"title": "Check con índice malo", "type": "check", "options": ["x", "y"], "correct": [0, 9]},
+    {"title": "Check correcta no lista", "type": "check", "options": ["x", "y"], "correct": 1},
+    {"title": "Abierta", "type": "open"},
+    {"title": "Sin tipo"},
+    {"title": "No calificada", "type": "true_false", "options": ["VERDADERO", "FALSO"], "correct": 0, "scored": "yes"},
+]
+
+
+@pytest.mark.parametrize("answers", [
+    ["Turno 2", "A", ["Mezclas", "Otro: x"], "a", "VERDADERO", "b", "a", ["z", "x"], [], ["x"], ["y"], "texto", 3, "VERDADERO"],
+    ["", "B", "Mezclas", "b", "FALSO", "a", "b", ["x", "y", "z"], ["x"], [], "y", None, "", "FALSO"],
+    [None, None, None, None, None, None, None, None, None, None, None, None, None, None],
+    [1, ["A"], {"k": "v"}, 2.5, True, [], {}, "x", "   ", ["x", "", "x"], ["x", "x"], ["a"], {"a": 1}, 0],
+])
+def test_edge_cases_match_reference(answers):
+    assert planned_grade(EDGE_QUESTIONS, answers) == reference_grade(EDGE_QUESTIONS, answers)
+
+
+def test_default_questions_match_reference():
+    questions = A.get_default_questions(with_overrides=False) + [
+        {"title": "P1", "type": "multiple", "options": ["a", "b"], "correct": 1},
+        {"title": "P2", "type": "check", "options": ["x", "y", "z"], "correct": [0, 2]},
+        {"title": "P3", "type": "true_false", "options": ["VERDADERO", "FALSO"], "correct": 0},
+    ]
+    answers = ["Turno 1", "Terceros", ["Mezclas", "Otro: x"], "3", "Experto", "5", "bien", "b", ["x", "z"], "VERDADERO"]
+    assert len(answers) == len(questions)
+    expected = reference_grade(questions, answers)
+    assert planned_grade(questions, answers) == expected
+    assert expected[1] == expected[2] == 3 * POINTS_PER_QUESTION
+    assert expected[4]["turno"] == "Turno 1"
+
+
+def _random_question(rng: random.Random, titles: List[str]) -> Dict[str, Any]:
+    qtype = rng.choice(["multiple", "true_false", "check", "open", None])
+    options = [rng.choice(["a", "b", "c", " d ", "", "ÁÉ"]) for _ in range(rng.randint(0, 4))]
+    q: Dict[str, Any] = {"title": rng.choice(titles), "options": options}
+    if qtype is not None:
+        q["type"] = qtype
+    if qtype == "check":
+        q["correct"] = [rng.randint(-1, 4) for _ in range(rng.randint(0, 3))]
+    else:
+        q["correct"] = rng.choice([rng.randint(-1, 4), None, "0"])
+    if rng.random() < 0.2:
+        q["scored"] = rng.choice([False, True, 1, "true"])
+    return q
+
+
+def _random_answer(rng: random.Random) -> Any:
+    pick = rng.choice(["str", "list", "none", "num"])
+    if pick == "str":
+        return rng.choice(["a", "b", "c", " d ", "", "ÁÉ", "  "])
+    if pick == "list":
+        return [rng.choice(["a", "b", "c", "", "ÁÉ", 1]) for _ in range(rng.randint(0, 4))]
+    if pick == "num":
+        return rng.choice([0, 1, 2.5])
+    return None
+
+
+def test_random_exams_match_reference():
+    rng = random.Random(20261018)
+    titles = list(A.ANSWER_COLUMNS.values()) + ["turno", "GERENCIA ", "Pregunta", "Otra"]
+    for _ in range(500):
+        questions = [_random_question(rng, titles) for _ in range(rng.randint(0, 12))]
+        answers = [_random_answer(rng) for _ in questions]
+        assert planned_grade(questions, answers) == reference_grade(questions, answers)
@@ -0,0 +1,123 @@
+# ResponseQueue: un append que falló pero llegó a la hoja no se duplica al
+# reintentar.
+import os
+
+import pytest
+
+import app as A
+from app import ResponseQueue
+
+
+class FakeResponses:
+    # Responses en memoria. land indica cuántas filas del próximo append
+    # llegan a la hoja antes de que falle (None: el append no falla).
+    def __init__(self):
+        self.rows = []
+        self.land = None
+        self.key_reads = 0
+
+    def keys(self, first_row: int = 1):
+        self.key_reads += 1
+        return [(r[0], r[3]) for r in self.rows], len(self.rows)
+
+    def append(self, rows):
+        land, self.land = self.land, None
+        if land is None:
+            self.rows.extend(rows)
+            return
+        self.rows.extend(rows[:land])
+        raise TimeoutError("sin respuesta de Sheets")
+
+
+class FakeStorage:
+    def __init__(self):
+        self.responses = FakeResponses()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    fake = FakeStorage()
+    monkeypatch.setattr(A, "STORAGE", fake)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = ResponseQueue(str(tmp_path / "responses_queue.sqlite3"), enabled=True)
+    # Sin el hilo de volcado: las pruebas llaman flush_once().
+    q._init_db()
+    q._pid = os.getpid()
+    return q
+
+
+def _row(exam_id, cedula):
+    return [exam_id, "ANA", "1", cedula, "Turno 1"]
+
+
+def test_first_attempt_does_not_read_keys(queue, storage):
+    queue.enqueue("EX1", "111", _row("EX1", "111"))
+    queue.enqueue("EX1", "222", _row("EX1", "222"))
+    assert queue.flush_once() == 2
+    assert storage.responses.rows == [_row("EX1", "111"), _row("EX1", "222")]
+    assert storage.responses.key_reads == 0
+    assert queue.pending() == 0
+
+
+def test_retry_skips_rows_that_reached_the_sheet(queue, storage):
+    queue.enqueue("EX1", "111", _row("EX1", "111"))
+    queue.enqueue("EX1", "222", _row("EX1", "222"))
+    storage.responses.land = 2
+    with pytest.raises(TimeoutError):
+        queue.flush_once()
+    assert queue.pending() == 2
+
+    assert queue.flush_once() == 2
+    assert storage.responses.rows == [_row("EX1", "111"), _row("EX1", "222")]
+    assert queue.pending() == 0
+    snap = queue.snapshot()
+    assert snap["duplicates_skipped"] == 2
+    assert snap["flushed_rows"] == 0
+
+
+def test_retry_sends_rows_that_did_not_arrive(queue, storage):
+    queue.enqueue("EX1", "111", _row("EX1", "111"))
+    queue.enqueue("EX1", "222", _row("EX1", "222"))
+    queue.enqueue("EX1", "333", _row("EX1", "333"))
+    storage.responses.land = 1
+    with pytest.raises(TimeoutError):
+        queue.flush_once()
+
+    assert queue.flush_once() == 3
+    assert storage.responses.rows == [_row("EX1", "111"), _row("EX1", "222"), _row("EX1", "333")]
+    snap = queue.snapshot()
+    assert snap["duplicates_skipped"] == 1
+    assert snap["flushed_rows"] == 2
+
+
+def test_new_rows_keep_queue_order_with_retried_ones(queue, storage):
+    queue.enqueue("EX1", "111", _row("EX1", "111"))
+    storage.responses.land = 0
+    with pytest.raises(TimeoutError):
+        queue.flush_once()
+
+    # La misma cédula en otro examen no cuenta como ya enviada.
+    storage.responses.rows.append(_row("EX2", "111"))
+    queue.enqueue("EX1", "222", _row("EX1", "222"))
+    assert queue.flush_once() == 2
+    assert storage.responses.rows == [_row("EX2", "111"), _row("EX1", "111"), _row("EX1", "222")]
+    assert queue.snapshot()["duplicates_skipped"] == 0
+
+
+def test_failed_keys_read_leaves_rows_queued(queue, storage, monkeypatch):
+    queue.enqueue("EX1", "111", _row("EX1", "111"))
+    storage.responses.land = 0
+    with pytest.raises(TimeoutError):
+        queue.flush_once()
+
+    def broken_keys(first_row: int = 1):
+        raise TimeoutError("sin respuesta de Sheets")
+    monkeypatch.setattr(storage.responses, "keys", broken_keys)
+    with pytest.raises(TimeoutError):
+        queue.flush_once()
+    assert queue.pending() == 1
+    assert storage.responses.rows == []
@@ -0,0 +1,182 @@
+# SingleFlight: una sola ejecución por clave y la semántica de not_before.
+import threading
+import time
+
+import pytest
+
+from app import SingleFlight
+
+
+def _wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.005)
+
+
+class Blocking:
+    # fn que cuenta sus ejecuciones y no termina hasta release().
+    def __init__(self, result="valor"):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self._release.wait(5)
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+    def release(self):
+        self._release.set()
+
+
+def _spawn(flights, results, name, *args, **kwargs):
+    def run():
+        try:
+            results[name] = flights.do(*args, **kwargs)
+        except BaseException as e:
+            results[name] = e
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+def _stats(flights, group="g"):
+    return flights.snapshot()["by_sheet"].get(group, {})
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    fn = Blocking()
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", fn, group="g")
+    assert fn.started.wait(5)
+    followers = [_spawn(flights, results, f"f{i}", "k", fn, group="g") for i in range(3)]
+    _wait_until(lambda: _stats(flights).get("deduplicated") == 3)
+
+    fn.release()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert fn.calls == 1
+    assert set(results.values()) == {"valor"}
+    assert _stats(flights) == {"executed": 1, "deduplicated": 3, "timeouts": 0}
+    assert flights.snapshot()["in_flight"] == 0
+
+
+def test_followers_receive_the_leader_exception():
+    flights = SingleFlight()
+    fn = Blocking(result=ValueError("falló"))
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", fn, group="g")
+    assert fn.started.wait(5)
+    follower = _spawn(flights, results, "follower", "k", fn, group="g")
+    _wait_until(lambda: _stats(flights).get("deduplicated") == 1)
+
+    fn.release()
+    leader.join(5)
+    follower.join(5)
+
+    assert fn.calls == 1
+    assert results["leader"] is results["follower"]
+    assert isinstance(results["follower"], ValueError)
+
+
+def test_different_keys_do_not_share():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1, group="g") == 1
+    assert flights.do("b", lambda: 2, group="g") == 2
+    assert _stats(flights)["executed"] == 2
+
+
+def test_not_before_earlier_than_running_call_joins_it():
+    flights = SingleFlight()
+    before = time.monotonic()
+    fn = Blocking()
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", fn, group="g")
+    assert fn.started.wait(5)
+    follower = _spawn(flights, results, "follower", "k", fn, group="g", not_before=before)
+    _wait_until(lambda: _stats(flights).get("deduplicated") == 1)
+
+    fn.release()
+    leader.join(5)
+    follower.join(5)
+    assert fn.calls == 1
+    assert results == {"leader": "valor", "follower": "valor"}
+
+
+def test_not_before_after_running_call_waits_for_a_fresh_one():
+    flights = SingleFlight()
+    old = Blocking(result="viejo")
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", old, group="g")
+    assert old.started.wait(5)
+
+    # Un cambio posterior al inicio de la lectura en curso: hace falta otra.
+    changed_at = time.monotonic()
+    fresh = Blocking(result="nuevo")
+    waiters = [
+        _spawn(flights, results, f"w{i}", "k", fresh, group="g", not_before=changed_at)
+        for i in range(3)
+    ]
+    # Uno queda como siguiente ejecución y los demás se suman a ella.
+    _wait_until(lambda: _stats(flights).get("executed") == 2 and _stats(flights).get("deduplicated") == 2)
+    assert not fresh.started.is_set()
+
+    # Sin not_before, lo que llega ahora comparte la lectura en curso.
+    plain = _spawn(flights, results, "plain", "k", old, group="g")
+    _wait_until(lambda: _stats(flights).get("deduplicated") == 3)
+
+    old.release()
+    leader.join(5)
+    plain.join(5)
+    assert results["leader"] == results["plain"] == "viejo"
+
+    # La siguiente arranca al terminar la anterior, después de not_before.
+    assert fresh.started.wait(5)
+    fresh.release()
+    for t in waiters:
+        t.join(5)
+
+    assert old.calls == 1
+    assert fresh.calls == 1
+    assert [results[f"w{i}"] for i in range(3)] == ["nuevo"] * 3
+    assert _stats(flights) == {"executed": 2, "deduplicated": 3, "timeouts": 0}
+    assert flights.snapshot()["in_flight"] == 0
+
+
+def test_next_call_starts_even_if_running_call_fails():
+    flights = SingleFlight()
+    old = Blocking(result=RuntimeError("caída"))
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", old, group="g")
+    assert old.started.wait(5)
+    waiter = _spawn(flights, results, "waiter", "k", lambda: "nuevo", group="g", not_before=time.monotonic())
+    _wait_until(lambda: _stats(flights).get("executed") == 2)
+
+    old.release()
+    leader.join(5)
+    waiter.join(5)
+    assert isinstance(results["leader"], RuntimeError)
+    assert results["waiter"] == "nuevo"
+
+
+def test_follower_timeout():
+    flights = SingleFlight()
+    fn = Blocking()
+    results = {}
+    leader = _spawn(flights, results, "leader", "k", fn, group="g")
+    assert fn.started.wait(5)
+
+    with pytest.raises(TimeoutError):
+        flights.do("k", fn, group="g", timeout=0.05)
+    assert _stats(flights)["timeouts"] == 1
+
+    fn.release()
+    leader.join(5)
+    assert results["leader"] == "valor"
@@ -0,0 +1,119 @@
+# SubmitReceipts: reserva, resultado, liberación y reutilización de claves.
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app as A
+from app import SubmitReceipts, content_hash
+
+RESULT = {"status": "ok", "score": 2, "total": 3, "percent": 66.67}
+
+
+@pytest.fixture
+def receipts(tmp_path):
+    return SubmitReceipts(str(tmp_path / "submit_receipts.sqlite3"), ttl=3600)
+
+
+def _payload(*answers):
+    return content_hash(["EX1", "ANA", "1", "12345678", list(answers)])
+
+
+def test_first_submit_reserves_the_key(receipts):
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("owner", None)
+    # Un duplicado mientras el primero califica espera el recibo.
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("pending", None)
+
+
+def test_put_then_replay(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    receipts.put("clave-0001", RESULT)
+
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("replay", RESULT)
+    assert receipts.snapshot()["stored"] == 1
+    assert receipts.snapshot()["replayed"] == 1
+
+
+@pytest.mark.parametrize("exam_id, cedula, payload", [
+    ("EX1", "12345678", _payload("b")),
+    ("EX2", "12345678", _payload("a")),
+    ("EX1", "87654321", _payload("a")),
+])
+def test_key_reused_with_other_content_is_a_conflict(receipts, exam_id, cedula, payload):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    assert receipts.begin("clave-0001", exam_id, cedula, payload) == ("conflict", None)
+
+    receipts.put("clave-0001", RESULT)
+    assert receipts.begin("clave-0001", exam_id, cedula, payload) == ("conflict", None)
+    assert receipts.snapshot()["conflicts"] == 2
+    # El recibo original sigue intacto.
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("replay", RESULT)
+
+
+def test_receipt_without_payload_hash_matches_by_exam_and_cedula(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    receipts.put("clave-0001", RESULT)
+    conn = sqlite3.connect(receipts.path)
+    with conn:
+        conn.execute("UPDATE submit_receipts SET payload_hash = ''")
+    conn.close()
+
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("b")) == ("replay", RESULT)
+    assert receipts.begin("clave-0001", "EX1", "87654321", _payload("a")) == ("conflict", None)
+
+
+def test_abandon_releases_the_reservation(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    receipts.abandon("clave-0001")
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("owner", None)
+
+
+def test_abandon_keeps_stored_results(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    receipts.put("clave-0001", RESULT)
+    receipts.abandon("clave-0001")
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("replay", RESULT)
+
+
+def test_stale_reservation_can_be_taken_over(receipts, monkeypatch):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    monkeypatch.setattr(A, "SUBMIT_RECEIPT_PENDING_TTL", -1)
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("owner", None)
+
+
+def test_expired_receipts_are_not_replayed(tmp_path):
+    receipts = SubmitReceipts(str(tmp_path / "submit_receipts.sqlite3"), ttl=-1)
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    receipts.put("clave-0001", RESULT)
+    # Vencido, tampoco choca con otro contenido.
+    assert receipts.begin("clave-0001", "EX1", "87654321", _payload("b")) == ("owner", None)
+
+
+def test_wait_returns_the_result_once_stored(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    timer = threading.Timer(0.3, receipts.put, ("clave-0001", RESULT))
+    timer.start()
+    try:
+        assert receipts.wait("clave-0001", timeout=5) == RESULT
+    finally:
+        timer.join()
+    assert receipts.snapshot()["waited"] == 1
+
+
+def test_wait_gives_up_when_the_reservation_is_abandoned(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    timer = threading.Timer(0.3, receipts.abandon, ("clave-0001",))
+    timer.start()
+    started = time.monotonic()
+    try:
+        assert receipts.wait("clave-0001", timeout=5) is None
+    finally:
+        timer.join()
+    assert time.monotonic() - started < 2
+
+
+def test_wait_times_out(receipts):
+    receipts.begin("clave-0001", "EX1", "12345678", _payload("a"))
+    assert receipts.wait("clave-0001", timeout=0.3) is None
+    assert receipts.begin("clave-0001", "EX1", "12345678", _payload("a")) == ("pending", None)